@@ -0,0 +1,104 @@
+"""Store each audit entry's position and hash in the chain
+
+Revision ID: 006_add_audit_chain_columns
+Revises: 005_add_hot_query_indexes
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+import hashlib
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '006_add_audit_chain_columns'
+down_revision = '005_add_hot_query_indexes'
+branch_labels = None
+depends_on = None
+
+
+audit_logs = sa.table(
+    'audit_logs',
+    sa.column('id', sa.String),
+    sa.column('user_id', sa.String),
+    sa.column('action_type', sa.String),
+    sa.column('result', sa.String),
+    sa.column('timestamp', sa.DateTime(timezone=True)),
+    sa.column('details', sa.JSON),
+    sa.column('previous_hash', sa.String),
+    sa.column('sequence', sa.BigInteger),
+    sa.column('entry_hash', sa.String),
+)
+
+
+def _legacy_hash(row) -> str:
+    # The hash the previous chain code computed, which the next entry's previous_hash holds
+    entry_str = (
+        f"{row.id}|"
+        f"{row.user_id}|"
+        f"{row.action_type}|"
+        f"{row.result}|"
+        f"{row.timestamp}|"
+        f"{json.dumps(row.details, sort_keys=True) if row.details else ''}|"
+        f"{row.previous_hash or ''}"
+    )
+    return hashlib.sha256(entry_str.encode('utf-8')).hexdigest()
+
+
+def _chain_order(rows):
+    """
+    Order rows by following previous_hash links from the genesis entry.
+
+    Timestamps can tie, so (timestamp, id) order alone may not be the order the
+    entries were chained in. It only breaks ties between several rows linking to
+    the same entry, and places rows that are not linked into the chain after it.
+    Yields (row, legacy hash) pairs.
+    """
+    hashes = {row.id: _legacy_hash(row) for row in rows}
+    children = {}
+    for row in rows:  # already in (timestamp, id) order
+        children.setdefault(row.previous_hash or None, []).append(row)
+
+    placed = set()
+    current_hash = None
+    while True:
+        candidates = [row for row in children.get(current_hash, []) if row.id not in placed]
+        if not candidates:
+            break
+        row = candidates[0]
+        placed.add(row.id)
+        current_hash = hashes[row.id]
+        yield row, current_hash
+
+    for row in rows:
+        if row.id not in placed:
+            yield row, hashes[row.id]
+
+
+def upgrade():
+    op.add_column('audit_logs', sa.Column('sequence', sa.BigInteger(), nullable=True))
+    op.add_column('audit_logs', sa.Column('entry_hash', sa.String(length=64), nullable=True))
+
+    # Number existing entries in the order they were chained and record their hashes
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(audit_logs).order_by(audit_logs.c.timestamp, audit_logs.c.id)
+    ).fetchall()
+    for sequence, (row, entry_hash) in enumerate(_chain_order(rows), start=1):
+        connection.execute(
+            audit_logs.update()
+            .where(audit_logs.c.id == row.id)
+            .values(sequence=sequence, entry_hash=entry_hash)
+        )
+
+    with op.batch_alter_table('audit_logs') as batch_op:
+        batch_op.create_unique_constraint('uq_audit_logs_sequence', ['sequence'])
+
+
+def downgrade():
+    with op.batch_alter_table('audit_logs') as batch_op:
+        batch_op.drop_constraint('uq_audit_logs_sequence', type_='unique')
+        batch_op.drop_column('entry_hash')
+        batch_op.drop_column('sequence')
@@ -0,0 +1,31 @@
+"""Add audit_checkpoints table for incremental chain verification
+
+Revision ID: 007_add_audit_checkpoints
+Revises: 006_add_audit_chain_columns
+Create Date: 2026-10-17 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '007_add_audit_checkpoints'
+down_revision = '006_add_audit_chain_columns'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'audit_checkpoints',
+        sa.Column('id', sa.String(), primary_key=True),
+        sa.Column('sequence', sa.BigInteger(), nullable=False, unique=True),
+        sa.Column('entry_hash', sa.String(64), nullable=False),
+        sa.Column('signature', sa.String(64), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade():
+    op.drop_table('audit_checkpoints')
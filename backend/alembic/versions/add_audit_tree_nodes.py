@@ -0,0 +1,61 @@
+"""Add audit_tree_nodes table: a Merkle tree over the audit chain
+
+Revision ID: 008_add_audit_tree_nodes
+Revises: 007_add_audit_checkpoints
+Create Date: 2026-10-18 01:00:00.000000
+
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '008_add_audit_tree_nodes'
+down_revision = '007_add_audit_checkpoints'
+branch_labels = None
+depends_on = None
+
+
+audit_logs = sa.table(
+    'audit_logs',
+    sa.column('sequence', sa.BigInteger),
+    sa.column('entry_hash', sa.String),
+)
+
+
+def upgrade():
+    audit_tree_nodes = op.create_table(
+        'audit_tree_nodes',
+        sa.Column('level', sa.Integer(), primary_key=True),
+        sa.Column('position', sa.BigInteger(), primary_key=True),
+        sa.Column('hash', sa.String(64), nullable=False),
+    )
+
+    # Build the tree over existing entries in chain order (same hashing as utils.merkle)
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(audit_logs.c.entry_hash)
+        .where(audit_logs.c.sequence.isnot(None))
+        .order_by(audit_logs.c.sequence)
+    )
+    frontier = []  # (level, position, hash) of the perfect subtrees so far
+    nodes = []
+    for size, row in enumerate(rows):
+        node = (0, size, hashlib.sha256(b"\x00" + bytes.fromhex(row.entry_hash)).digest())
+        nodes.append(node)
+        while frontier and frontier[-1][0] == node[0]:
+            level, position, left = frontier.pop()
+            node = (level + 1, position // 2, hashlib.sha256(b"\x01" + left + node[2]).digest())
+            nodes.append(node)
+        frontier.append(node)
+        if len(nodes) >= 1000:
+            op.bulk_insert(audit_tree_nodes, [{'level': l, 'position': p, 'hash': h.hex()} for l, p, h in nodes])
+            nodes = []
+    if nodes:
+        op.bulk_insert(audit_tree_nodes, [{'level': l, 'position': p, 'hash': h.hex()} for l, p, h in nodes])
+
+
+def downgrade():
+    op.drop_table('audit_tree_nodes')
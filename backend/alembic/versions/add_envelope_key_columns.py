@@ -0,0 +1,33 @@
+"""Add envelope encryption key columns to vaults and encrypted_files
+
+Revision ID: 002_add_envelope_key_columns
+Revises: 001_add_storage_location_column
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '002_add_envelope_key_columns'
+down_revision = '001_add_storage_location_column'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Per-user key-encryption key parameters
+    op.add_column('vaults', sa.Column('kek_salt', sa.String(), nullable=True))
+    op.add_column('vaults', sa.Column('kek_iterations', sa.Integer(), nullable=True))
+
+    # Wrapped per-file data keys (NULL for legacy password-encrypted files)
+    op.add_column('encrypted_files', sa.Column('wrapped_key', sa.String(), nullable=True))
+    op.add_column('encrypted_files', sa.Column('key_id', sa.String(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('encrypted_files', 'key_id')
+    op.drop_column('encrypted_files', 'wrapped_key')
+    op.drop_column('vaults', 'kek_iterations')
+    op.drop_column('vaults', 'kek_salt')
@@ -0,0 +1,39 @@
+"""Add indexes on hot query columns and one vault per user
+
+Revision ID: 005_add_hot_query_indexes
+Revises: 004_add_user_token_version
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers
+revision = '005_add_hot_query_indexes'
+down_revision = '004_add_user_token_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_encrypted_files_user_id_created_at', 'encrypted_files', ['user_id', 'created_at', 'id'])
+    op.create_index('ix_file_metadata_file_id', 'file_metadata', ['file_id'])
+    op.create_index('ix_audit_logs_timestamp', 'audit_logs', ['timestamp'])
+    op.create_index('ix_audit_logs_user_id_timestamp', 'audit_logs', ['user_id', 'timestamp'])
+    op.create_index('ix_upload_sessions_status_expires_at', 'upload_sessions', ['status', 'expires_at'])
+
+    # Fails if a user already has several vaults; those must be merged by hand, since
+    # each vault's KEK salt wraps the keys of the files uploaded while it was current
+    with op.batch_alter_table('vaults') as batch_op:
+        batch_op.create_unique_constraint('uq_vaults_user_id', ['user_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('vaults') as batch_op:
+        batch_op.drop_constraint('uq_vaults_user_id', type_='unique')
+
+    op.drop_index('ix_upload_sessions_status_expires_at', table_name='upload_sessions')
+    op.drop_index('ix_audit_logs_user_id_timestamp', table_name='audit_logs')
+    op.drop_index('ix_audit_logs_timestamp', table_name='audit_logs')
+    op.drop_index('ix_file_metadata_file_id', table_name='file_metadata')
+    op.drop_index('ix_encrypted_files_user_id_created_at', table_name='encrypted_files')
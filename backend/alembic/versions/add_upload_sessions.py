@@ -0,0 +1,53 @@
+"""Add upload_sessions table for resumable uploads and widen file sizes
+
+Revision ID: 003_add_upload_sessions
+Revises: 002_add_envelope_key_columns
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '003_add_upload_sessions'
+down_revision = '002_add_envelope_key_columns'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'upload_sessions',
+        sa.Column('id', sa.String(), primary_key=True),
+        sa.Column('user_id', sa.String(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('original_filename', sa.String(), nullable=False),
+        sa.Column('total_size', sa.BigInteger(), nullable=False),
+        sa.Column('received_size', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('chunk_size', sa.Integer(), nullable=False),
+        sa.Column('header', sa.String(), nullable=False),
+        sa.Column('wrapped_key', sa.String(), nullable=False),
+        sa.Column('key_id', sa.String(), nullable=False),
+        sa.Column('staging_path', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False, server_default='active'),
+        sa.Column('file_id', sa.String(), sa.ForeignKey('encrypted_files.id'), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index('ix_upload_sessions_user_id', 'upload_sessions', ['user_id'])
+
+    # Resumable uploads accept files beyond 2 GiB (batch mode: SQLite cannot ALTER a column type)
+    with op.batch_alter_table('encrypted_files') as batch_op:
+        batch_op.alter_column('file_size', type_=sa.BigInteger(), existing_type=sa.Integer(), existing_nullable=False)
+    with op.batch_alter_table('file_metadata') as batch_op:
+        batch_op.alter_column('file_size', type_=sa.BigInteger(), existing_type=sa.Integer(), existing_nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('file_metadata') as batch_op:
+        batch_op.alter_column('file_size', type_=sa.Integer(), existing_type=sa.BigInteger(), existing_nullable=False)
+    with op.batch_alter_table('encrypted_files') as batch_op:
+        batch_op.alter_column('file_size', type_=sa.Integer(), existing_type=sa.BigInteger(), existing_nullable=False)
+    op.drop_index('ix_upload_sessions_user_id', table_name='upload_sessions')
+    op.drop_table('upload_sessions')
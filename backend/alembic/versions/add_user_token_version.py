@@ -0,0 +1,25 @@
+"""Add token_version to users
+
+Revision ID: 004_add_user_token_version
+Revises: 003_add_upload_sessions
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = '004_add_user_token_version'
+down_revision = '003_add_upload_sessions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Incremented on role/status changes so cached principals and old tokens are invalidated
+    op.add_column('users', sa.Column('token_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,206 @@
+"""
+Benchmark the hot-path queries with and without the indexes from migration 005.
+
+Creates the schema in a scratch database, loads synthetic rows, then runs each
+hot query before and after creating the indexes, printing the query plan and
+the median latency of each.
+
+    python benchmark_indexes.py                      # 1M rows in a temporary SQLite file
+    python benchmark_indexes.py --rows 100000
+    python benchmark_indexes.py --database-url postgresql://.../scratch
+
+The target database must be empty; the tables are dropped again afterwards.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import Index, MetaData, UniqueConstraint, create_engine, text
+
+import src.models  # noqa: F401  (registers every table on Base.metadata)
+from src.models.base import Base
+
+# Indexes and constraints added by migration 005
+NEW_INDEXES = {
+    "ix_encrypted_files_user_id_created_at",
+    "ix_file_metadata_file_id",
+    "ix_audit_logs_timestamp",
+    "ix_audit_logs_user_id_timestamp",
+    "ix_upload_sessions_status_expires_at",
+}
+NEW_CONSTRAINTS = {"uq_vaults_user_id"}
+
+QUERIES = {
+    "list user files": "SELECT id, original_filename FROM encrypted_files WHERE user_id = :user_id ORDER BY created_at",
+    "file by id and owner": "SELECT id FROM encrypted_files WHERE id = :file_id AND user_id = :user_id",
+    "metadata by file": "SELECT id FROM file_metadata WHERE file_id = :file_id",
+    "vault by user": "SELECT id, kek_salt FROM vaults WHERE user_id = :user_id",
+    "audit chain head": "SELECT id FROM audit_logs ORDER BY timestamp DESC LIMIT 1",
+    "audit history for user": "SELECT id FROM audit_logs WHERE user_id = :user_id ORDER BY timestamp DESC LIMIT 100",
+}
+
+BATCH_SIZE = 50_000
+
+
+def _bare_metadata() -> MetaData:
+    """Copy of the schema without the indexes and constraints under test."""
+    bare = MetaData()
+    for table in Base.metadata.sorted_tables:
+        copy = table.to_metadata(bare)
+        for index in [i for i in copy.indexes if i.name in NEW_INDEXES]:
+            copy.indexes.discard(index)
+        for constraint in [c for c in copy.constraints if c.name in NEW_CONSTRAINTS]:
+            copy.constraints.discard(constraint)
+    return bare
+
+
+def _insert(conn, table, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        conn.execute(table.insert(), rows[start:start + BATCH_SIZE])
+
+
+def _load(engine, metadata: MetaData, rows: int, users: int) -> dict:
+    tables = metadata.tables
+    base_time = datetime(2025, 1, 1)
+    user_ids = [str(uuid.uuid4()) for _ in range(users)]
+    file_ids = [str(uuid.uuid4()) for _ in range(rows)]
+
+    with engine.begin() as conn:
+        _insert(conn, tables["users"], [
+            {"id": user_id, "username": f"user{i}", "password_hash": "x", "salt": ""}
+            for i, user_id in enumerate(user_ids)
+        ])
+        _insert(conn, tables["vaults"], [{"id": str(uuid.uuid4()), "user_id": user_id} for user_id in user_ids])
+        _insert(conn, tables["encrypted_files"], [
+            {
+                "id": file_id,
+                "user_id": user_ids[i % users],
+                "original_filename": f"file{i}.bin",
+                "file_size": 1024,
+                "encrypted_path": f"encrypted/{file_id}",
+                "storage_location": "local",
+                "algorithm_version": "AES-256-GCM-ENVELOPE-v1",
+                "created_at": base_time + timedelta(seconds=i),
+            }
+            for i, file_id in enumerate(file_ids)
+        ])
+        _insert(conn, tables["file_metadata"], [
+            {
+                "id": str(uuid.uuid4()),
+                "file_id": file_id,
+                "original_filename": f"file{i}.bin",
+                "file_size": 1024,
+                "algorithm_version": "AES-256-GCM-ENVELOPE-v1",
+            }
+            for i, file_id in enumerate(file_ids)
+        ])
+        _insert(conn, tables["audit_logs"], [
+            {
+                "id": str(uuid.uuid4()),
+                "user_id": user_ids[i % users],
+                "action_type": "FILE_ENCRYPT",
+                "result": "success",
+                "timestamp": base_time + timedelta(seconds=i),
+            }
+            for i in range(rows)
+        ])
+
+    # Query parameters that hit the middle of the data
+    return {"user_id": user_ids[users // 2], "file_id": file_ids[rows // 2]}
+
+
+def _explain(conn, sql: str, params: dict) -> str:
+    prefix = "EXPLAIN QUERY PLAN" if conn.dialect.name == "sqlite" else "EXPLAIN"
+    rows = conn.execute(text(f"{prefix} {sql}"), params).fetchall()
+    # The plan text is the last column (SQLite also returns node ids)
+    return " / ".join(str(row[-1]) for row in rows)
+
+
+def _measure(engine, params: dict, repeat: int) -> dict:
+    results = {}
+    with engine.connect() as conn:
+        for name, sql in QUERIES.items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                conn.execute(text(sql), params).fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = {"plan": _explain(conn, sql, params), "median_ms": statistics.median(timings)}
+    return results
+
+
+def _create_indexes(engine, metadata: MetaData) -> None:
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            bare_table = metadata.tables[table.name]
+            for index in table.indexes:
+                if index.name in NEW_INDEXES:
+                    Index(index.name, *[bare_table.c[c.name] for c in index.columns], unique=index.unique).create(conn)
+            for constraint in table.constraints:
+                # A unique index enforces the same rule and can be added to an existing SQLite table
+                if isinstance(constraint, UniqueConstraint) and constraint.name in NEW_CONSTRAINTS:
+                    Index(constraint.name, *[bare_table.c[c.name] for c in constraint.columns], unique=True).create(conn)
+        conn.execute(text("ANALYZE"))
+
+
+def run_benchmark(database_url: str, rows: int, users: int, repeat: int) -> dict:
+    """
+    Load ``rows`` files and audit entries for ``users`` users and time the hot queries.
+
+    Returns:
+        {"before": {query: {"plan", "median_ms"}}, "after": {...}}
+    """
+    engine = create_engine(database_url)
+    metadata = _bare_metadata()
+    metadata.create_all(engine)
+    try:
+        params = _load(engine, metadata, rows, users)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        before = _measure(engine, params, repeat)
+        _create_indexes(engine, metadata)
+        after = _measure(engine, params, repeat)
+    finally:
+        metadata.drop_all(engine)
+        engine.dispose()
+    return {"before": before, "after": after}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="encrypted files / audit entries to load")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20, help="runs per query")
+    parser.add_argument("--database-url", help="empty scratch database (default: temporary SQLite file)")
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    scratch = None
+    if not database_url:
+        fd, scratch = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        database_url = f"sqlite:///{scratch}"
+
+    print(f"Loading {args.rows} rows for {args.users} users into {database_url} ...")
+    started = time.perf_counter()
+    try:
+        results = run_benchmark(database_url, args.rows, args.users, args.repeat)
+    finally:
+        if scratch:
+            os.remove(scratch)
+    print(f"Done in {time.perf_counter() - started:.1f}s\n")
+
+    for name in QUERIES:
+        before, after = results["before"][name], results["after"][name]
+        print(f"== {name}")
+        print(f"   without indexes: {before['median_ms']:9.3f} ms   {before['plan']}")
+        print(f"   with indexes:    {after['median_ms']:9.3f} ms   {after['plan']}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
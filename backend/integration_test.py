@@ -6,7 +6,7 @@ import tempfile
 import os
 from pathlib import Path
 from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, AsyncMock, MagicMock
 
 # Add the src directory to the path
 import sys
@@ -44,14 +44,14 @@ def test_fixed_endpoint():
     
     # Test 3: Test the logic with mocked dependencies
     with patch('src.api.vault_routes.supabase', None):  # Disable Supabase to test fallback
-        with patch('src.api.vault_routes.UserService') as mock_user_service:
+        with patch('src.api.vault_routes.AsyncUserService') as mock_user_service:
             # Mock a valid user
             mock_user = MagicMock()
             mock_user.id = 123
             mock_user.username = "testuser"
             
             mock_user_service_instance = MagicMock()
-            mock_user_service_instance.get_current_user.return_value = mock_user
+            mock_user_service_instance.get_current_principal = AsyncMock(return_value=mock_user)
             mock_user_service.return_value = mock_user_service_instance
             
             # Create a temporary test file
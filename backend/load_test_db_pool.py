@@ -0,0 +1,226 @@
+"""
+Load test for the database engine configuration.
+
+Two scenarios, each run with the old defaults and with the tuned settings:
+
+1. SQLite journal mode: reader threads list a user's files while writer
+   threads append audit entries. With the rollback journal every write locks
+   out readers; with WAL + synchronous=NORMAL they proceed concurrently.
+2. Pool sizing: more threads than pooled connections run short "requests"
+   that hold a connection. The instrumented pool reports how long checkouts
+   waited, how far the pool overflowed and whether any checkout timed out.
+
+    python load_test_db_pool.py
+    python load_test_db_pool.py --seconds 10 --threads 32
+    python load_test_db_pool.py --database-url postgresql://.../scratch   # pool scenario only
+
+The target database must be empty; the tables are dropped again afterwards.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+
+from src.config.settings import settings
+from src.database import create_database_engine
+import src.models  # noqa: F401  (registers every table on Base.metadata)
+from src.models.base import Base
+from src.utils.db_pool import pool_metrics
+
+USER_ID = str(uuid.uuid4())
+
+
+def _seed(engine, files: int = 2000) -> None:
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO users (id, username, password_hash, salt, token_version) VALUES (:id, 'load', 'x', '', 0)"),
+            {"id": USER_ID},
+        )
+        conn.execute(
+            text(
+                "INSERT INTO encrypted_files (id, user_id, original_filename, file_size, encrypted_path, "
+                "storage_location, algorithm_version, created_at) "
+                "VALUES (:id, :user_id, :name, 1024, :path, 'local', 'AES-256-GCM-ENVELOPE-v1', :created_at)"
+            ),
+            [
+                {"id": str(uuid.uuid4()), "user_id": USER_ID, "name": f"f{i}", "path": f"p{i}", "created_at": datetime.utcnow()}
+                for i in range(files)
+            ],
+        )
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def _run_threads(workers, seconds):
+    deadline = time.perf_counter() + seconds
+    threads = [threading.Thread(target=worker, args=(deadline,)) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def sqlite_journal_scenario(journal_mode, synchronous, readers, writers, seconds):
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    settings.sqlite_journal_mode, settings.sqlite_synchronous = journal_mode, synchronous
+    # A short busy timeout makes lock contention visible as errors instead of hiding it in latency
+    settings.sqlite_busy_timeout_ms = 100
+    engine = create_database_engine(f"sqlite:///{path}", pool_size=readers + writers, max_overflow=0)
+    _seed(engine)
+
+    lock = threading.Lock()
+    results = {"reads": [], "writes": [], "errors": 0}
+
+    def record(kind, started):
+        with lock:
+            results[kind].append((time.perf_counter() - started) * 1000)
+
+    def reader(deadline):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    conn.execute(
+                        text("SELECT id, original_filename FROM encrypted_files WHERE user_id = :u ORDER BY created_at DESC LIMIT 100"),
+                        {"u": USER_ID},
+                    ).fetchall()
+                record("reads", started)
+            except OperationalError:
+                with lock:
+                    results["errors"] += 1
+
+    def writer(deadline):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                with engine.begin() as conn:
+                    conn.execute(
+                        text("INSERT INTO audit_logs (id, user_id, action_type, result) VALUES (:id, :u, 'LOAD', 'success')"),
+                        {"id": str(uuid.uuid4()), "u": USER_ID},
+                    )
+                record("writes", started)
+            except OperationalError:
+                with lock:
+                    results["errors"] += 1
+
+    try:
+        _run_threads([reader] * readers + [writer] * writers, seconds)
+    finally:
+        engine.dispose()
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    return {
+        "reads_per_s": len(results["reads"]) / seconds,
+        "writes_per_s": len(results["writes"]) / seconds,
+        "read_p99_ms": _percentile(results["reads"], 0.99),
+        "write_p99_ms": _percentile(results["writes"], 0.99),
+        "lock_errors": results["errors"],
+    }
+
+
+def pool_scenario(database_url, pool_size, max_overflow, pool_timeout, threads, seconds, hold_ms):
+    engine = create_database_engine(
+        database_url, pool_size=pool_size, max_overflow=max_overflow, pool_timeout=pool_timeout
+    )
+    if engine.dialect.name == "sqlite":
+        Base.metadata.create_all(engine)
+
+    lock = threading.Lock()
+    latencies, timeouts = [], 0
+
+    def request(deadline):
+        nonlocal timeouts
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT 1")).fetchall()
+                    # Simulates the rest of a request that keeps its session open
+                    time.sleep(hold_ms / 1000)
+            except PoolTimeoutError:
+                with lock:
+                    timeouts += 1
+                continue
+            with lock:
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    try:
+        _run_threads([request] * threads, seconds)
+        metrics = pool_metrics(engine)
+    finally:
+        if engine.dialect.name == "sqlite":
+            Base.metadata.drop_all(engine)
+        engine.dispose()
+
+    return {
+        "requests_per_s": len(latencies) / seconds,
+        "median_ms": statistics.median(latencies) if latencies else 0.0,
+        "p99_ms": _percentile(latencies, 0.99),
+        "avg_checkout_wait_ms": metrics["avg_checkout_wait_ms"],
+        "max_checkout_wait_ms": metrics["max_checkout_wait_ms"],
+        "peak_overflow": metrics["peak_overflow"],
+        "timeouts": timeouts,
+    }
+
+
+def _print_rows(title, rows):
+    print(f"== {title}")
+    for label, result in rows:
+        print(f"   {label:<34} " + "  ".join(f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}"
+                                           for key, value in result.items()))
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of each run")
+    parser.add_argument("--threads", type=int, default=24, help="concurrent requests in the pool scenario")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--hold-ms", type=float, default=5.0, help="time each request keeps its connection")
+    parser.add_argument("--database-url", help="empty scratch database for the pool scenario (default: temporary SQLite file)")
+    args = parser.parse_args()
+
+    if not args.database_url:
+        _print_rows("SQLite journal mode (readers + writers)", [
+            ("journal=DELETE synchronous=FULL", sqlite_journal_scenario("DELETE", "FULL", args.readers, args.writers, args.seconds)),
+            ("journal=WAL synchronous=NORMAL", sqlite_journal_scenario("WAL", "NORMAL", args.readers, args.writers, args.seconds)),
+        ])
+
+    scratch = None
+    database_url = args.database_url
+    if not database_url:
+        fd, scratch = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        database_url = f"sqlite:///{scratch}"
+    try:
+        _print_rows(f"Pool sizing ({args.threads} threads, {args.hold_ms:g}ms per request)", [
+            (f"pool=5 overflow=0 timeout=1s", pool_scenario(database_url, 5, 0, 1, args.threads, args.seconds, args.hold_ms)),
+            (f"pool={settings.db_pool_size} overflow={settings.db_max_overflow} timeout={settings.db_pool_timeout_seconds:g}s",
+             pool_scenario(database_url, settings.db_pool_size, settings.db_max_overflow, settings.db_pool_timeout_seconds,
+                           args.threads, args.seconds, args.hold_ms)),
+            (f"pool={args.threads} overflow=0", pool_scenario(database_url, args.threads, 0, 1, args.threads, args.seconds, args.hold_ms)),
+        ])
+    finally:
+        if scratch and os.path.exists(scratch):
+            os.remove(scratch)
+
+
+if __name__ == "__main__":
+    main()
@@ -38,8 +38,8 @@ def run_production():
     port = os.environ.get("PORT", str(settings.server_port))
     host = os.environ.get("HOST", settings.server_host)
 
-    # Determine the number of workers (usually 2 * number of CPU cores + 1)
-    workers = (multiprocessing.cpu_count() * 2) + 1
+    # Determine the number of workers (WEB_CONCURRENCY, or 2 * number of CPU cores + 1)
+    workers = settings.web_concurrency or (multiprocessing.cpu_count() * 2) + 1
 
     cmd = [
         "gunicorn",
@@ -59,6 +59,9 @@ def run_production():
     print(f"Starting SecureVault API in production mode...")
     print(f"Server will run on {host}:{port}")
     print(f"Using {workers} worker processes")
+    # Each worker has its own pool; this is the most connections the database will see
+    print(f"Database connections: up to {workers * (settings.db_pool_size + settings.db_max_overflow)} "
+          f"({workers} x (pool {settings.db_pool_size} + overflow {settings.db_max_overflow}))")
     print(f"CORS enabled for: {settings.frontend_url}")
 
     subprocess.run(cmd)
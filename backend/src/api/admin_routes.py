@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import os
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ..database import get_db
+from ..database import get_async_db, get_db
 from ..services.user_service import UserService
 from ..services.admin_service import AdminService
 from ..models.user import User, UserRole
@@ -25,7 +27,7 @@ class UserResponse(BaseModel):
 def verify_admin(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     user_service = UserService(db)
     
-    user = user_service.get_current_user(credentials.credentials)
+    user = user_service.get_current_principal(credentials.credentials)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -136,4 +138,98 @@ def demote_user(
     if not success:
         raise HTTPException(status_code=400, detail="Failed to demote admin - may be trying to demote yourself or user is not an admin")
 
-    return {"message": "Admin demoted to user successfully"}
\ No newline at end of file
+    return {"message": "Admin demoted to user successfully"}
+
+
+@router.get("/audit/verify")
+def verify_audit_chain(
+    full: bool = False,
+    workers: Optional[int] = Query(None, ge=1, le=os.cpu_count() or 1),
+    current_user: User = Depends(verify_admin),
+    db: Session = Depends(get_db)
+):
+    from ..services.audit_log_service import AuditLogService
+    return AuditLogService(db).verify_chain(full=full, workers=workers)._asdict()
+
+
+@router.get("/audit/tree-head")
+def get_audit_tree_head(current_user: User = Depends(verify_admin), db: Session = Depends(get_db)):
+    from ..services.audit_log_service import AuditLogService
+    return AuditLogService(db).signed_tree_head()
+
+
+@router.get("/audit/proof/inclusion/{sequence}")
+def get_audit_inclusion_proof(
+    sequence: int,
+    tree_size: Optional[int] = None,
+    current_user: User = Depends(verify_admin),
+    db: Session = Depends(get_db)
+):
+    from ..services.audit_log_service import AuditLogService
+    try:
+        return AuditLogService(db).inclusion_proof(sequence, tree_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/audit/proof/consistency")
+def get_audit_consistency_proof(
+    first: int,
+    second: Optional[int] = None,
+    current_user: User = Depends(verify_admin),
+    db: Session = Depends(get_db)
+):
+    from ..services.audit_log_service import AuditLogService
+    try:
+        return AuditLogService(db).consistency_proof(first, second)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/metrics/crypto")
+def get_crypto_metrics(current_user: User = Depends(verify_admin)):
+    from ..utils.crypto_executor import get_crypto_executor
+    return get_crypto_executor().metrics()
+
+
+@router.get("/metrics/auth")
+def get_auth_metrics(current_user: User = Depends(verify_admin)):
+    from ..utils.crypto_executor import get_password_executor
+    from ..utils.password_utils import last_bcrypt_calibration
+    from ..utils.principal_cache import get_principal_cache
+    from ..utils.rate_limiter import get_login_limiters
+    return {
+        "password_executor": get_password_executor().metrics(),
+        "login_rate_limits": {name: limiter.stats() for name, limiter in get_login_limiters().items()},
+        "bcrypt_calibration": last_bcrypt_calibration(),
+        "principal_cache": get_principal_cache().stats(),
+    }
+
+
+@router.get("/metrics/database")
+def get_database_metrics(current_user: User = Depends(verify_admin)):
+    from ..database import engine, get_async_engine
+    from ..utils.db_pool import pool_metrics
+    # The API routes use the async engine; the sync engine serves admin routes, the sync vault routes and the audit writer
+    return {"async": pool_metrics(get_async_engine()), "sync": pool_metrics(engine)}
+
+
+@router.get("/metrics/audit")
+def get_audit_metrics(current_user: User = Depends(verify_admin)):
+    from ..services.audit_log_service import audit_writer_metrics
+    return audit_writer_metrics()
+
+
+@router.get("/metrics/storage")
+def get_storage_metrics(current_user: User = Depends(verify_admin)):
+    from ..storage import get_supabase_client_manager, supabase_enabled
+    if not supabase_enabled():
+        return {"supabase": "disabled"}
+    return {"supabase": get_supabase_client_manager().stats()}
+
+
+@router.post("/uploads/collect-expired")
+async def collect_expired_uploads(current_user: User = Depends(verify_admin), db: AsyncSession = Depends(get_async_db)):
+    from ..services.upload_service import AsyncUploadService
+    expired = await AsyncUploadService(db).collect_expired()
+    return {"message": "Expired upload sessions collected", "expired": expired}
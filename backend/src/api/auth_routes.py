@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import math
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ..database import get_db
-from ..services.user_service import UserService
+from ..database import get_async_db, get_db
+from ..services.user_service import AsyncUserService, UserService
 from ..models.user import User
 from ..config.settings import settings
+from ..utils.encryption_utils import purge_cached_keys
+from ..utils.rate_limiter import check_login_rate, resolve_client_ip
 import jwt
 
 
@@ -27,14 +31,20 @@ class LoginRequest(BaseModel):
 class LoginResponse(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: int
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 @router.post("/register", response_model=dict)
-def register(request: RegisterRequest, db: Session = Depends(get_db)):
-    user_service = UserService(db)
+async def register(request: RegisterRequest, db: AsyncSession = Depends(get_async_db)):
+    user_service = AsyncUserService(db)
     
     try:
-        user = user_service.create_user(request.username, request.password)
+        user = await user_service.create_user(request.username, request.password)
         if user:
             return {"message": "User registered successfully"}
         else:
@@ -44,10 +54,24 @@ def register(request: RegisterRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=LoginResponse)
-def login(request: LoginRequest, db: Session = Depends(get_db)):
-    user_service = UserService(db)
+async def login(request: LoginRequest, http_request: Request, db: AsyncSession = Depends(get_async_db)):
+    # Throttle before spending a bcrypt verification on the attempt
+    client_ip = resolve_client_ip(
+        http_request.client.host if http_request.client else None,
+        http_request.headers.get("x-forwarded-for"),
+        settings.trusted_proxy_hops,
+    )
+    retry_after = check_login_rate(client_ip, request.username)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts. Please retry later.",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+    user_service = AsyncUserService(db)
     
-    user = user_service.authenticate_user(request.username, request.password)
+    user = await user_service.authenticate_user(request.username, request.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -55,14 +79,42 @@ def login(request: LoginRequest, db: Session = Depends(get_db)):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token = user_service.generate_access_token(user.id)
-    return {"access_token": access_token, "token_type": "bearer"}
+    access_token = user_service.generate_access_token(user)
+    refresh_token = user_service.generate_refresh_token(user)
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+        "expires_in": settings.access_token_expire_minutes * 60
+    }
+
+
+@router.post("/refresh", response_model=LoginResponse)
+async def refresh(request: RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    user_service = AsyncUserService(db)
+
+    access_token = await user_service.refresh_access_token(request.refresh_token)
+    if not access_token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "expires_in": settings.access_token_expire_minutes * 60
+    }
 
 
 @router.post("/logout")
 def logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
     # In a real implementation, we would invalidate the token
-    # For now, we just return a success message
+    # Drop any file keys derived for this user so they don't outlive the session
+    user_id = UserService.get_token_subject(credentials.credentials)
+    if user_id:
+        purge_cached_keys(user_id)
     return {"message": "Logged out successfully"}
 
 
@@ -70,7 +122,7 @@ def logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
 def delete_account(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     user_service = UserService(db)
     
-    user = user_service.get_current_user(credentials.credentials)
+    user = user_service.get_current_principal(credentials.credentials)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
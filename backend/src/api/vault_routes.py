@@ -1,25 +1,42 @@
+import asyncio
 import os
-import tempfile
 import shutil
+import tempfile
+import time
+import uuid
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Literal, Optional, Tuple, Union
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request, Response, status, UploadFile, File, Form
 from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-# Supabase client is imported dynamically when needed to avoid import-time errors
-# from supabase import create_client, Client  # Commented out to avoid import issues
+# Supabase is reached through the pooled client in ..storage (see SupabaseClientManager)
 from dotenv import load_dotenv
 
-from ..database import get_db
-from ..services.user_service import UserService
-from ..services.vault_service import VaultService
+from ..database import get_async_db, get_db
+from ..services.user_service import AsyncUserService, UserService
+from ..services.vault_service import AsyncVaultService, VaultService
+from ..services.upload_service import AsyncUploadService, UploadError, UploadOffsetMismatch
 from ..models.user import User
 from ..models.encrypted_file import EncryptedFile
 from ..config.settings import settings
+from ..storage import StorageError, get_storage_backend, get_upload_locations
+from ..utils.crypto_executor import CryptoExecutorSaturated, get_crypto_executor
+from ..utils.http_range import RangeNotSatisfiable, content_range, resolve_range
+from ..utils.zip_stream import aiter_zip
+from ..utils.encryption_utils import (
+    DEFAULT_STREAM_CHUNK_SIZE,
+    ENVELOPE_ALGORITHM_VERSION,
+    StreamDecryptionError,
+    StreamEncryptor,
+    aiter_encrypt,
+    new_wrapped_data_key,
+)
 
 load_dotenv()
 
@@ -32,9 +49,9 @@ SUPABASE_KEY = settings.supabase_key if settings.supabase_key else os.getenv("SU
 BUCKET_NAME = settings.bucket_name if settings.bucket_name else os.getenv("BUCKET_NAME", "vaults")
 USE_SUPABASE = (settings.use_supabase if settings.use_supabase else os.getenv("USE_SUPABASE", "true")).lower() == "true"
 
-# Initialize Supabase client lazily (only when needed)
+# Kept for older scripts that import it; requests use the shared client manager
 from typing import Any
-supabase: Optional[Any] = None  # Using Any to avoid import issues with Client type
+supabase: Optional[Any] = None
 
 # --- Temporary directory (always writable on Render Free tier) ---
 TEMP_DIR = Path(tempfile.gettempdir())
@@ -60,10 +77,10 @@ async def encrypt_file(
     file: UploadFile = File(...),
     password: str = Form(...),
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user_service = UserService(db)
-    user = user_service.get_current_user(credentials.credentials)
+    user_service = AsyncUserService(db)
+    user = await user_service.get_current_principal(credentials.credentials)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -71,181 +88,202 @@ async def encrypt_file(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # Validate file size before processing (10MB limit)
-    MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB in bytes
+    # Validate file size before processing (single-request uploads; larger files use /vault/uploads)
+    MAX_FILE_SIZE = settings.max_file_size
 
-    # Seek to end to get file size, then reset to beginning
-    file.file.seek(0, 2)  # Seek to end
-    file_size = file.file.tell()  # Get size
-    file.file.seek(0)  # Reset to beginning
-
-    if file_size > MAX_FILE_SIZE:
+    if _upload_size(file) > MAX_FILE_SIZE:
         raise HTTPException(
             status_code=413,
-            detail=f"File too large. Maximum size is {MAX_FILE_SIZE // (1024*1024)}MB"
+            detail=f"File too large. Maximum size is {MAX_FILE_SIZE // (1024*1024)}MB; use /vault/uploads for larger files"
         )
 
-    # Check available disk space before creating temporary files
-    import shutil
-    total, used, free = shutil.disk_usage(TEMP_DIR)
-    # Estimate required space: original file + encrypted file + some buffer
-    estimated_required_space = file_size * 3 + (10 * 1024 * 1024)  # 3x file size + 10MB buffer
+    try:
+        # Key derivation runs on the bounded crypto executor, not the event loop; each
+        # file gets a random data key wrapped with the user's (cached) key-encryption key
+        vault_service = AsyncVaultService(db)
+        vault = await vault_service.prepare_vault(user.id)
+        kek = await vault_service.derive_kek_async(vault, password)
+
+        encrypted_file_record, encryptor = await _encrypt_upload(file, user.id, kek)
+
+        # One transaction for the file, its metadata and (on first upload) the vault
+        await vault_service.save_file_records([encrypted_file_record])
+
+        return _stored_file_result(encrypted_file_record, encryptor)
+
+    except (HTTPException, CryptoExecutorSaturated):
+        # Re-raise HTTP and backpressure errors as-is
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"File processing failed: {str(e)}")
+
 
-    if free < estimated_required_space:
+@router.post("/encrypt-batch")
+async def encrypt_files_batch(
+    files: List[UploadFile] = File(...),
+    password: str = Form(...),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+):
+    user_service = AsyncUserService(db)
+    user = await user_service.get_current_principal(credentials.credentials)
+    if not user:
         raise HTTPException(
-            status_code=507,
-            detail="Insufficient disk space for file processing"
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if len(files) > settings.batch_upload_max_files:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many files. A batch may contain at most {settings.batch_upload_max_files} files"
         )
 
-    # Initialize file paths to None to ensure they exist in finally block
-    local_temp_path = None
-    encrypted_temp_path = None
+    started = time.perf_counter()
+    vault_service = AsyncVaultService(db)
+    vault = await vault_service.prepare_vault(user.id)
+    # One key derivation for the whole batch; every file still gets its own data key
+    kek = await vault_service.derive_kek_async(vault, password)
 
-    # Paths for temporary storage using Render-compatible /tmp directory
-    local_temp_path = TEMP_DIR / f"raw_{user.id}_{file.filename}"
-    encrypted_temp_path = TEMP_DIR / f"enc_{user.id}_{file.filename}"
+    # Files are encrypted (on the crypto executor) and uploaded concurrently, a bounded number at a time
+    fan_out = asyncio.Semaphore(max(1, settings.batch_upload_concurrency))
 
+    async def store(file: UploadFile):
+        if _upload_size(file) > settings.max_file_size:
+            return f"File too large. Maximum size is {settings.max_file_size // (1024*1024)}MB"
+        async with fan_out:
+            try:
+                return await _encrypt_upload(file, user.id, kek)
+            except Exception as e:
+                print(f"Batch upload of {file.filename} failed: {str(e)}")
+                return "Server busy, retry later" if isinstance(e, CryptoExecutorSaturated) else f"File processing failed: {str(e)}"
+
+    outcomes = await asyncio.gather(*(store(file) for file in files))
+    stored = [outcome for outcome in outcomes if not isinstance(outcome, str)]
+
+    # All rows for the batch in one transaction; if it fails, remove the blobs it would have referenced
     try:
-        # 1. Save uploaded file temporarily in /tmp (Render free tier writable path)
-        with local_temp_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        # 2. Encryption Logic
-        from ..utils.encryption_utils import generate_salt, derive_key_from_password
-        salt = generate_salt()
-
-        # Derive encryption key from password
-        key = derive_key_from_password(password, salt)
-        from cryptography.fernet import Fernet
-        fernet = Fernet(key)
-
-        # Read the original file
-        with open(local_temp_path, 'rb') as file_reader:
-            file_data = file_reader.read()
-
-        # Encrypt the data
-        encrypted_data = fernet.encrypt(file_data)
-
-        # Write encrypted data with salt prepended to our temp location
-        with open(encrypted_temp_path, 'wb') as file_writer:
-            file_writer.write(salt + encrypted_data)
-
-        # 3. Upload to Supabase (persistent storage) with error handling
-        if USE_SUPABASE and SUPABASE_URL and SUPABASE_KEY:
-            # Initialize Supabase client only when needed
-            supabase = None
+        await vault_service.save_file_records([record for record, _ in stored])
+    except Exception as e:
+        for record, _ in stored:
             try:
-                # Dynamically import the client to avoid import-time errors
-                from supabase import create_client
-                # Create client with only the required parameters to avoid proxy issues
-                supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-            except Exception as init_error:
-                # Handle any initialization errors including proxy argument issues
-                error_msg = str(init_error)
-                if "'proxy'" in error_msg or "unexpected keyword argument" in error_msg:
-                    print(f"Supabase client initialization failed due to version incompatibility: {init_error}")
-                    print("This is typically caused by httpx/supabase version conflicts.")
-                    print("The system will use /tmp storage as fallback.")
-                else:
-                    print(f"Failed to initialize Supabase client: {init_error}")
-
-                # Continue to fallback logic
-                supabase = None
-
-            if supabase:
-                try:
-                    with encrypted_temp_path.open("rb") as f_enc:
-                        file_data = f_enc.read()
-                        # Upload to Supabase with a path that includes user ID for organization
-                        response = supabase.storage.from_(BUCKET_NAME).upload(
-                            path=f"encrypted/{user.id}/{file.filename}",
-                            file=file_data,
-                            file_options={"content-type": "application/octet-stream"}
-                        )
-
-                    # Store metadata in our database
-                    from ..models.encrypted_file import EncryptedFile
-
-                    file_size = len(file_data)
-
-                    # Store the path in a format that's easier to parse later
-                    encrypted_file_record = EncryptedFile(
-                        user_id=user.id,
-                        original_filename=file.filename,
-                        file_size=file_size,
-                        encrypted_path=f"encrypted/{user.id}/{file.filename}",  # Just the path in Supabase bucket
-                        storage_location="supabase",  # Indicate where the file is stored
-                        algorithm_version="AES-128-Fernet-PBKDF2"
-                    )
-
-                    db.add(encrypted_file_record)
-                    db.commit()
-                    db.refresh(encrypted_file_record)
-
-                    return {
-                        "status": "success",
-                        "storage": "supabase",
-                        "file_id": encrypted_file_record.id,
-                        "original_name": encrypted_file_record.original_filename,
-                        "size": encrypted_file_record.file_size,
-                        "encrypted_at": encrypted_file_record.created_at.isoformat()
-                    }
-
-                except Exception as supabase_error:
-                    # Log the error and fall back to /tmp storage
-                    print(f"Supabase upload failed: {str(supabase_error)}. Falling back to /tmp storage.")
-
-                    # Continue to fallback logic below
-
-        # 4. Fallback to /tmp (ephemeral storage)
-        # Move the encrypted file to a final location in temp with user context
-        final_path = TEMP_DIR / f"final_{user.id}_{file.filename}"
-        shutil.move(str(encrypted_temp_path), str(final_path))
-
-        # Store metadata in our database
-        from ..models.encrypted_file import EncryptedFile
-        import os
-
-        file_size = os.path.getsize(final_path)
+                await vault_service.get_storage(record).delete(record.encrypted_path)
+            except StorageError:
+                pass
+        raise HTTPException(status_code=500, detail=f"Recording the batch failed: {str(e)}")
+
+    results = []
+    for file, outcome in zip(files, outcomes):
+        if isinstance(outcome, str):
+            results.append({"status": "error", "original_name": file.filename, "detail": outcome})
+        else:
+            results.append(_stored_file_result(*outcome))
+
+    elapsed = time.perf_counter() - started
+    bytes_processed = sum(encryptor.bytes_in for _, encryptor in stored)
+    return {
+        "status": "success" if len(stored) == len(files) else ("partial" if stored else "failed"),
+        "stored": len(stored),
+        "failed": len(files) - len(stored),
+        "files": results,
+        "bytes_processed": bytes_processed,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_bytes_per_second": int(bytes_processed / elapsed) if elapsed > 0 else None,
+        "files_per_second": round(len(stored) / elapsed, 2) if elapsed > 0 else None,
+    }
+
+
+async def _encrypt_upload(file: UploadFile, user_id: str, kek: bytes) -> Tuple[EncryptedFile, StreamEncryptor]:
+    """
+    Encrypt an upload under a fresh data key and stream it to storage.
+
+    The primary storage backend is tried first, falling back to local /tmp storage.
+    Returns the (unsaved) file record and the encryptor with the byte counts.
+    """
+    locations = get_upload_locations()
+    for location in locations:
+        storage = get_storage_backend(location)
+        storage_key = _storage_key(location, user_id, file.filename)
+
+        # Single pass: read the upload in chunks, encrypt, stream the container to the backend.
+        # A retry starts from the beginning of the upload with a fresh data key.
+        data_key, key_id, wrapped_key = new_wrapped_data_key(kek, user_id)
+        encryptor = StreamEncryptor.for_data_key(data_key, key_id)
+        await file.seek(0)
+        try:
+            await storage.put(storage_key, aiter_encrypt(_iter_upload(file), encryptor))
+        except CryptoExecutorSaturated:
+            raise
+        except Exception as storage_error:
+            if location == locations[-1]:
+                raise
+            # Log the error and fall back to the next backend
+            print(f"{location} upload failed: {str(storage_error)}. Falling back to {locations[-1]} storage.")
+            continue
 
         encrypted_file_record = EncryptedFile(
-            user_id=user.id,
+            user_id=user_id,
             original_filename=file.filename,
-            file_size=file_size,
-            encrypted_path=str(final_path),  # Local temp path
-            storage_location="local",  # Indicate where the file is stored
-            algorithm_version="AES-128-Fernet-PBKDF2"
+            file_size=encryptor.bytes_in,
+            encrypted_path=storage_key,
+            storage_location=location,  # Indicate where the file is stored
+            algorithm_version=ENVELOPE_ALGORITHM_VERSION,
+            wrapped_key=wrapped_key,
+            key_id=key_id.hex()
         )
-
-        db.add(encrypted_file_record)
-        db.commit()
-        db.refresh(encrypted_file_record)
-
-        return {
+        return encrypted_file_record, encryptor
+
+
+def _stored_file_result(encrypted_file_record: EncryptedFile, encryptor: StreamEncryptor) -> dict:
+    response = {
+        "status": "success",
+        "storage": encrypted_file_record.storage_location,
+        "file_id": encrypted_file_record.id,
+        "original_name": encrypted_file_record.original_filename,
+        "size": encrypted_file_record.file_size,
+        "bytes_processed": encryptor.bytes_in,
+        "encrypted_size": encryptor.bytes_out,
+        "encrypted_at": encrypted_file_record.created_at.isoformat()
+    }
+    if encrypted_file_record.storage_location == "local":
+        response.update({
             "status": "warning",
             "storage": "ephemeral_tmp",
             "message": "File saved to /tmp but will be deleted on next deploy/restart. Supabase upload failed, using fallback storage.",
-            "file_id": encrypted_file_record.id,
-            "original_name": encrypted_file_record.original_filename,
-            "size": encrypted_file_record.file_size,
-            "encrypted_at": encrypted_file_record.created_at.isoformat()
-        }
+        })
+    return response
 
-    except HTTPException:
-        # Re-raise HTTP exceptions as-is
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"File processing failed: {str(e)}")
 
-    finally:
-        # Import os module locally to ensure it's available
-        import os
-        # Cleanup raw file
-        if local_temp_path and local_temp_path.exists():
-            os.remove(local_temp_path)
-        # Only remove encrypted file if it still exists (wasn't moved/uploaded)
-        if encrypted_temp_path and encrypted_temp_path.exists():
-            os.remove(encrypted_temp_path)
+def _upload_size(file: UploadFile) -> int:
+    # Seek to end to get file size, then reset to beginning
+    file.file.seek(0, 2)
+    size = file.file.tell()
+    file.file.seek(0)
+    return size
+
+
+def _storage_key(location: str, user_id: str, filename: str) -> str:
+    """
+    Return a new, unique key to store an upload under in the given backend.
+
+    Every upload gets its own key, so storing a file never overwrites an
+    existing one with the same name.
+    """
+    unique = uuid.uuid4().hex
+    if location == "local":
+        # Ephemeral storage in the temp directory (always writable on Render Free tier)
+        return str(TEMP_DIR / f"final_{user_id}_{unique}_{filename}")
+    # Object stores use a path that includes the user ID for organization
+    return f"encrypted/{user_id}/{unique}/{filename}"
+
+
+async def _iter_upload(file: UploadFile) -> AsyncIterator[bytes]:
+    while True:
+        chunk = await file.read(DEFAULT_STREAM_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
 
 
 class DecryptRequest(BaseModel):
@@ -253,16 +291,18 @@ class DecryptRequest(BaseModel):
 
 
 @router.post("/decrypt/{file_id}")
-def decrypt_file(
+async def decrypt_file(
     file_id: str,
     request: DecryptRequest,
+    range: Optional[str] = Header(None),
+    if_range: Optional[str] = Header(None),
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user_service = UserService(db)
-    vault_service = VaultService(db)
+    user_service = AsyncUserService(db)
+    vault_service = AsyncVaultService(db)
 
-    user = user_service.get_current_user(credentials.credentials)
+    user = await user_service.get_current_principal(credentials.credentials)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -270,15 +310,17 @@ def decrypt_file(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    result = vault_service.decrypt_file(file_id, user.id, request.password)
+    try:
+        result = await vault_service.open_decrypted_download(file_id, user.id, request.password, range, if_range)
+    except RangeNotSatisfiable as e:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable",
+                            headers={"Content-Range": f"bytes */{e.size}"})
 
     if not result:
         raise HTTPException(status_code=404, detail="File not found, access denied, or decryption failed")
 
-    decrypted_data, original_filename = result
-
     # Determine the media type based on file extension
-    file_extension = original_filename.lower().split('.')[-1]
+    file_extension = result.original_filename.lower().split('.')[-1]
     media_types = {
         'txt': 'text/plain',
         'pdf': 'application/pdf',
@@ -290,29 +332,120 @@ def decrypt_file(
 
     media_type = media_types.get(file_extension, 'application/octet-stream')
 
-    # Create a generator to stream the file content
-    def iterfile():
-        yield decrypted_data
+    headers = {
+        "Content-Disposition": f"attachment; filename*=UTF-8''{result.original_filename}",
+        "ETag": result.etag,
+        "Accept-Ranges": "bytes" if result.accept_ranges else "none",
+    }
+    status_code = 200
+    if result.byte_range is not None:
+        start, end = result.byte_range
+        headers["Content-Range"] = content_range(start, end, result.size)
+        headers["Content-Length"] = str(end - start + 1)
+        status_code = 206
+
+    # Plaintext is decrypted segment by segment as the response is sent
+    return StreamingResponse(result.chunks, status_code=status_code, media_type=media_type, headers=headers)
+
+
+class ArchiveRequest(BaseModel):
+    file_ids: Union[List[str], Literal["all"]] = "all"
+    password: Optional[str] = None
+    decrypt: bool = True
+
+
+@router.post("/archive")
+async def download_archive(
+    request: ArchiveRequest,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+):
+    user_service = AsyncUserService(db)
+    vault_service = AsyncVaultService(db)
+
+    user = await user_service.get_current_principal(credentials.credentials)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if request.decrypt and not request.password:
+        raise HTTPException(status_code=400, detail="A password is required to decrypt the files")
 
-    # Return the file as a streaming response with the original filename
+    file_ids = None if request.file_ids == "all" else request.file_ids
+    try:
+        entries = await vault_service.open_archive(user.id, file_ids, request.password, request.decrypt)
+    except StreamDecryptionError:
+        raise HTTPException(status_code=400, detail="Failed to decrypt files. Incorrect password.")
+
+    if entries is None:
+        raise HTTPException(status_code=404, detail="No files found")
+
+    # The archive is assembled while it is sent; files that cannot be read are listed in ERRORS.txt
+    archive_name = f"securevault-{datetime.utcnow():%Y%m%d-%H%M%S}{'' if request.decrypt else '-encrypted'}.zip"
     return StreamingResponse(
-        iterfile(),
-        media_type=media_type,
-        headers={
-            "Content-Disposition": f"attachment; filename*=UTF-8''{original_filename}",
-        }
+        aiter_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{archive_name}"},
     )
 
 
-@router.get("/files", response_model=List[FileMetadataResponse])
-def list_files(
+class RewrapKeysRequest(BaseModel):
+    old_password: str
+    new_password: str
+
+
+@router.post("/rewrap-keys")
+def rewrap_keys(
+    request: RewrapKeysRequest,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
     user_service = UserService(db)
     vault_service = VaultService(db)
+
+    user = user_service.get_current_principal(credentials.credentials)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    try:
+        rewrapped, skipped = vault_service.rewrap_file_keys(user.id, request.old_password, request.new_password)
+    except StreamDecryptionError:
+        raise HTTPException(status_code=403, detail="Incorrect old password")
+
+    return {
+        "message": "File keys re-wrapped successfully",
+        "rewrapped": rewrapped,
+        "skipped": skipped
+    }
+
+
+@router.get("/files", response_model=List[FileMetadataResponse])
+async def list_files(
+    response: Response,
+    limit: int = Query(settings.file_list_default_limit, ge=1, le=settings.file_list_max_limit),
+    cursor: Optional[str] = None,
+    sort: Literal["created_at", "size", "name"] = "created_at",
+    order: Literal["asc", "desc"] = "desc",
+    name_prefix: Optional[str] = None,
+    min_size: Optional[int] = Query(None, ge=0),
+    max_size: Optional[int] = Query(None, ge=0),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    include_total: bool = False,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+):
+    user_service = AsyncUserService(db)
+    vault_service = AsyncVaultService(db)
     
-    user = user_service.get_current_user(credentials.credentials)
+    user = await user_service.get_current_principal(credentials.credentials)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -320,22 +453,45 @@ def list_files(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    files = vault_service.list_user_files(user.id)
+    try:
+        page = await vault_service.list_user_files_page_async(
+            user.id,
+            limit,
+            cursor=cursor,
+            sort=sort,
+            order=order,
+            name_prefix=name_prefix,
+            min_size=min_size,
+            max_size=max_size,
+            created_after=created_after,
+            created_before=created_before,
+            include_total=include_total,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Pagination metadata travels in headers so the body stays a plain list
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    if page.total is not None:
+        response.headers["X-Total-Count"] = str(page.total)
     
-    response = []
-    for file in files:
-        response.append({
+    response_items = []
+    for file in page.items:
+        response_items.append({
             "file_id": file.id,
             "original_name": file.original_filename,
             "size": file.file_size,
             "encrypted_at": file.created_at.isoformat()
         })
     
-    return response
+    return response_items
 
 
+# A plain def, like rewrap-keys: the sync session queries, temp file I/O and decryption
+# run in Starlette's threadpool instead of on the event loop
 @router.post("/decrypt-local")
-async def decrypt_local_file(
+def decrypt_local_file(
     file: UploadFile = File(...),
     password: str = Form(...),
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -343,7 +499,7 @@ async def decrypt_local_file(
 ):
     user_service = UserService(db)
 
-    user = user_service.get_current_user(credentials.credentials)
+    user = user_service.get_current_principal(credentials.credentials)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -358,14 +514,22 @@ async def decrypt_local_file(
     # Save uploaded encrypted file temporarily
     temp_file_path = os.path.join(temp_dir, f"temp_decrypt_{user.id}_{file.filename}")
     with open(temp_file_path, "wb") as buffer:
-        buffer.write(await file.read())
+        shutil.copyfileobj(file.file, buffer)
 
     try:
-        # Attempt to decrypt the file using the provided password
-        from ..utils.encryption_utils import decrypt_file_to_bytes
+        # Attempt to decrypt the file using the provided password; envelope files are
+        # matched to their wrapped data key through the key ID in the container header
+        plaintext_chunks = VaultService(db).iter_decrypt_uploaded_file(user.id, temp_file_path, password)
 
-        # Decrypt the file and get the data
-        decrypted_data = decrypt_file_to_bytes(temp_file_path, password)
+        # Decrypt the file and get the data (on the crypto executor)
+        decrypted_data = None
+        if plaintext_chunks is not None:
+            try:
+                decrypted_data = get_crypto_executor().call(b"".join, plaintext_chunks)
+            except CryptoExecutorSaturated:
+                raise
+            except Exception as decrypt_error:
+                print(f"Decryption failed with error: {str(decrypt_error)}")
 
         if decrypted_data is None:
             raise HTTPException(status_code=400, detail="Failed to decrypt file. Incorrect password or corrupted file.")
@@ -401,6 +565,10 @@ async def decrypt_local_file(
                 "Content-Disposition": f"attachment; filename*=UTF-8''{original_filename}",
             }
         )
+    except (HTTPException, CryptoExecutorSaturated):
+        if os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
+        raise
     except Exception as e:
         # Clean up temporary file in case of error
         if os.path.exists(temp_file_path):
@@ -409,15 +577,17 @@ async def decrypt_local_file(
 
 
 @router.get("/download-encrypted/{file_id}")
-def download_encrypted_file(
+async def download_encrypted_file(
     file_id: str,
+    range: Optional[str] = Header(None),
+    if_range: Optional[str] = Header(None),
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user_service = UserService(db)
-    vault_service = VaultService(db)
+    user_service = AsyncUserService(db)
+    vault_service = AsyncVaultService(db)
 
-    user = user_service.get_current_user(credentials.credentials)
+    user = await user_service.get_current_principal(credentials.credentials)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -426,87 +596,169 @@ def download_encrypted_file(
         )
 
     # Verify the file belongs to the user
-    encrypted_file = (
-        db.query(EncryptedFile)
-        .filter(EncryptedFile.id == file_id, EncryptedFile.user_id == user.id)
-        .first()
-    )
+    encrypted_file = await vault_service.get_user_file(file_id, user.id)
 
     if not encrypted_file:
         raise HTTPException(status_code=404, detail="File not found or access denied")
 
-    # Check if the encrypted file is stored in Supabase
-    if encrypted_file.storage_location == "supabase":
-        # The encrypted_path is the path in the Supabase bucket
-        actual_path = encrypted_file.encrypted_path
+    # Stream the container from whichever backend holds it
+    storage = vault_service.get_storage(encrypted_file)
+    try:
+        info = await storage.stat(encrypted_file.encrypted_path)
+    except StorageError as e:
+        print(f"Error reading from {encrypted_file.storage_location} storage: {str(e)}")
+        info = None
+
+    if info is None:
+        raise HTTPException(status_code=404, detail="Encrypted file does not exist in storage")
+
+    # Return the encrypted file as a streaming response with a .enc extension
+    encrypted_filename = f"{encrypted_file.original_filename}.enc"
+    headers = {
+        "Content-Disposition": f"attachment; filename*=UTF-8''{encrypted_filename}",
+        "Accept-Ranges": "bytes",
+    }
+    if info.etag:
+        headers["ETag"] = info.etag
 
-        # Download the file from Supabase
-        try:
-            from supabase import create_client
-            from ..config.settings import settings
-            import tempfile
-            import os
+    try:
+        byte_range = resolve_range(range, if_range, info.etag, info.size)
+    except RangeNotSatisfiable:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable",
+                            headers={"Content-Range": f"bytes */{info.size}"})
+
+    # Resumed downloads only read the requested bytes from the backend
+    if byte_range is not None:
+        start, end = byte_range
+        headers["Content-Range"] = content_range(start, end, info.size)
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            storage.get(encrypted_file.encrypted_path, start, end - start + 1),
+            status_code=206,
+            media_type='application/octet-stream',
+            headers=headers,
+        )
 
-            SUPABASE_URL = settings.supabase_url if settings.supabase_url else os.getenv("SUPABASE_URL", "")
-            SUPABASE_KEY = settings.supabase_key if settings.supabase_key else os.getenv("SUPABASE_KEY", "")
+    headers["Content-Length"] = str(info.size)
+    return StreamingResponse(
+        storage.get(encrypted_file.encrypted_path),
+        media_type='application/octet-stream',
+        headers=headers,
+    )
 
-            if not SUPABASE_URL or not SUPABASE_KEY:
-                raise HTTPException(status_code=500, detail="Supabase configuration not found")
 
-            supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+@router.delete("/file/{file_id}")
+async def delete_file(
+    file_id: str,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+):
+    user_service = AsyncUserService(db)
+    vault_service = AsyncVaultService(db)
 
-            # Download the file from Supabase
-            response = supabase.storage.from_(settings.bucket_name).download(actual_path)
+    user = await user_service.get_current_principal(credentials.credentials)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
 
-            # Create a generator to stream the downloaded content
-            def iterfile():
-                yield response
+    success = await vault_service.delete_file(file_id, user.id)
 
-            # Return the encrypted file as a streaming response with a .enc extension
-            encrypted_filename = f"{encrypted_file.original_filename}.enc"
+    if not success:
+        raise HTTPException(status_code=404, detail="File not found or access denied")
 
-            return StreamingResponse(
-                iterfile(),
-                media_type='application/octet-stream',
-                headers={
-                    "Content-Disposition": f"attachment; filename*=UTF-8''{encrypted_filename}",
-                }
-            )
-        except Exception as e:
-            print(f"Error downloading from Supabase: {str(e)}")
-            raise HTTPException(status_code=404, detail="Encrypted file does not exist in storage")
-    else:
-        # Check if the encrypted file exists on disk (local storage)
-        if not os.path.exists(encrypted_file.encrypted_path):
-            raise HTTPException(status_code=404, detail="Encrypted file does not exist on disk")
-
-        # Create a generator to stream the encrypted file content
-        def iterfile():
-            with open(encrypted_file.encrypted_path, 'rb') as file:
-                yield from file
+    return {"message": "File deleted successfully"}
 
-        # Return the encrypted file as a streaming response with a .enc extension
-        encrypted_filename = f"{encrypted_file.original_filename}.enc"
 
-        return StreamingResponse(
-            iterfile(),
-            media_type='application/octet-stream',
-            headers={
-                "Content-Disposition": f"attachment; filename*=UTF-8''{encrypted_filename}",
-            }
+class CreateUploadRequest(BaseModel):
+    filename: str
+    size: int
+    password: str
+
+
+def _upload_status(session) -> dict:
+    return {
+        "upload_id": session.id,
+        "filename": session.original_filename,
+        "size": session.total_size,
+        "offset": session.received_size,
+        "chunk_size": session.chunk_size,
+        "max_chunk_size": settings.upload_max_chunk_size,
+        "status": session.status,
+        "file_id": session.file_id,
+        "expires_at": session.expires_at.isoformat()
+    }
+
+
+async def _get_upload_session(upload_id: str, user: User, db: AsyncSession):
+    session = await AsyncUploadService(db).get_session(upload_id, user.id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found or access denied")
+    return session
+
+
+@router.post("/uploads", status_code=201)
+async def create_upload(
+    request: CreateUploadRequest,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+):
+    user_service = AsyncUserService(db)
+    user = await user_service.get_current_principal(credentials.credentials)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
         )
 
+    if request.size > settings.max_upload_size:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large. Maximum size is {settings.max_upload_size // (1024*1024)}MB"
+        )
 
-@router.delete("/file/{file_id}")
-def delete_file(
-    file_id: str,
+    try:
+        session = await AsyncUploadService(db).create_session(user.id, request.filename, request.size, request.password)
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return _upload_status(session)
+
+
+@router.get("/uploads/{upload_id}")
+async def get_upload(
+    upload_id: str,
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user_service = UserService(db)
-    vault_service = VaultService(db)
+    user_service = AsyncUserService(db)
+    user = await user_service.get_current_principal(credentials.credentials)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    # Clients resume from the returned offset
+    return _upload_status(await _get_upload_session(upload_id, user, db))
 
-    user = user_service.get_current_user(credentials.credentials)
+
+@router.put("/uploads/{upload_id}")
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    offset: int,
+    x_chunk_sha256: str = Header(...),
+    x_vault_password: str = Header(...),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+):
+    user_service = AsyncUserService(db)
+    user = await user_service.get_current_principal(credentials.credentials)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -514,9 +766,86 @@ def delete_file(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    success = vault_service.delete_file(file_id, user.id)
+    session = await _get_upload_session(upload_id, user, db)
 
-    if not success:
-        raise HTTPException(status_code=404, detail="File not found or access denied")
+    # Read the raw body, refusing chunks above the configured limit
+    data = bytearray()
+    async for part in request.stream():
+        data += part
+        if len(data) > settings.upload_max_chunk_size:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Chunk too large. Maximum chunk size is {settings.upload_max_chunk_size} bytes"
+            )
+
+    try:
+        session = await AsyncUploadService(db).write_chunk(session, offset, bytes(data), x_chunk_sha256, x_vault_password)
+    except UploadOffsetMismatch as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Upload-Offset": str(e.expected_offset)})
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except StreamDecryptionError:
+        raise HTTPException(status_code=403, detail="Incorrect password for this upload")
+
+    return _upload_status(session)
+
+
+@router.post("/uploads/{upload_id}/complete")
+async def complete_upload(
+    upload_id: str,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+):
+    user_service = AsyncUserService(db)
+    user = await user_service.get_current_principal(credentials.credentials)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    session = await _get_upload_session(upload_id, user, db)
+    destinations = [
+        (location, _storage_key(location, user.id, session.original_filename))
+        for location in get_upload_locations()
+    ]
+
+    try:
+        encrypted_file, location = await AsyncUploadService(db).complete(session, destinations)
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except CryptoExecutorSaturated:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"File processing failed: {str(e)}")
+
+    return {
+        "status": "success" if location != "local" else "warning",
+        "storage": location if location != "local" else "ephemeral_tmp",
+        "file_id": encrypted_file.id,
+        "original_name": encrypted_file.original_filename,
+        "size": encrypted_file.file_size,
+        "encrypted_at": encrypted_file.created_at.isoformat()
+    }
+
+
+@router.delete("/uploads/{upload_id}")
+async def abort_upload(
+    upload_id: str,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+):
+    user_service = AsyncUserService(db)
+    user = await user_service.get_current_principal(credentials.credentials)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    session = await _get_upload_session(upload_id, user, db)
+    await AsyncUploadService(db).abort(session)
 
-    return {"message": "File deleted successfully"}
\ No newline at end of file
+    return {"message": "Upload aborted"}
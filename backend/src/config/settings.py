@@ -1,24 +1,102 @@
 from pydantic_settings import BaseSettings
 import os
+import tempfile
 
 
 class Settings(BaseSettings):
     # Database settings
     database_url: str = os.getenv("DATABASE_URL", "sqlite:///./secure_data.db").strip("'\"")  # Default to SQLite for development, strip quotes if present
 
+    # Database connection pool (per worker process; total connections = workers * (size + overflow))
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+    db_pool_timeout_seconds: float = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "10"))
+    db_pool_recycle_seconds: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+    db_pool_pre_ping: bool = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+    web_concurrency: int = int(os.getenv("WEB_CONCURRENCY", "0"))  # Production worker processes; 0 = 2 * CPUs + 1
+
+    # SQLite connection pragmas
+    sqlite_journal_mode: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    sqlite_synchronous: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    sqlite_busy_timeout_ms: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+    # Audit log writer: entries are queued and inserted in batches by a background thread.
+    # "sync" callers wait for the commit; "async" callers only wait for a queue slot
+    audit_default_durability: str = os.getenv("AUDIT_DEFAULT_DURABILITY", "async")
+    audit_batch_size: int = int(os.getenv("AUDIT_BATCH_SIZE", "100"))
+    audit_flush_interval_ms: int = int(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "50"))
+    audit_queue_max_size: int = int(os.getenv("AUDIT_QUEUE_MAX_SIZE", "10000"))
+    audit_shutdown_timeout_seconds: float = float(os.getenv("AUDIT_SHUTDOWN_TIMEOUT_SECONDS", "10"))
+
+    # Audit chain verification: entries are streamed in batches, and a signed checkpoint is stored once at
+    # least AUDIT_CHECKPOINT_INTERVAL entries past the last one verify, so later runs start from there
+    audit_checkpoint_key: str = os.getenv("AUDIT_CHECKPOINT_KEY", os.getenv("JWT_SECRET_KEY", "your-fallback-secret-key"))
+    audit_checkpoint_interval: int = int(os.getenv("AUDIT_CHECKPOINT_INTERVAL", "10000"))
+    audit_verify_batch_size: int = int(os.getenv("AUDIT_VERIFY_BATCH_SIZE", "1000"))
+    audit_verify_workers: int = int(os.getenv("AUDIT_VERIFY_WORKERS", "1"))  # Processes; >1 verifies ranges in parallel
+
     # JWT settings
     jwt_secret_key: str = os.getenv("JWT_SECRET_KEY", "your-fallback-secret-key")
     jwt_algorithm: str = os.getenv("JWT_ALGORITHM", "HS256")
     access_token_expire_minutes: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    refresh_token_expire_days: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
 
     # Encryption settings
     encryption_key: str = os.getenv("ENCRYPTION_KEY", "fallback-encryption-key-for-development")
     pbkdf2_iterations: int = int(os.getenv("PBKDF2_ITERATIONS", "390000"))
 
+    # Crypto executor settings (bounded pool for PBKDF2 / AES work off the event loop)
+    crypto_max_workers: int = int(os.getenv("CRYPTO_MAX_WORKERS", str(min(4, os.cpu_count() or 1))))
+    crypto_max_queue_depth: int = int(os.getenv("CRYPTO_MAX_QUEUE_DEPTH", "32"))
+    crypto_kdf_process_pool: bool = os.getenv("CRYPTO_KDF_PROCESS_POOL", "False").lower() == "true"
+
+    # Password hashing (bcrypt) pool and cost
+    password_hash_max_workers: int = int(os.getenv("PASSWORD_HASH_MAX_WORKERS", "2"))
+    password_hash_max_queue_depth: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE_DEPTH", "16"))
+    bcrypt_rounds: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    bcrypt_target_ms: int = int(os.getenv("BCRYPT_TARGET_MS", "250"))
+    bcrypt_calibrate_on_startup: bool = os.getenv("BCRYPT_CALIBRATE_ON_STARTUP", "True").lower() == "true"
+
+    # Login throttling (token buckets per client IP and per username; 0 disables)
+    login_ip_rate_per_minute: int = int(os.getenv("LOGIN_IP_RATE_PER_MINUTE", "30"))
+    login_ip_burst: int = int(os.getenv("LOGIN_IP_BURST", "10"))
+    login_username_rate_per_minute: int = int(os.getenv("LOGIN_USERNAME_RATE_PER_MINUTE", "10"))
+    login_username_burst: int = int(os.getenv("LOGIN_USERNAME_BURST", "5"))
+    # Reverse proxies in front of the app that append to X-Forwarded-For (1 on Render; 0 trusts the peer address)
+    trusted_proxy_hops: int = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+
+    # Derived-key cache (skip repeated PBKDF2 runs for the same user/salt/password)
+    key_cache_max_entries: int = int(os.getenv("KEY_CACHE_MAX_ENTRIES", "256"))
+    key_cache_ttl_seconds: int = int(os.getenv("KEY_CACHE_TTL_SECONDS", "300"))
+
+    # Authenticated-principal cache (authorise requests without loading the user row)
+    principal_cache_max_entries: int = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+    principal_cache_ttl_seconds: int = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "30"))
+
     # File upload settings
     max_file_size: int = int(os.getenv("MAX_FILE_SIZE", str(10 * 1024 * 1024)))  # 10MB in bytes
     allowed_file_types: str = os.getenv("ALLOWED_FILE_TYPES", "image/jpeg,image/png,application/pdf,application/zip")
 
+    # Batch uploads (POST /vault/encrypt-batch): files per request, and how many are encrypted/uploaded at once
+    batch_upload_max_files: int = int(os.getenv("BATCH_UPLOAD_MAX_FILES", "100"))
+    batch_upload_concurrency: int = int(os.getenv("BATCH_UPLOAD_CONCURRENCY", "4"))
+
+    # Bulk downloads (POST /vault/archive): files fetched/decrypted ahead of the one being written,
+    # and chunks buffered per file; memory is bounded by files * chunks * 64KB
+    archive_read_ahead_files: int = int(os.getenv("ARCHIVE_READ_AHEAD_FILES", "4"))
+    archive_read_ahead_chunks: int = int(os.getenv("ARCHIVE_READ_AHEAD_CHUNKS", "8"))
+
+    # File listing page size (GET /vault/files?limit=)
+    file_list_default_limit: int = int(os.getenv("FILE_LIST_DEFAULT_LIMIT", "100"))
+    file_list_max_limit: int = int(os.getenv("FILE_LIST_MAX_LIMIT", "1000"))
+
+    # Resumable (chunked) uploads
+    max_upload_size: int = int(os.getenv("MAX_UPLOAD_SIZE", str(5 * 1024 * 1024 * 1024)))  # 5GB in bytes
+    upload_max_chunk_size: int = int(os.getenv("UPLOAD_MAX_CHUNK_SIZE", str(16 * 1024 * 1024)))
+    upload_session_ttl_seconds: int = int(os.getenv("UPLOAD_SESSION_TTL_SECONDS", str(24 * 3600)))
+    upload_gc_interval_seconds: int = int(os.getenv("UPLOAD_GC_INTERVAL_SECONDS", "900"))
+    upload_staging_path: str = os.getenv("UPLOAD_STAGING_PATH", os.path.join(tempfile.gettempdir(), "securevault_uploads"))
+
     # Storage settings
     storage_path: str = os.getenv("STORAGE_PATH", "./secure_storage")
 
@@ -38,6 +116,18 @@ class Settings(BaseSettings):
     bucket_name: str = os.getenv("BUCKET_NAME", "vaults")
     use_supabase: str = os.getenv("USE_SUPABASE", "true")
 
+    # Pooled Supabase Storage HTTP client (shared for the life of the process)
+    supabase_pool_max_connections: int = int(os.getenv("SUPABASE_POOL_MAX_CONNECTIONS", "20"))
+    supabase_pool_max_keepalive: int = int(os.getenv("SUPABASE_POOL_MAX_KEEPALIVE", "10"))
+    supabase_keepalive_expiry_seconds: float = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY_SECONDS", "30"))
+    supabase_connect_timeout_seconds: float = float(os.getenv("SUPABASE_CONNECT_TIMEOUT_SECONDS", "5"))
+    supabase_read_timeout_seconds: float = float(os.getenv("SUPABASE_READ_TIMEOUT_SECONDS", "30"))
+    supabase_write_timeout_seconds: float = float(os.getenv("SUPABASE_WRITE_TIMEOUT_SECONDS", "30"))
+    supabase_pool_timeout_seconds: float = float(os.getenv("SUPABASE_POOL_TIMEOUT_SECONDS", "5"))
+
+    # Primary backend for new uploads ("supabase", "local" or "memory"); empty picks Supabase when configured
+    storage_backend: str = os.getenv("STORAGE_BACKEND", "")
+
     class Config:
         env_file = ".env"
         env_file_encoding = 'utf-8'
@@ -1,14 +1,122 @@
+from typing import AsyncIterator, Optional, Tuple
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from .config.settings import settings
 from .models.base import Base
+from .utils.db_pool import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool, apply_sqlite_pragmas
+
+
+def _engine_options(url, pool_class) -> Tuple[dict, bool]:
+    """Pool options from Settings for a URL, and whether it is an SQLite file needing pragmas."""
+    options = {"pool_pre_ping": settings.db_pool_pre_ping}
+    pool_options = {
+        "poolclass": pool_class,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+    }
+
+    if url.get_backend_name() == "sqlite":
+        if url.database in (None, "", ":memory:"):
+            return options, False
+        options.update(pool_options, connect_args={"check_same_thread": False})
+        return options, True
+
+    options.update(pool_options, pool_recycle=settings.db_pool_recycle_seconds)
+    return options, False
+
+
+def _apply_sqlite_settings(sync_engine) -> None:
+    apply_sqlite_pragmas(
+        sync_engine, settings.sqlite_journal_mode, settings.sqlite_synchronous, settings.sqlite_busy_timeout_ms
+    )
+
+
+def create_database_engine(database_url: Optional[str] = None, **overrides):
+    """
+    Create an engine with the pool and connection settings from Settings.
+
+    Server databases get a bounded, instrumented QueuePool that pre-pings and
+    recycles connections; SQLite files get WAL and busy-timeout pragmas.
+    Keyword arguments override the corresponding create_engine options.
+    """
+    url = make_url(database_url or settings.database_url)
+    options, sqlite_file = _engine_options(url, InstrumentedQueuePool)
+    options.update(overrides)
+    engine = create_engine(url, **options)
+    if sqlite_file:
+        _apply_sqlite_settings(engine)
+    return engine
+
+
+def async_database_url(database_url: str):
+    """
+    Map a sync database URL onto its async driver: asyncpg for PostgreSQL, aiosqlite for SQLite.
+
+    asyncpg takes ``ssl`` rather than libpq's ``sslmode``, so that query parameter is renamed.
+    """
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    if backend == "postgresql":
+        query = dict(url.query)
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        return url.set(drivername="postgresql+asyncpg", query=query)
+    return url
+
+
+def create_async_database_engine(database_url: Optional[str] = None, **overrides) -> AsyncEngine:
+    """Async counterpart of create_database_engine(), with the same pool settings and pragmas."""
+    url = async_database_url(database_url or settings.database_url)
+    options, sqlite_file = _engine_options(url, InstrumentedAsyncAdaptedQueuePool)
+    options.pop("connect_args", None)
+    options.update(overrides)
+    engine = create_async_engine(url, **options)
+    if sqlite_file:
+        _apply_sqlite_settings(engine.sync_engine)
+    return engine
+
 
 # Create the database engine
-engine = create_engine(settings.database_url)
+engine = create_database_engine()
 
 # Create a session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for the API routes; created on first use so the scripts in backend/
+# (which only use the sync engine) do not need an async driver installed
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_database_engine()
+    return _async_engine
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    """Open a new AsyncSession on the shared async engine."""
+    global _async_session_factory
+    if _async_session_factory is None:
+        # Attributes stay loaded after commit: an expired attribute would need implicit (sync) I/O
+        _async_session_factory = async_sessionmaker(get_async_engine(), autoflush=False, expire_on_commit=False)
+    return _async_session_factory()
+
+
+async def dispose_async_engine() -> None:
+    """Close the async engine's connections (called on application shutdown)."""
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_session_factory = None
+
 
 def register_models():
     """Function to register all models with SQLAlchemy"""
@@ -26,4 +134,10 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Dependency to get an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
\ No newline at end of file
@@ -5,13 +5,18 @@ from .models.encrypted_file import EncryptedFile
 from .models.file_metadata import FileMetadata
 from .models.vault import Vault
 from .models.audit_log_entry import AuditLogEntry
+from .models.upload_session import UploadSession
 
 # Explicitly configure mappers to ensure all relationships are resolved
 from sqlalchemy.orm import configure_mappers
 configure_mappers()
 
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from .api.auth_routes import router as auth_router
 from .api.vault_routes import router as vault_router
@@ -24,7 +29,73 @@ from .config.settings import settings
 print(f"VAULTS_PATH = {settings.vaults_path}")
 print(f"SECURE_DATA_PATH = {settings.secure_data_path}")
 
-app = FastAPI(title="SecureVault API", version="1.0.0")
+from .database import AsyncSessionLocal, dispose_async_engine, engine
+from .services.audit_log_service import shutdown_audit_chain_writers
+from .services.upload_service import AsyncUploadService
+from .storage import close_supabase_client_manager, get_supabase_client_manager, supabase_enabled
+from .utils.crypto_executor import CryptoExecutorSaturated, get_password_executor, shutdown_crypto_executor
+from .utils.password_utils import calibrate_bcrypt_rounds
+
+
+async def collect_expired_uploads_periodically(interval_seconds: int):
+    """Expire abandoned resumable uploads and delete their staged ciphertext."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            async with AsyncSessionLocal() as db:
+                expired = await AsyncUploadService(db).collect_expired()
+            if expired:
+                print(f"Expired {expired} abandoned upload session(s)")
+        except Exception as e:
+            print(f"Upload garbage collection failed: {str(e)}")
+
+
+async def report_bcrypt_calibration():
+    """Time bcrypt at the configured cost and log the rounds that fit BCRYPT_TARGET_MS."""
+    try:
+        report = await get_password_executor().run(
+            calibrate_bcrypt_rounds, settings.bcrypt_target_ms, settings.bcrypt_rounds
+        )
+        print(
+            f"bcrypt: {report['measured_ms']}ms per hash at {report['current_rounds']} rounds; "
+            f"{report['recommended_rounds']} rounds fits the {report['target_ms']}ms target"
+        )
+    except Exception as e:
+        print(f"bcrypt calibration failed: {str(e)}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Never reuse connections inherited from a preloading parent process (gunicorn --preload)
+    engine.dispose(close=False)
+    # One pooled Supabase client for the whole process
+    if supabase_enabled():
+        await get_supabase_client_manager().start()
+    if settings.bcrypt_calibrate_on_startup:
+        await report_bcrypt_calibration()
+    upload_gc = None
+    if settings.upload_gc_interval_seconds > 0:
+        upload_gc = asyncio.create_task(collect_expired_uploads_periodically(settings.upload_gc_interval_seconds))
+    yield
+    if upload_gc is not None:
+        upload_gc.cancel()
+    await close_supabase_client_manager()
+    await dispose_async_engine()
+    shutdown_audit_chain_writers()
+    # Let in-flight crypto work finish before the worker exits
+    shutdown_crypto_executor()
+
+
+app = FastAPI(title="SecureVault API", version="1.0.0", lifespan=lifespan)
+
+
+@app.exception_handler(CryptoExecutorSaturated)
+async def crypto_executor_saturated_handler(request: Request, exc: CryptoExecutorSaturated):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy processing other encryption requests. Please retry shortly."},
+        headers={"Retry-After": "1"},
+    )
 
 # Add CORS middleware to allow requests from the frontend
 # Allow both the configured frontend URL and common local development origins
@@ -53,6 +124,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let the frontend read download metadata (filenames, partial-content ranges)
+    expose_headers=["Content-Disposition", "Content-Range", "Accept-Ranges", "ETag", "X-Next-Cursor", "X-Total-Count"],
 )
 
 # Include routers
@@ -62,4 +135,13 @@ app.include_router(admin_router, prefix="/admin", tags=["admin"])
 
 @app.get("/")
 def read_root():
-    return {"message": "Welcome to SecureVault API"}
\ No newline at end of file
+    return {"message": "Welcome to SecureVault API"}
+
+
+@app.get("/health")
+async def health_check():
+    storage = {"supabase": "disabled"}
+    if supabase_enabled():
+        storage["supabase"] = await get_supabase_client_manager().health_check()
+    healthy = all(value == "disabled" or value["status"] == "ok" for value in storage.values())
+    return {"status": "ok" if healthy else "degraded", "storage": storage}
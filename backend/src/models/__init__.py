@@ -9,11 +9,17 @@ from .encrypted_file import EncryptedFile
 from .file_metadata import FileMetadata
 from .vault import Vault
 from .audit_log_entry import AuditLogEntry
+from .audit_checkpoint import AuditCheckpoint
+from .audit_tree_node import AuditTreeNode
+from .upload_session import UploadSession
 
 __all__ = [
     "User",
     "EncryptedFile",
     "FileMetadata",
     "Vault",
-    "AuditLogEntry"
+    "AuditLogEntry",
+    "AuditCheckpoint",
+    "AuditTreeNode",
+    "UploadSession"
 ]
\ No newline at end of file
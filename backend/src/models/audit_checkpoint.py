@@ -0,0 +1,14 @@
+from sqlalchemy import BigInteger, Column, String, DateTime
+from sqlalchemy.sql import func
+from .base import Base
+import uuid
+
+
+class AuditCheckpoint(Base):
+    __tablename__ = "audit_checkpoints"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    sequence = Column(BigInteger, nullable=False, unique=True)  # Audit chain position verified up to
+    entry_hash = Column(String(64), nullable=False)  # Hash of the entry at that position
+    signature = Column(String(64), nullable=False)  # HMAC-SHA256 of sequence and hash with AUDIT_CHECKPOINT_KEY
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
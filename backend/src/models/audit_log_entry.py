@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import BigInteger, Column, String, DateTime, ForeignKey, Index, Text, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import Base
@@ -7,6 +7,13 @@ import uuid
 
 class AuditLogEntry(Base):
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        # Chain head / full-log scans order by timestamp; per-user history filters first
+        Index("ix_audit_logs_timestamp", "timestamp"),
+        Index("ix_audit_logs_user_id_timestamp", "user_id", "timestamp"),
+        # One entry per chain position: a second writer appending at the same position fails
+        UniqueConstraint("sequence", name="uq_audit_logs_sequence"),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String, ForeignKey("users.id"), nullable=True)  # Nullable for system events
@@ -15,6 +22,8 @@ class AuditLogEntry(Base):
     result = Column(String, nullable=False)  # 'success' or 'failure'
     details = Column(JSON, nullable=True)
     previous_hash = Column(String, nullable=True)  # For chain integrity
+    sequence = Column(BigInteger, nullable=True)  # Position in the hash chain, 1 for the first entry
+    entry_hash = Column(String(64), nullable=True)  # Hash of this entry (the next entry's previous_hash)
 
     # Relationship
     user = relationship("User", back_populates="audit_logs", lazy="select")
\ No newline at end of file
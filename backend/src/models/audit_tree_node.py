@@ -0,0 +1,11 @@
+from sqlalchemy import BigInteger, Column, Integer, String
+from .base import Base
+
+
+class AuditTreeNode(Base):
+    """A perfect subtree of the Merkle tree over the audit chain (see utils.merkle)."""
+    __tablename__ = "audit_tree_nodes"
+
+    level = Column(Integer, primary_key=True)  # 0 for leaves; covers 2**level entries
+    position = Column(BigInteger, primary_key=True)  # Covers entries position * 2**level + 1 onwards (sequence numbers)
+    hash = Column(String(64), nullable=False)  # Hex SHA-256
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, String, BigInteger, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import Base
@@ -7,15 +7,21 @@ import uuid
 
 class EncryptedFile(Base):
     __tablename__ = "encrypted_files"
+    __table_args__ = (
+        # Per-user listings in upload order; also serves lookups by (id, user_id) through the user prefix
+        Index("ix_encrypted_files_user_id_created_at", "user_id", "created_at", "id"),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
     original_filename = Column(String, nullable=False)
-    file_size = Column(Integer, nullable=False)
+    file_size = Column(BigInteger, nullable=False)
     encrypted_path = Column(String, nullable=False)
     storage_location = Column(String, default="local", nullable=False)  # 'local' or 'supabase'
     encryption_timestamp = Column(DateTime(timezone=True), server_default=func.now())
     algorithm_version = Column(String, nullable=False)
+    wrapped_key = Column(String, nullable=True)  # Per-file data key wrapped with the user's KEK (envelope files only)
+    key_id = Column(String, nullable=True)  # Hex key identifier from the container header (envelope files only)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
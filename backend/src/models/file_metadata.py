@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, String, BigInteger, DateTime, ForeignKey
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import Base
@@ -9,9 +9,9 @@ class FileMetadata(Base):
     __tablename__ = "file_metadata"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    file_id = Column(String, ForeignKey("encrypted_files.id"), nullable=False)
+    file_id = Column(String, ForeignKey("encrypted_files.id"), nullable=False, index=True)
     original_filename = Column(String, nullable=False)
-    file_size = Column(Integer, nullable=False)
+    file_size = Column(BigInteger, nullable=False)
     encryption_timestamp = Column(DateTime(timezone=True), server_default=func.now())
     algorithm_version = Column(String, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
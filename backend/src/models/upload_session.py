@@ -0,0 +1,28 @@
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from .base import Base
+import uuid
+
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+    __table_args__ = (
+        # Garbage collection looks up active sessions past their deadline
+        Index("ix_upload_sessions_status_expires_at", "status", "expires_at"),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
+    original_filename = Column(String, nullable=False)
+    total_size = Column(BigInteger, nullable=False)  # Declared plaintext size
+    received_size = Column(BigInteger, default=0, nullable=False)  # Plaintext bytes encrypted and persisted so far
+    chunk_size = Column(Integer, nullable=False)  # Container segment size; non-final chunks must be multiples of it
+    header = Column(String, nullable=False)  # Hex container header (key ID and nonce prefix)
+    wrapped_key = Column(String, nullable=False)  # Per-file data key wrapped with the user's KEK
+    key_id = Column(String, nullable=False)
+    staging_path = Column(String, nullable=False)  # Local file the ciphertext is appended to
+    status = Column(String, default="active", nullable=False)  # 'active', 'completing', 'completed', 'failed', 'aborted' or 'expired'
+    file_id = Column(String, ForeignKey("encrypted_files.id"), nullable=True)  # Set once the upload is completed
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Enum as SQLEnum
+from sqlalchemy import Column, String, DateTime, Integer, Enum as SQLEnum
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from enum import Enum
@@ -25,6 +25,8 @@ class User(Base):
     salt = Column(String, nullable=False)
     role = Column(SQLEnum(UserRole), default=UserRole.USER)
     status = Column(SQLEnum(UserStatus), default=UserStatus.ACTIVE)
+    # Bumped whenever role or status changes; tokens carrying an older version are rejected
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import Base
@@ -7,9 +7,15 @@ import uuid
 
 class Vault(Base):
     __tablename__ = "vaults"
+    __table_args__ = (
+        # One vault (and so one KEK salt) per user
+        UniqueConstraint("user_id", name="uq_vaults_user_id"),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    kek_salt = Column(String, nullable=True)  # Hex salt for deriving the user's key-encryption key
+    kek_iterations = Column(Integer, nullable=True)  # PBKDF2 iterations for the key-encryption key
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationship
@@ -89,7 +89,7 @@ class AdminService:
 
         # Promote the user
         user.role = UserRole.ADMIN
-        self.db_session.commit()
+        self.user_service.bump_token_version(user)
 
         # Log the action if audit service is available
         if self.audit_log_service:
@@ -100,7 +100,9 @@ class AdminService:
                 details={
                     "target_user_id": user_id,
                     "target_username": user.username
-                }
+                },
+                # Role changes are security-critical: wait until the entry is committed
+                durability="sync"
             )
 
         return True
@@ -132,7 +134,7 @@ class AdminService:
 
         # Demote the admin
         admin_to_demote.role = UserRole.USER
-        self.db_session.commit()
+        self.user_service.bump_token_version(admin_to_demote)
 
         # Log the action if audit service is available
         if self.audit_log_service:
@@ -143,7 +145,8 @@ class AdminService:
                 details={
                     "target_user_id": user_id,
                     "target_username": admin_to_demote.username
-                }
+                },
+                durability="sync"
             )
 
         return True
\ No newline at end of file
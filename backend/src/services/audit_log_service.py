@@ -1,124 +1,628 @@
 import hashlib
+import hmac
 import json
-from datetime import datetime
-from typing import Dict, Any, Optional
-from sqlalchemy.orm import Session
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timezone
+from itertools import repeat
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
+from sqlalchemy import create_engine, func, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
+from ..models.audit_checkpoint import AuditCheckpoint
 from ..models.audit_log_entry import AuditLogEntry
+from ..models.audit_tree_node import AuditTreeNode
 from ..models.user import User
+from ..utils import merkle
+from ..config.settings import settings
+
+
+def _entry_string(log_entry: AuditLogEntry, timestamp) -> str:
+    return (
+        f"{log_entry.id}|"
+        f"{log_entry.user_id}|"
+        f"{log_entry.action_type}|"
+        f"{log_entry.result}|"
+        f"{timestamp}|"
+        f"{json.dumps(log_entry.details, sort_keys=True) if log_entry.details else ''}|"
+        f"{log_entry.previous_hash or ''}"
+    )
+
+
+def calculate_entry_hash(log_entry: AuditLogEntry) -> str:
+    """
+    Calculate the hash for an audit log entry.
+
+    The timestamp is hashed as naive UTC, so the hash is the same whether the
+    database hands it back with or without a time zone.
+
+    Args:
+        log_entry: The audit log entry to hash
+
+    Returns:
+        The calculated hash
+    """
+    timestamp = log_entry.timestamp
+    if timestamp is not None and timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return hashlib.sha256(_entry_string(log_entry, timestamp).encode('utf-8')).hexdigest()
+
+
+def _hash_matches(log_entry: AuditLogEntry) -> bool:
+    if log_entry.entry_hash == calculate_entry_hash(log_entry):
+        return True
+    # Entries chained before entry_hash was stored hashed the timestamp as loaded (see migration 006)
+    legacy_hash = hashlib.sha256(_entry_string(log_entry, log_entry.timestamp).encode('utf-8')).hexdigest()
+    return log_entry.entry_hash == legacy_hash
+
+
+AUDIT_DURABILITY_MODES = ("sync", "async")
+
+# Queue item asking the writer to resolve a future once everything queued before it is written
+_FLUSH = object()
+
+
+class AuditChainWriter:
+    """
+    Appends entries to the audit hash chain from a single background writer thread.
+
+    Entries go through a bounded in-process queue. The writer drains it in
+    batches: it computes the chain for the batch in order and inserts it in one
+    transaction. The chain head (last sequence number and entry hash) is kept in
+    memory, so there is no read before the write, and appends from one process
+    never race. Another process appending at the same position violates the
+    unique sequence; the writer then reloads the head from the database and
+    recomputes the batch.
+
+    The same transaction stores the new nodes of the Merkle tree over the chain
+    (one leaf per entry, see utils.merkle). The writer keeps the tree's frontier
+    next to the head, so an append writes O(log n) nodes and reads none.
+
+    A batch is written once it holds batch_size entries, flush_interval seconds
+    after its first entry, or as soon as it contains a "sync" entry, whose caller
+    is waiting for the commit.
+    """
+
+    def __init__(self, bind, batch_size: Optional[int] = None, flush_interval: Optional[float] = None,
+                 max_queue_size: Optional[int] = None):
+        self._session_factory = sessionmaker(bind=bind, autoflush=False, expire_on_commit=False)
+        self.batch_size = max(1, batch_size or settings.audit_batch_size)
+        self.flush_interval = settings.audit_flush_interval_ms / 1000 if flush_interval is None else flush_interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size or settings.audit_queue_max_size)
+        self._head: Optional[Tuple[int, Optional[str]]] = None
+        self._frontier: List[merkle.Node] = []
+        self._stats_lock = threading.Lock()
+        self._stats = {"enqueued": 0, "written": 0, "failed": 0, "batches": 0, "largest_batch": 0, "head_reloads": 0}
+        self._thread = threading.Thread(target=self._run, name="audit-chain-writer", daemon=True)
+        self._thread.start()
+
+    def append(self, durability: str = "sync", **fields) -> Optional[AuditLogEntry]:
+        """
+        Queue an entry for the chain.
+
+        Blocks while the queue is full, so a stalled database slows callers down
+        rather than dropping audit entries.
+
+        Args:
+            durability: "sync" to wait until the entry is committed, "async" to return once it is queued
+            **fields: AuditLogEntry columns (user_id, action_type, result, details)
+
+        Returns:
+            The committed (detached) entry for "sync", None for "async"
+        """
+        if durability not in AUDIT_DURABILITY_MODES:
+            raise ValueError(f"Unknown audit durability mode: {durability}")
+        future: Future = Future()
+        self._queue.put((fields, future, durability == "sync"))
+        self._count("enqueued")
+        if durability == "sync":
+            return future.result()
+        return None
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Wait until every entry queued so far has been written (or failed)."""
+        future: Future = Future()
+        self._queue.put((_FLUSH, future, True))
+        future.result(timeout)
+
+    def head(self) -> Optional[Tuple[int, Optional[str]]]:
+        """The (sequence, entry_hash) of the last entry this writer knows of, or None if not loaded yet."""
+        return self._head
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return dict(self._stats, queued=self._queue.qsize(), head_sequence=self._head[0] if self._head else None)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Write everything queued, then stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[counter] += amount
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            urgent = item[2]
+            deadline = time.monotonic() + self.flush_interval
+            stopping = False
+            # Gather more entries until the batch is full, a caller is waiting, or the interval ends
+            while len(batch) < self.batch_size:
+                try:
+                    if urgent:
+                        item = self._queue.get_nowait()
+                    else:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                urgent = urgent or item[2]
+
+            self._write_batch(batch)
+            if stopping:
+                return
+
+    def _write_batch(self, batch) -> None:
+        entries = [(fields, future) for fields, future, _ in batch if fields is not _FLUSH]
+        if entries:
+            try:
+                written = self._insert(entries)
+            except Exception as e:
+                if len(entries) == 1:
+                    self._fail(entries[0][1], e)
+                else:
+                    # Write one at a time so a single invalid entry does not take the batch with it
+                    for fields, future in entries:
+                        try:
+                            self._insert([(fields, future)])
+                        except Exception as entry_error:
+                            self._fail(future, entry_error)
+            else:
+                self._count("batches")
+                with self._stats_lock:
+                    self._stats["largest_batch"] = max(self._stats["largest_batch"], written)
+
+        for fields, future, _ in batch:
+            if fields is _FLUSH:
+                future.set_result(None)
+
+    def _fail(self, future: Future, error: Exception) -> None:
+        print(f"Audit log write failed: {str(error)}")
+        self._count("failed")
+        future.set_exception(error)
+
+    def _insert(self, entries) -> int:
+        while True:
+            with self._session_factory() as session:
+                if self._head is None:
+                    self._head = _load_head(session)
+                    self._frontier = _load_frontier(session, self._head[0])
+                sequence, previous_hash = self._head
+                frontier = self._frontier
+
+                log_entries = []
+                tree_nodes = []
+                for fields, _ in entries:
+                    sequence += 1
+                    log_entry = AuditLogEntry(
+                        id=str(uuid.uuid4()),
+                        sequence=sequence,
+                        previous_hash=previous_hash,
+                        # Set here rather than by the database, since it is part of the hash
+                        timestamp=datetime.utcnow(),
+                        **fields
+                    )
+                    log_entry.entry_hash = previous_hash = calculate_entry_hash(log_entry)
+                    log_entries.append(log_entry)
+                    frontier, created = merkle.append_leaf(frontier, _leaf_hash(log_entry.entry_hash))
+                    tree_nodes.extend(created)
+
+                session.add_all(log_entries)
+                session.add_all(
+                    AuditTreeNode(level=level, position=position, hash=node.hex())
+                    for level, position, node in tree_nodes
+                )
+                try:
+                    session.commit()
+                except IntegrityError:
+                    session.rollback()
+                    # Retry only if another writer moved the head; otherwise an entry itself is invalid
+                    current_head = _load_head(session)
+                    if current_head == self._head:
+                        raise
+                    self._head = current_head
+                    self._frontier = _load_frontier(session, current_head[0])
+                    self._count("head_reloads")
+                    continue
+
+            self._head = (sequence, previous_hash)
+            self._frontier = frontier
+            self._count("written", len(log_entries))
+            for (_, future), log_entry in zip(entries, log_entries):
+                future.set_result(log_entry)
+            return len(log_entries)
+
+
+def _load_head(session: Session) -> Tuple[int, Optional[str]]:
+    last_entry = (
+        session.query(AuditLogEntry.sequence, AuditLogEntry.entry_hash)
+        .filter(AuditLogEntry.sequence.isnot(None))
+        .order_by(AuditLogEntry.sequence.desc())
+        .first()
+    )
+    if last_entry is None:
+        return 0, None
+    return last_entry.sequence, last_entry.entry_hash
+
+
+def _leaf_hash(entry_hash: str) -> bytes:
+    return merkle.leaf_hash(bytes.fromhex(entry_hash))
+
+
+def _load_tree_nodes(session: Session, keys: List[merkle.NodeKey]) -> Dict[merkle.NodeKey, bytes]:
+    if not keys:
+        return {}
+    rows = session.query(AuditTreeNode).filter(tuple_(AuditTreeNode.level, AuditTreeNode.position).in_(keys))
+    nodes = {(row.level, row.position): bytes.fromhex(row.hash) for row in rows}
+    if len(nodes) != len(set(keys)):
+        raise RuntimeError("Audit Merkle tree is missing nodes; run the database migrations")
+    return nodes
+
+
+def _load_frontier(session: Session, size: int) -> List[merkle.Node]:
+    keys = merkle.frontier_keys(size)
+    nodes = _load_tree_nodes(session, keys)
+    return [(level, position, nodes[(level, position)]) for level, position in keys]
+
+
+# One writer per database (engine), created on first use
+_writers: Dict[int, Tuple[Any, AuditChainWriter]] = {}
+_writers_lock = threading.Lock()
+
+
+def get_audit_chain_writer(bind) -> AuditChainWriter:
+    """Return the process-wide chain writer for a database engine."""
+    with _writers_lock:
+        entry = _writers.get(id(bind))
+        if entry is None or entry[0] is not bind:
+            entry = (bind, AuditChainWriter(bind))
+            _writers[id(bind)] = entry
+        return entry[1]
+
+
+def shutdown_audit_chain_writers() -> None:
+    """Drain and stop every chain writer (called on application shutdown)."""
+    with _writers_lock:
+        writers = [writer for _, writer in _writers.values()]
+        _writers.clear()
+    for writer in writers:
+        writer.close(timeout=settings.audit_shutdown_timeout_seconds)
+
+
+def audit_writer_metrics() -> Dict[str, Any]:
+    """Queue and batch statistics of the chain writers, keyed by database URL."""
+    with _writers_lock:
+        writers = list(_writers.values())
+    return {str(bind.url): writer.stats() for bind, writer in writers}
 
 
 class AuditLogService:
     def __init__(self, db_session: Session):
         self.db_session = db_session
-    
+
     def log_action(
         self,
         user_id: Optional[str],
         action_type: str,
         result: str,
-        details: Optional[Dict[str, Any]] = None
-    ) -> AuditLogEntry:
+        details: Optional[Dict[str, Any]] = None,
+        durability: Optional[str] = None
+    ) -> Optional[AuditLogEntry]:
         """
         Log an action with chain-hashed integrity.
-        
+
+        The entry is appended by the background chain writer for this session's
+        database, batched with other entries in its own transaction; the caller's
+        session is not committed.
+
         Args:
             user_id: ID of the user performing the action (None for system events)
             action_type: Type of action being performed
             result: Result of the action ('success' or 'failure')
             details: Additional details about the action
-            
+            durability: "sync" to wait for the commit (security-critical events), "async" to
+                only queue the entry; defaults to settings.audit_default_durability
+
         Returns:
-            The created AuditLogEntry
+            The created AuditLogEntry for "sync", None for "async"
         """
-        # Get the previous hash for chaining
-        previous_hash = self._get_latest_hash()
-        
-        # Create the log entry
-        log_entry = AuditLogEntry(
+        return get_audit_chain_writer(self.db_session.get_bind()).append(
+            durability=durability or settings.audit_default_durability,
             user_id=user_id,
             action_type=action_type,
             result=result,
-            details=details,
-            previous_hash=previous_hash
+            details=details
         )
-        
-        # Add to session and commit
-        self.db_session.add(log_entry)
-        self.db_session.commit()
-        self.db_session.refresh(log_entry)
-        
-        return log_entry
-    
-    def _get_latest_hash(self) -> Optional[str]:
+
+    def signed_tree_head(self) -> Dict[str, Any]:
         """
-        Get the hash of the most recent audit log entry.
-        
+        Get the current root of the Merkle tree over the audit chain, signed.
+
+        The signature is HMAC-SHA256 over "tree_size|root_hash|timestamp" with
+        settings.audit_checkpoint_key.
+
         Returns:
-            The hash of the latest entry, or None if no entries exist
+            Dict with tree_size, root_hash, timestamp and signature
         """
-        latest_entry = (
-            self.db_session.query(AuditLogEntry)
-            .order_by(AuditLogEntry.timestamp.desc())
-            .first()
-        )
-        
-        if latest_entry:
-            return self._calculate_hash(latest_entry)
-        
-        return None
-    
-    def _calculate_hash(self, log_entry: AuditLogEntry) -> str:
+        tree_size = _load_head(self.db_session)[0]
+        root_hash = merkle.range_hash(0, tree_size, _load_tree_nodes(self.db_session, merkle.frontier_keys(tree_size))).hex()
+        timestamp = datetime.utcnow().isoformat()
+        return {
+            "tree_size": tree_size,
+            "root_hash": root_hash,
+            "timestamp": timestamp,
+            "signature": _sign(f"{tree_size}|{root_hash}|{timestamp}")
+        }
+
+    def inclusion_proof(self, sequence: int, tree_size: Optional[int] = None) -> Dict[str, Any]:
         """
-        Calculate the hash for an audit log entry.
-        
+        Prove that an entry is in the tree, with O(log n) hashes.
+
+        The leaf for entry `sequence` is at index sequence - 1 and hashes the
+        entry's entry_hash. Verify with utils.merkle.verify_inclusion against a
+        signed tree head of the same size.
+
         Args:
-            log_entry: The audit log entry to hash
-            
+            sequence: Chain position of the entry
+            tree_size: Size of the tree to prove against; defaults to the current size
+
         Returns:
-            The calculated hash
+            Dict with the leaf index, tree size, entry and leaf hashes, audit path and root hash
+
+        Raises:
+            ValueError: If the entry is not in a tree of that size
         """
-        # Create a string representation of the log entry
-        entry_str = (
-            f"{log_entry.id}|"
-            f"{log_entry.user_id}|"
-            f"{log_entry.action_type}|"
-            f"{log_entry.result}|"
-            f"{log_entry.timestamp}|"
-            f"{json.dumps(log_entry.details, sort_keys=True) if log_entry.details else ''}|"
-            f"{log_entry.previous_hash or ''}"
+        tree_size = self._tree_size(tree_size)
+        ranges = merkle.inclusion_ranges(sequence - 1, tree_size)
+        nodes = _load_tree_nodes(self.db_session, merkle.proof_keys(ranges + [(0, tree_size)]))
+        entry_hash = (
+            self.db_session.query(AuditLogEntry.entry_hash)
+            .filter(AuditLogEntry.sequence == sequence)
+            .scalar()
         )
-        
-        # Calculate SHA-256 hash
-        return hashlib.sha256(entry_str.encode('utf-8')).hexdigest()
-    
+        return {
+            "sequence": sequence,
+            "leaf_index": sequence - 1,
+            "tree_size": tree_size,
+            "entry_hash": entry_hash,
+            "leaf_hash": _leaf_hash(entry_hash).hex(),
+            "audit_path": [merkle.range_hash(start, end, nodes).hex() for start, end in ranges],
+            "root_hash": merkle.range_hash(0, tree_size, nodes).hex()
+        }
+
+    def consistency_proof(self, first: int, second: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Prove that the tree of `first` entries is a prefix of the tree of `second`.
+
+        Verify with utils.merkle.verify_consistency.
+
+        Args:
+            first: Older tree size
+            second: Newer tree size; defaults to the current size
+
+        Returns:
+            Dict with both sizes, both root hashes and the proof
+
+        Raises:
+            ValueError: If the sizes are not 0 < first <= second <= current size
+        """
+        second = self._tree_size(second)
+        ranges = merkle.consistency_ranges(first, second)
+        nodes = _load_tree_nodes(self.db_session, merkle.proof_keys(ranges + [(0, first), (0, second)]))
+        return {
+            "first": first,
+            "second": second,
+            "first_root_hash": merkle.range_hash(0, first, nodes).hex(),
+            "second_root_hash": merkle.range_hash(0, second, nodes).hex(),
+            "proof": [merkle.range_hash(start, end, nodes).hex() for start, end in ranges]
+        }
+
+    def _tree_size(self, tree_size: Optional[int]) -> int:
+        current_size = _load_head(self.db_session)[0]
+        if tree_size is None:
+            return current_size
+        if not 0 < tree_size <= current_size:
+            raise ValueError(f"Tree size must be between 1 and {current_size}")
+        return tree_size
+
     def verify_integrity(self) -> bool:
         """
         Verify the integrity of the audit log chain.
-        
+
+        Returns:
+            True if the chain is intact since the last good checkpoint, False otherwise
+        """
+        return self.verify_chain().valid
+
+    def verify_chain(self, full: bool = False, workers: Optional[int] = None) -> "ChainVerification":
+        """
+        Verify the audit log chain, streaming entries instead of loading them all.
+
+        Entries must be numbered 1, 2, ... without gaps, each must match its
+        stored hash, and each must link to the hash of the entry before it.
+        Unless full is set, only entries after the last good checkpoint are
+        re-hashed: a checkpoint is good if its signature is valid and the entry
+        at its position still has the hash it recorded. When the chain verifies
+        and has grown by at least settings.audit_checkpoint_interval entries, a
+        new checkpoint is stored at the head.
+
+        Args:
+            full: Re-hash the whole chain, ignoring checkpoints
+            workers: Processes to split the range across; defaults to settings.audit_verify_workers
+
         Returns:
-            True if the chain is intact, False otherwise
+            A ChainVerification with the first broken position, if any
         """
-        # Get all entries ordered by timestamp
-        entries = (
-            self.db_session.query(AuditLogEntry)
-            .order_by(AuditLogEntry.timestamp.asc())
-            .all()
+        workers = settings.audit_verify_workers if workers is None else workers
+        batch_size = settings.audit_verify_batch_size
+        head = self.db_session.query(func.max(AuditLogEntry.sequence)).scalar() or 0
+        checkpoint = None if full else self._last_good_checkpoint(head)
+        start = checkpoint.sequence if checkpoint else 0
+
+        ranges = _split_range(start + 1, head, workers, batch_size)
+        if len(ranges) > 1:
+            database_url = self.db_session.get_bind().url.render_as_string(hide_password=False)
+            firsts, lasts = zip(*ranges)
+            with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+                broken = list(pool.map(_verify_range_in_process, repeat(database_url), firsts, lasts, repeat(batch_size)))
+        else:
+            broken = [_verify_range(self.db_session, first, last, batch_size) for first, last in ranges]
+
+        broken = [sequence for sequence in broken if sequence is not None]
+        first_broken = min(broken) if broken else None
+        if first_broken is None and head - start >= max(1, settings.audit_checkpoint_interval):
+            self._store_checkpoint(head)
+
+        return ChainVerification(
+            valid=first_broken is None,
+            first_broken_sequence=first_broken,
+            verified_entries=(first_broken - 1 if broken else head) - start,
+            checkpoint_sequence=start,
+            head_sequence=head
         )
-        
-        # Verify each entry's previous_hash matches the calculated hash of the previous entry
-        for i, entry in enumerate(entries):
-            if i == 0:
-                # First entry should have no previous hash or have a valid initial state
-                if entry.previous_hash is not None:
-                    # If there's a previous hash for the first entry, it should be empty or a known initial value
-                    if entry.previous_hash != "":
-                        return False
-            else:
-                # Calculate the hash of the previous entry
-                expected_previous_hash = self._calculate_hash(entries[i-1])
-                
-                # Compare with the stored previous_hash
-                if entry.previous_hash != expected_previous_hash:
-                    return False
-        
-        return True
\ No newline at end of file
+
+    def _last_good_checkpoint(self, head: int) -> Optional[AuditCheckpoint]:
+        checkpoints = (
+            self.db_session.query(AuditCheckpoint)
+            .filter(AuditCheckpoint.sequence <= head)
+            .order_by(AuditCheckpoint.sequence.desc())
+        )
+        for checkpoint in checkpoints:
+            if not hmac.compare_digest(checkpoint.signature, _checkpoint_signature(checkpoint.sequence, checkpoint.entry_hash)):
+                print(f"Ignoring audit checkpoint at {checkpoint.sequence}: invalid signature")
+                continue
+            entry_hash = (
+                self.db_session.query(AuditLogEntry.entry_hash)
+                .filter(AuditLogEntry.sequence == checkpoint.sequence)
+                .scalar()
+            )
+            if entry_hash != checkpoint.entry_hash:
+                print(f"Ignoring audit checkpoint at {checkpoint.sequence}: entry no longer matches")
+                continue
+            return checkpoint
+        return None
+
+    def _store_checkpoint(self, sequence: int) -> None:
+        entry_hash = (
+            self.db_session.query(AuditLogEntry.entry_hash)
+            .filter(AuditLogEntry.sequence == sequence)
+            .scalar()
+        )
+        self.db_session.add(AuditCheckpoint(
+            sequence=sequence,
+            entry_hash=entry_hash,
+            signature=_checkpoint_signature(sequence, entry_hash)
+        ))
+        try:
+            self.db_session.commit()
+        except IntegrityError:
+            # Another verification checkpointed the same head
+            self.db_session.rollback()
+
+
+class ChainVerification(NamedTuple):
+    """Outcome of AuditLogService.verify_chain()."""
+    valid: bool
+    first_broken_sequence: Optional[int]  # First position that is missing, altered or not linked to the one before
+    verified_entries: int  # Intact entries re-hashed by this run
+    checkpoint_sequence: int  # Verification started after this position (0 = from the first entry)
+    head_sequence: int
+
+
+def _sign(message: str) -> str:
+    return hmac.new(settings.audit_checkpoint_key.encode('utf-8'), message.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def _checkpoint_signature(sequence: int, entry_hash: str) -> str:
+    return _sign(f"{sequence}|{entry_hash}")
+
+
+def _split_range(first: int, last: int, workers: int, batch_size: int) -> List[Tuple[int, int]]:
+    """Split first..last into at most `workers` contiguous ranges of at least one batch each."""
+    count = last - first + 1
+    if count <= 0:
+        return []
+    parts = max(1, min(workers, count // max(1, batch_size)))
+    size = -(-count // parts)
+    return [(start, min(start + size - 1, last)) for start in range(first, last + 1, size)]
+
+
+_CHAIN_COLUMNS = (
+    AuditLogEntry.id,
+    AuditLogEntry.user_id,
+    AuditLogEntry.action_type,
+    AuditLogEntry.result,
+    AuditLogEntry.timestamp,
+    AuditLogEntry.details,
+    AuditLogEntry.previous_hash,
+    AuditLogEntry.sequence,
+    AuditLogEntry.entry_hash,
+)
+
+
+def _verify_range(session: Session, first: int, last: int, batch_size: int) -> Optional[int]:
+    """
+    Re-hash the entries at positions first..last.
+
+    The entry before the range is trusted as the link to it: it is either a
+    checkpoint or the last entry of another range being verified.
+
+    Returns:
+        The first broken position in the range, or None if it is intact
+    """
+    previous_hash = None
+    if first > 1:
+        previous_hash = (
+            session.query(AuditLogEntry.entry_hash)
+            .filter(AuditLogEntry.sequence == first - 1)
+            .scalar()
+        )
+
+    # Plain rows rather than ORM objects; yield_per keeps one batch in memory at a time
+    rows = session.execute(
+        select(*_CHAIN_COLUMNS)
+        .where(AuditLogEntry.sequence.between(first, last))
+        .order_by(AuditLogEntry.sequence.asc())
+        .execution_options(yield_per=batch_size)
+    )
+    expected = first
+    for row in rows:
+        # The first entry has no previous hash (None or "")
+        if row.sequence != expected or (row.previous_hash or None) != previous_hash or not _hash_matches(row):
+            rows.close()
+            return expected
+        previous_hash = row.entry_hash
+        expected += 1
+
+    return expected if expected <= last else None
+
+
+def _verify_range_in_process(database_url: str, first: int, last: int, batch_size: int) -> Optional[int]:
+    engine = create_engine(database_url, poolclass=NullPool)
+    try:
+        with Session(engine) as session:
+            return _verify_range(session, first, last, batch_size)
+    finally:
+        engine.dispose()
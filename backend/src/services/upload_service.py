@@ -0,0 +1,424 @@
+import asyncio
+import hashlib
+import os
+import uuid
+import weakref
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+import aiofiles
+import aiofiles.os
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..config.settings import settings
+from ..models.encrypted_file import EncryptedFile
+from ..models.upload_session import UploadSession
+from ..storage import get_storage_backend
+from ..utils.crypto_executor import CryptoExecutorSaturated, get_crypto_executor
+from ..utils.encryption_utils import (
+    ENVELOPE_ALGORITHM_VERSION,
+    StreamEncryptor,
+    new_wrapped_data_key,
+    parse_stream_header,
+    unwrap_data_key,
+)
+from .vault_service import AsyncVaultService, VaultService
+
+try:
+    import fcntl
+except ImportError:  # Windows, where the server runs a single process (gunicorn is POSIX-only)
+    fcntl = None
+
+_fsync = aiofiles.os.wrap(os.fsync)
+
+# Serialises chunk writes per session within this process; the staging file lock serialises worker processes
+_session_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+async def _lock_staging_file(staging) -> None:
+    # Held until the file is closed
+    if fcntl is not None:
+        await asyncio.to_thread(fcntl.flock, staging.fileno(), fcntl.LOCK_EX)
+
+
+class UploadError(ValueError):
+    """Raised when an upload request is invalid (bad chunk, checksum, size or session state)."""
+
+
+class UploadOffsetMismatch(UploadError):
+    """Raised when a chunk does not start at the session's current offset."""
+
+    def __init__(self, expected_offset: int):
+        super().__init__(f"Chunk must start at offset {expected_offset}")
+        self.expected_offset = expected_offset
+
+
+class UploadService:
+    """
+    Resumable uploads: create a session, PUT chunks at increasing offsets, then complete.
+
+    Each chunk is encrypted into segments of the envelope container as it arrives
+    and appended to a local staging file; the persisted offset lets a client resume
+    after a dropped connection or a worker restart. Non-final chunks must be whole
+    multiples of the container chunk size so that segment boundaries never move.
+    """
+
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+
+    def _vault_service(self) -> VaultService:
+        return VaultService(self.db_session)
+
+    async def _execute(self, statement):
+        return self.db_session.execute(statement)
+
+    async def _flush(self) -> None:
+        self.db_session.flush()
+
+    async def _commit(self) -> None:
+        self.db_session.commit()
+
+    async def _rollback(self) -> None:
+        self.db_session.rollback()
+
+    async def _refresh(self, instance) -> None:
+        self.db_session.refresh(instance)
+
+    async def create_session(self, user_id: str, filename: str, total_size: int, password: str) -> UploadSession:
+        """
+        Start a resumable upload.
+
+        Args:
+            user_id: The ID of the user uploading the file
+            filename: Original filename
+            total_size: Plaintext size the client will send
+            password: Password used to wrap the file's data key
+
+        Returns:
+            The created UploadSession
+        """
+        if total_size < 0 or total_size > settings.max_upload_size:
+            raise UploadError(f"File exceeds maximum size of {settings.max_upload_size} bytes")
+
+        vault_service = self._vault_service()
+        vault = await vault_service.prepare_vault(user_id)
+        kek = await vault_service.derive_kek_async(vault, password)
+        data_key, key_id, wrapped_key = new_wrapped_data_key(kek, user_id)
+        encryptor = StreamEncryptor.for_data_key(data_key, key_id)
+        header_bytes = encryptor.header.to_bytes()
+
+        session = UploadSession(
+            user_id=user_id,
+            original_filename=filename,
+            total_size=total_size,
+            received_size=0,
+            chunk_size=encryptor.header.chunk_size,
+            header=header_bytes.hex(),
+            wrapped_key=wrapped_key,
+            key_id=key_id.hex(),
+            staging_path="",
+            status="active",
+            expires_at=datetime.utcnow() + timedelta(seconds=settings.upload_session_ttl_seconds),
+        )
+        self.db_session.add(session)
+        await self._flush()
+
+        os.makedirs(settings.upload_staging_path, exist_ok=True)
+        session.staging_path = os.path.join(settings.upload_staging_path, f"{session.id}.part")
+        async with aiofiles.open(session.staging_path, "wb") as staging:
+            await staging.write(header_bytes)
+            # An empty file is a single empty final segment; nothing will be PUT
+            if total_size == 0:
+                await staging.write(encryptor.seal_chunks(b"", final=True))
+
+        await self._commit()
+        await self._refresh(session)
+        return session
+
+    async def get_session(self, upload_id: str, user_id: str) -> Optional[UploadSession]:
+        """Return the user's upload session, or None if it does not exist or belongs to someone else."""
+        result = await self._execute(
+            select(UploadSession).where(UploadSession.id == upload_id, UploadSession.user_id == user_id)
+        )
+        return result.scalars().first()
+
+    def _require_active(self, session: UploadSession) -> None:
+        if session.status != "active":
+            raise UploadError(f"Upload session is {session.status}")
+        expires_at = session.expires_at
+        if expires_at.tzinfo is not None:
+            expires_at = expires_at.astimezone(timezone.utc).replace(tzinfo=None)
+        if expires_at <= datetime.utcnow():
+            raise UploadError("Upload session has expired")
+
+    async def write_chunk(self, session: UploadSession, offset: int, data: bytes, checksum: str, password: str) -> UploadSession:
+        """
+        Verify, encrypt and persist one chunk.
+
+        Args:
+            session: The upload session
+            offset: Plaintext offset of the chunk; must equal the bytes received so far
+            data: The chunk's plaintext
+            checksum: Hex SHA-256 of the chunk
+            password: Password that unwraps the session's data key
+
+        Returns:
+            The updated session
+
+        Raises:
+            UploadOffsetMismatch: If the chunk is not at the current offset
+            UploadError: If the chunk is malformed or fails its checksum
+            StreamDecryptionError: If the password cannot unwrap the data key
+        """
+        lock = _session_locks.get(session.id)
+        if lock is None:
+            lock = _session_locks[session.id] = asyncio.Lock()
+        async with lock:
+            # Another request may have written this offset while we waited
+            await self._refresh(session)
+            self._check_offset(session, offset)
+            return await self._write_chunk(session, offset, data, checksum, password)
+
+    def _check_offset(self, session: UploadSession, offset: int) -> None:
+        self._require_active(session)
+        if offset != session.received_size:
+            raise UploadOffsetMismatch(session.received_size)
+
+    async def _write_chunk(self, session: UploadSession, offset: int, data: bytes, checksum: str, password: str) -> UploadSession:
+        end = offset + len(data)
+        if not data or end > session.total_size:
+            raise UploadError("Chunk is empty or extends past the declared file size")
+        final = end == session.total_size
+        if not final and len(data) % session.chunk_size:
+            raise UploadError(f"Chunks before the last must be a multiple of {session.chunk_size} bytes")
+        if not checksum or hashlib.sha256(data).hexdigest() != checksum.strip().lower():
+            raise UploadError("Chunk checksum mismatch")
+
+        # Encrypt the chunk's segments at their position in the container
+        header = parse_stream_header(bytes.fromhex(session.header))
+        data_key = await self._unwrap_data_key(session, password)
+        encryptor = StreamEncryptor(data_key, header, segment_index=offset // session.chunk_size)
+        ciphertext = await get_crypto_executor().run(encryptor.seal_chunks, data, final)
+
+        committed = header.size + (offset // session.chunk_size) * header.segment_size
+        try:
+            staging = await aiofiles.open(session.staging_path, "r+b")
+        except FileNotFoundError:
+            # Removed by the expiry collector or an abort since the check above
+            await self._refresh(session)
+            self._check_offset(session, offset)
+            raise
+        try:
+            # A worker process may have written this offset, or the session may have ended, since the check above
+            await _lock_staging_file(staging)
+            await self._refresh(session)
+            self._check_offset(session, offset)
+
+            # Drop anything past the last committed chunk (a write interrupted by a crash) and append
+            await staging.truncate(committed)
+            await staging.seek(committed)
+            await staging.write(ciphertext)
+            await staging.flush()
+            await _fsync(staging.fileno())
+
+            # Compare-and-set, so the offset only ever advances from the one this chunk was written at
+            result = await self._execute(
+                update(UploadSession)
+                .where(
+                    UploadSession.id == session.id,
+                    UploadSession.status == "active",
+                    UploadSession.received_size == offset,
+                )
+                .values(
+                    received_size=end,
+                    expires_at=datetime.utcnow() + timedelta(seconds=settings.upload_session_ttl_seconds)
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != 1:
+                await self._rollback()
+                await self._refresh(session)
+                self._check_offset(session, offset)
+                raise UploadOffsetMismatch(session.received_size)
+            await self._commit()
+        finally:
+            await staging.close()
+
+        await self._refresh(session)
+        return session
+
+    async def _unwrap_data_key(self, session: UploadSession, password: str) -> bytes:
+        vault_service = self._vault_service()
+        vault = await vault_service.prepare_vault(session.user_id)
+        kek = await vault_service.derive_kek_async(vault, password)
+        return unwrap_data_key(kek, session.wrapped_key, session.user_id)
+
+    async def complete(self, session: UploadSession, destinations: List[Tuple[str, str]]) -> Tuple[EncryptedFile, str]:
+        """
+        Move a fully received upload into storage and record it in the vault.
+
+        Args:
+            session: The upload session
+            destinations: (storage_location, key) pairs to try in order; the last one is the fallback
+
+        Returns:
+            Tuple of (encrypted_file, storage_location)
+        """
+        self._require_active(session)
+        if session.received_size != session.total_size:
+            raise UploadError(f"Upload is incomplete: {session.received_size} of {session.total_size} bytes received")
+
+        # Claim the session, so a concurrent completion, abort or expiry backs off
+        claimed = await self._transition(
+            session, "active", "completing",
+            UploadSession.received_size == UploadSession.total_size,
+            UploadSession.expires_at > datetime.utcnow(),
+        )
+        if not claimed:
+            raise UploadError(f"Upload session is {session.status}")
+
+        try:
+            location, key = await self._store_staging_file(session, destinations)
+        except Exception:
+            # Nothing was stored, so the upload can be completed again
+            await self._transition(session, "completing", "active")
+            raise
+
+        encrypted_file = EncryptedFile(
+            id=str(uuid.uuid4()),
+            user_id=session.user_id,
+            original_filename=session.original_filename,
+            file_size=session.total_size,
+            encrypted_path=key,
+            storage_location=location,
+            algorithm_version=ENVELOPE_ALGORITHM_VERSION,
+            wrapped_key=session.wrapped_key,
+            key_id=session.key_id
+        )
+        session.status = "completed"
+        session.file_id = encrypted_file.id
+        try:
+            # One transaction for the file, its metadata and the session's new status
+            await self._vault_service().save_file_records([encrypted_file])
+        except Exception:
+            await self._rollback()
+            try:
+                await get_storage_backend(location).delete(key)
+            except Exception as e:
+                print(f"Could not delete {key} from {location} storage: {str(e)}")
+            # Backends that moved the staging file into storage leave nothing to complete again from
+            retryable = await aiofiles.os.path.exists(session.staging_path)
+            await self._transition(session, "completing", "active" if retryable else "failed")
+            raise
+
+        await self._remove_staging(session)
+        return encrypted_file, location
+
+    @staticmethod
+    async def _store_staging_file(session: UploadSession, destinations: List[Tuple[str, str]]) -> Tuple[str, str]:
+        for location, key in destinations:
+            try:
+                await get_storage_backend(location).put_file(key, session.staging_path)
+            except CryptoExecutorSaturated:
+                raise
+            except Exception as e:
+                if (location, key) == destinations[-1]:
+                    raise
+                print(f"{location} upload failed: {str(e)}. Falling back to {destinations[-1][0]} storage.")
+                continue
+            return location, key
+
+    async def _transition(self, session: UploadSession, from_status: str, to_status: str, *conditions) -> bool:
+        """
+        Compare-and-set the session's status, so only one request acts on a state change.
+
+        Returns:
+            True if this call changed the status; the session is refreshed either way
+        """
+        result = await self._execute(
+            update(UploadSession)
+            .where(UploadSession.id == session.id, UploadSession.status == from_status, *conditions)
+            .values(status=to_status)
+            .execution_options(synchronize_session=False)
+        )
+        changed = result.rowcount == 1
+        if changed:
+            await self._commit()
+        else:
+            await self._rollback()
+        await self._refresh(session)
+        return changed
+
+    async def abort(self, session: UploadSession) -> None:
+        """Cancel an upload and delete its staged ciphertext."""
+        if session.status == "active":
+            await self._transition(session, "active", "aborted")
+        # A session being completed keeps its staging file
+        if session.status != "completing":
+            await self._remove_staging(session)
+
+    async def collect_expired(self) -> int:
+        """
+        Garbage-collect abandoned uploads: expire active sessions past their deadline and delete their staging files.
+
+        Returns:
+            Number of sessions expired
+        """
+        now = datetime.utcnow()
+        result = await self._execute(
+            select(UploadSession)
+            .where(UploadSession.status == "active", UploadSession.expires_at <= now)
+        )
+        expired = 0
+        for session in result.scalars().all():
+            # A chunk written since the query has moved the deadline; a completion has claimed the session
+            if await self._transition(session, "active", "expired", UploadSession.expires_at <= now):
+                await self._remove_staging(session)
+                expired += 1
+        return expired
+
+    @staticmethod
+    async def _remove_staging(session: UploadSession) -> None:
+        if not session.staging_path:
+            return
+        try:
+            if fcntl is None:
+                await aiofiles.os.remove(session.staging_path)
+                return
+            async with aiofiles.open(session.staging_path, "r+b") as staging:
+                # Wait for a chunk write in progress; it re-checks the session's status under this lock
+                await _lock_staging_file(staging)
+                await aiofiles.os.remove(session.staging_path)
+        except FileNotFoundError:
+            pass
+
+
+class AsyncUploadService(UploadService):
+    """
+    UploadService for an AsyncSession, used by the async API routes.
+
+    Only the database access hooks are overridden.
+    """
+
+    def __init__(self, db_session: AsyncSession):
+        self.db_session = db_session
+
+    def _vault_service(self) -> AsyncVaultService:
+        return AsyncVaultService(self.db_session)
+
+    async def _execute(self, statement):
+        return await self.db_session.execute(statement)
+
+    async def _flush(self) -> None:
+        await self.db_session.flush()
+
+    async def _commit(self) -> None:
+        await self.db_session.commit()
+
+    async def _rollback(self) -> None:
+        await self.db_session.rollback()
+
+    async def _refresh(self, instance) -> None:
+        await self.db_session.refresh(instance)
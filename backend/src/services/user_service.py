@@ -1,16 +1,36 @@
 import uuid
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Union
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from ..models.user import User, UserRole, UserStatus
 from ..utils.password_validator import validate_password_strength, validate_username
 from ..utils.password_utils import normalize_password
+from ..utils.encryption_utils import purge_cached_keys
+from ..utils.principal_cache import Principal, get_principal_cache
+from ..utils.crypto_executor import get_password_executor
 from ..config.settings import settings
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
+
+
+def _cache_principal(user: Optional[User]) -> Optional[Principal]:
+    if user is None:
+        return None
+    principal = Principal.from_user(user)
+    get_principal_cache().put(principal)
+    return principal
+
+
+def _authorize(principal: Optional[Principal], payload: dict) -> Optional[Principal]:
+    """Accept a token only for an active user whose token version it carries."""
+    if principal is None or not principal.is_active or payload.get("ver", 0) != principal.token_version:
+        return None
+    return principal
 
 
 class UserService:
@@ -28,15 +48,7 @@ class UserService:
         Returns:
             The created User object, or None if creation failed
         """
-        # Validate username
-        is_valid_username, username_msg = validate_username(username)
-        if not is_valid_username:
-            raise ValueError(f"Invalid username: {username_msg}")
-        
-        # Validate password strength
-        is_valid_password, password_msg = validate_password_strength(password)
-        if not is_valid_password:
-            raise ValueError(f"Invalid password: {password_msg}")
+        self._validate_credentials(username, password)
         
         # Check if user already exists
         existing_user = self.db_session.query(User).filter(User.username == username).first()
@@ -46,17 +58,9 @@ class UserService:
         # Normalize password to comply with bcrypt 72-byte limit
         normalized_password = normalize_password(password)
 
-        # Hash the password
-        hashed_password = pwd_context.hash(normalized_password)
-        
-        # Create the user
-        user = User(
-            username=username,
-            password_hash=hashed_password,
-            salt="",  # We're using bcrypt which handles salting internally
-            role=UserRole.USER,
-            status=UserStatus.ACTIVE
-        )
+        # Hash the password on the bounded password pool
+        hashed_password = get_password_executor().call(pwd_context.hash, normalized_password)
+        user = self._new_user(username, hashed_password)
         
         # Add to session and commit
         self.db_session.add(user)
@@ -77,11 +81,39 @@ class UserService:
             The authenticated User object, or None if authentication failed
         """
         user = self.db_session.query(User).filter(User.username == username).first()
+        if not user:
+            return None
 
         # Normalize password to comply with bcrypt 72-byte limit
         normalized_password = normalize_password(password)
+        verified = get_password_executor().call(pwd_context.verify, normalized_password, user.password_hash)
+        return self._check_authenticated(user, verified)
+
+    @staticmethod
+    def _validate_credentials(username: str, password: str) -> None:
+        # Validate username
+        is_valid_username, username_msg = validate_username(username)
+        if not is_valid_username:
+            raise ValueError(f"Invalid username: {username_msg}")
+        
+        # Validate password strength
+        is_valid_password, password_msg = validate_password_strength(password)
+        if not is_valid_password:
+            raise ValueError(f"Invalid password: {password_msg}")
+
+    @staticmethod
+    def _new_user(username: str, password_hash: str) -> User:
+        return User(
+            username=username,
+            password_hash=password_hash,
+            salt="",  # We're using bcrypt which handles salting internally
+            role=UserRole.USER,
+            status=UserStatus.ACTIVE
+        )
 
-        if not user or not pwd_context.verify(normalized_password, user.password_hash):
+    @staticmethod
+    def _check_authenticated(user: User, verified: bool) -> Optional[User]:
+        if not verified:
             return None
 
         if user.status != UserStatus.ACTIVE:
@@ -89,25 +121,63 @@ class UserService:
 
         return user
 
-    def generate_access_token(self, user_id: str) -> str:
+    @staticmethod
+    def generate_access_token(user: Union[User, Principal]) -> str:
         """
         Generate an access token for the given user.
         
         Args:
-            user_id: The ID of the user to generate a token for
+            user: The already-loaded User (or Principal) to generate a token for
             
         Returns:
             The generated access token
         """
         expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
         to_encode = {
-            "sub": user_id,
+            "sub": user.id,
             "exp": expire,
-            "role": self.get_user_role(user_id)
+            "role": user.role.value,
+            "ver": user.token_version or 0
         }
         encoded_jwt = jwt.encode(to_encode, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
         return encoded_jwt
 
+    @staticmethod
+    def generate_refresh_token(user: Union[User, Principal]) -> str:
+        """
+        Generate a long-lived refresh token for the given user.
+
+        Refresh tokens can only be exchanged for new access tokens at
+        /auth/refresh, so clients renew without re-sending the password (and
+        without another bcrypt check). They are revoked together with access
+        tokens whenever the user's token version is bumped.
+
+        Args:
+            user: The already-loaded User (or Principal) to generate a token for
+
+        Returns:
+            The generated refresh token
+        """
+        expire = datetime.utcnow() + timedelta(days=settings.refresh_token_expire_days)
+        to_encode = {
+            "sub": user.id,
+            "exp": expire,
+            "ver": user.token_version or 0,
+            "typ": "refresh"
+        }
+        return jwt.encode(to_encode, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
+
+    @staticmethod
+    def _decode_token(token: str, token_type: str = "access") -> Optional[dict]:
+        try:
+            payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
+        except JWTError:
+            return None
+        # Access tokens predate the "typ" claim, so a missing claim means access
+        if payload.get("sub") is None or payload.get("typ", "access") != token_type:
+            return None
+        return payload
+
     def get_current_user(self, token: str) -> Optional[User]:
         """
         Get the current user from the given token.
@@ -118,19 +188,90 @@ class UserService:
         Returns:
             The current User object, or None if token is invalid
         """
+        payload = self._decode_token(token)
+        if payload is None:
+            return None
+
+        user = self.db_session.query(User).filter(User.id == payload["sub"]).first()
+
+        if user is None or user.status != UserStatus.ACTIVE:
+            return None
+        # Tokens issued before the last role/status change are revoked
+        if payload.get("ver", 0) != (user.token_version or 0):
+            return None
+
+        return user
+
+    def get_current_principal(self, token: str) -> Optional[Principal]:
+        """
+        Get the authenticated principal for the given token.
+
+        Unlike get_current_user this only needs the user's role, status and
+        token version, which are served from the principal cache so most
+        requests are authorised without a database query.
+
+        Args:
+            token: The access token to decode
+
+        Returns:
+            The current Principal, or None if the token is invalid, revoked or the user is inactive
+        """
+        return self._resolve_principal(self._decode_token(token))
+
+    def refresh_access_token(self, refresh_token: str) -> Optional[str]:
+        """
+        Exchange a refresh token for a new access token.
+
+        Args:
+            refresh_token: A token issued by generate_refresh_token
+
+        Returns:
+            A new access token, or None if the refresh token is invalid, revoked or the user is inactive
+        """
+        principal = self._resolve_principal(self._decode_token(refresh_token, token_type="refresh"))
+        if principal is None:
+            return None
+        return self.generate_access_token(principal)
+
+    def _resolve_principal(self, payload: Optional[dict]) -> Optional[Principal]:
+        if payload is None:
+            return None
+
+        principal = get_principal_cache().get(payload["sub"])
+        if principal is None:
+            user = self.db_session.query(User).filter(User.id == payload["sub"]).first()
+            principal = _cache_principal(user)
+        return _authorize(principal, payload)
+
+    def bump_token_version(self, user: User) -> None:
+        """
+        Commit a change to a user's role or status and revoke their existing tokens.
+
+        Increments the user's token version, commits, and drops the cached
+        principal so the change takes effect immediately in this process (other
+        processes see it once their cache entry expires).
+
+        Args:
+            user: The modified user
+        """
+        user.token_version = (user.token_version or 0) + 1
+        self.db_session.commit()
+        get_principal_cache().invalidate(user.id)
+
+    @staticmethod
+    def get_token_subject(token: str) -> Optional[str]:
+        """
+        Get the user ID from a token without loading the user.
+
+        Args:
+            token: The access token to decode
+
+        Returns:
+            The token subject, or None if the token is invalid
+        """
         try:
             payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
-            user_id: str = payload.get("sub")
-            
-            if user_id is None:
-                return None
-                
-            user = self.db_session.query(User).filter(User.id == user_id).first()
-            
-            if user is None or user.status != UserStatus.ACTIVE:
-                return None
-                
-            return user
+            return payload.get("sub")
         except JWTError:
             return None
 
@@ -162,7 +303,8 @@ class UserService:
         user = self.db_session.query(User).filter(User.id == user_id).first()
         if user:
             user.status = UserStatus.INACTIVE
-            self.db_session.commit()
+            self.bump_token_version(user)
+            purge_cached_keys(user_id)
             return True
         return False
 
@@ -179,7 +321,7 @@ class UserService:
         user = self.db_session.query(User).filter(User.id == user_id).first()
         if user:
             user.status = UserStatus.ACTIVE
-            self.db_session.commit()
+            self.bump_token_version(user)
             return True
         return False
 
@@ -197,5 +339,80 @@ class UserService:
         if user:
             self.db_session.delete(user)
             self.db_session.commit()
+            get_principal_cache().invalidate(user_id)
+            purge_cached_keys(user_id)
             return True
-        return False
\ No newline at end of file
+        return False
+
+
+class AsyncUserService:
+    """
+    UserService for an AsyncSession, used by the async API routes.
+
+    Token issuing and validation are shared with UserService; database access
+    is awaited and bcrypt runs on the password executor, so neither blocks the
+    event loop.
+    """
+
+    generate_access_token = staticmethod(UserService.generate_access_token)
+    generate_refresh_token = staticmethod(UserService.generate_refresh_token)
+
+    def __init__(self, db_session: AsyncSession):
+        self.db_session = db_session
+
+    async def _get_user(self, *criteria) -> Optional[User]:
+        result = await self.db_session.execute(select(User).where(*criteria))
+        return result.scalars().first()
+
+    async def create_user(self, username: str, password: str) -> Optional[User]:
+        """
+        Create a new user with the given username and password.
+
+        Raises:
+            ValueError: If the username or password is invalid, or the username is taken
+        """
+        UserService._validate_credentials(username, password)
+        if await self._get_user(User.username == username):
+            raise ValueError("Username already exists")
+
+        hashed_password = await get_password_executor().run(pwd_context.hash, normalize_password(password))
+        user = UserService._new_user(username, hashed_password)
+        self.db_session.add(user)
+        await self.db_session.commit()
+        await self.db_session.refresh(user)
+        return user
+
+    async def authenticate_user(self, username: str, password: str) -> Optional[User]:
+        """
+        Authenticate a user with the given username and password.
+
+        Raises:
+            CryptoExecutorSaturated: If the password executor has no capacity
+        """
+        user = await self._get_user(User.username == username)
+        if not user:
+            return None
+
+        normalized_password = normalize_password(password)
+        verified = await get_password_executor().run(pwd_context.verify, normalized_password, user.password_hash)
+        return UserService._check_authenticated(user, verified)
+
+    async def get_current_principal(self, token: str) -> Optional[Principal]:
+        """Async counterpart of UserService.get_current_principal(); cache hits do no I/O."""
+        return await self._resolve_principal(UserService._decode_token(token))
+
+    async def refresh_access_token(self, refresh_token: str) -> Optional[str]:
+        """Async counterpart of UserService.refresh_access_token()."""
+        principal = await self._resolve_principal(UserService._decode_token(refresh_token, token_type="refresh"))
+        if principal is None:
+            return None
+        return self.generate_access_token(principal)
+
+    async def _resolve_principal(self, payload: Optional[dict]) -> Optional[Principal]:
+        if payload is None:
+            return None
+
+        principal = get_principal_cache().get(payload["sub"])
+        if principal is None:
+            principal = _cache_principal(await self._get_user(User.id == payload["sub"]))
+        return _authorize(principal, payload)
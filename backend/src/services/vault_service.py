@@ -1,16 +1,96 @@
+import asyncio
+import base64
+import json
 import os
 import uuid
+from collections import deque
+from itertools import islice
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, AsyncIterator, Iterator, List, NamedTuple, Optional, Tuple
+from sqlalchemy import String, and_, delete, func, or_, select, type_coerce, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from ..models.user import User
 from ..models.encrypted_file import EncryptedFile
 from ..models.vault import Vault
 from ..models.file_metadata import FileMetadata
-from ..utils.encryption_utils import encrypt_file, decrypt_file, decrypt_file_to_bytes
+from ..storage import StorageBackend, StorageError, get_storage_backend
+from ..utils.encryption_utils import (
+    ENVELOPE_ALGORITHM_VERSION,
+    KDF_NONE,
+    STREAM_ALGORITHM_VERSION,
+    AutoDecryptor,
+    StreamDecryptionError,
+    StreamDecryptor,
+    StreamEncryptor,
+    StreamHeader,
+    StreamRangeDecryptor,
+    aiter_decrypt,
+    aiter_encrypt,
+    derive_raw_key_async,
+    derive_raw_key_cached,
+    generate_salt,
+    is_stream_container,
+    iter_decrypt_chunks,
+    iter_decrypt_envelope,
+    iter_file_chunks,
+    new_wrapped_data_key,
+    parse_stream_header,
+    purge_cached_keys,
+    stream_plaintext_size,
+    unwrap_data_key,
+    wrap_data_key,
+)
+from ..utils.crypto_executor import CryptoExecutorSaturated, get_crypto_executor
+from ..utils.http_range import resolve_range
+from ..utils.zip_stream import ZipEntry
 from ..config.settings import settings
 
 
+class DecryptedDownload(NamedTuple):
+    """Plaintext stream for a decrypted download, with what the response needs to describe it."""
+    chunks: AsyncIterator[bytes]
+    original_filename: str
+    size: Optional[int]  # Total plaintext size, when known without decrypting
+    byte_range: Optional[Tuple[int, int]]  # Inclusive range being served, or None for the whole file
+    etag: str
+    accept_ranges: bool
+
+
+class FileListPage(NamedTuple):
+    """One page of a user's file listing."""
+    items: List[Any]  # Rows with id, original_filename, file_size and created_at
+    next_cursor: Optional[str]  # Opaque cursor for the following page, or None on the last page
+    total: Optional[int]  # Number of files matching the filters, when requested
+
+
+# Sort options for list_user_files_page, mapped to their columns
+FILE_LIST_SORT_COLUMNS = {
+    "created_at": EncryptedFile.created_at,
+    "size": EncryptedFile.file_size,
+    "name": EncryptedFile.original_filename,
+}
+
+
+def _encode_cursor(sort: str, order: str, key: Any, file_id: str) -> str:
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    raw = json.dumps([sort, order, key, file_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: str, order: str) -> Tuple[Any, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, cursor_order, key, file_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if (cursor_sort, cursor_order) != (sort, order):
+        raise ValueError("Cursor was issued for a different sort order")
+    return key, file_id
+
+
 class VaultService:
     def __init__(self, db_session: Session):
         self.db_session = db_session
@@ -18,6 +98,13 @@ class VaultService:
     def create_vault(self, user_id: str) -> Optional[Vault]:
         """
         Create a vault for the given user.
+
+        The vault holds the salt and iteration count for the user's key-encryption
+        key; vaults created before envelope encryption get them on first use.
+        New KEK parameters are committed before any key is derived from them, and
+        only if no concurrent request got there first (the unique user_id for a new
+        vault, a conditional UPDATE for a legacy one), so every upload wraps its
+        data keys under the KEK that ends up stored.
         
         Args:
             user_id: The ID of the user to create a vault for
@@ -25,22 +112,47 @@ class VaultService:
         Returns:
             The created Vault object, or None if creation failed
         """
-        # Check if vault already exists
-        existing_vault = self.db_session.query(Vault).filter(Vault.user_id == user_id).first()
-        if existing_vault:
-            return existing_vault
-        
-        # Create the vault
-        vault = Vault(user_id=user_id)
-        
-        # Add to session and commit
-        self.db_session.add(vault)
-        self.db_session.commit()
-        self.db_session.refresh(vault)
-        
-        return vault
+        query = self.db_session.query(Vault).filter(Vault.user_id == user_id)
+        vault = query.first()
+        if vault and vault.kek_salt:
+            return vault
+
+        if vault is None:
+            self.db_session.add(_new_vault(user_id))
+        else:
+            self.db_session.execute(_assign_kek_params(vault))
+        try:
+            self.db_session.commit()
+        except IntegrityError:
+            # Another request created the vault first; use its KEK parameters
+            self.db_session.rollback()
+
+        return query.populate_existing().one()
+
+    def derive_kek(self, vault: Vault, password: str) -> bytes:
+        """
+        Derive the user's key-encryption key on the crypto executor.
+
+        The result is cached per user, so only the first call in a session pays for PBKDF2.
+
+        Args:
+            vault: The user's vault holding the KEK salt and iterations
+            password: Password to derive the key from
+
+        Returns:
+            The raw key-encryption key
+        """
+        return get_crypto_executor().call(
+            derive_raw_key_cached, password, bytes.fromhex(vault.kek_salt), vault.kek_iterations, vault.user_id
+        )
 
-    def encrypt_and_store_file(self, user_id: str, file_path: str, password: str) -> Optional[EncryptedFile]:
+    async def derive_kek_async(self, vault: Vault, password: str) -> bytes:
+        """Async counterpart of derive_kek() for async routes."""
+        return await derive_raw_key_async(
+            password, bytes.fromhex(vault.kek_salt), vault.kek_iterations, scope=vault.user_id
+        )
+
+    async def encrypt_and_store_file(self, user_id: str, file_path: str, password: str) -> Optional[EncryptedFile]:
         """
         Encrypt a file and store it in the user's vault.
         
@@ -53,7 +165,7 @@ class VaultService:
             The created EncryptedFile object, or None if encryption failed
         """
         # Verify user exists
-        user = self.db_session.query(User).filter(User.id == user_id).first()
+        user = await self._get(User, user_id)
         if not user:
             return None
 
@@ -62,43 +174,45 @@ class VaultService:
         if file_size > settings.max_file_size:
             raise ValueError(f"File exceeds maximum size of {settings.max_file_size} bytes")
 
-        # Create the vault if it doesn't exist
-        self.create_vault(user_id)
+        # Create the vault (and its KEK parameters) if it doesn't exist
+        vault = await self.prepare_vault(user_id)
+
+        # Envelope encryption: a random data key per file, wrapped with the user's KEK
+        kek = await self.derive_kek_async(vault, password)
+        data_key, key_id, wrapped_key = new_wrapped_data_key(kek, user_id)
+        encryptor = StreamEncryptor.for_data_key(data_key, key_id)
 
-        # Encrypt the file
-        encrypted_file_path, algorithm_version = encrypt_file(file_path, password, user_id)
+        # Encrypt the file straight from disk into the local vault, one chunk at a time
+        filename = os.path.basename(file_path)
+        encrypted_file_path = os.path.join(settings.vaults_path, user_id, f"{uuid.uuid4()}_{filename}.encrypted")
+        storage = get_storage_backend("local")
+        await storage.put(encrypted_file_path, aiter_encrypt(storage.get(file_path), encryptor))
 
         # Create encrypted file record
         encrypted_file = EncryptedFile(
             user_id=user_id,
-            original_filename=os.path.basename(file_path),
+            original_filename=filename,
             file_size=file_size,
             encrypted_path=encrypted_file_path,
-            algorithm_version=algorithm_version
+            storage_location="local",
+            algorithm_version=ENVELOPE_ALGORITHM_VERSION,
+            wrapped_key=wrapped_key,
+            key_id=key_id.hex()
         )
 
-        # Add to session and commit
-        self.db_session.add(encrypted_file)
-        self.db_session.commit()
-        self.db_session.refresh(encrypted_file)
-
-        # Create file metadata record
-        file_metadata = FileMetadata(
-            file_id=encrypted_file.id,
-            original_filename=encrypted_file.original_filename,
-            file_size=encrypted_file.file_size,
-            algorithm_version=encrypted_file.algorithm_version
-        )
-
-        # Add metadata to session and commit
-        self.db_session.add(file_metadata)
-        self.db_session.commit()
+        # File, metadata and any new vault are written in one transaction
+        await self.save_file_records([encrypted_file])
 
         return encrypted_file
 
-    def decrypt_file(self, file_id: str, user_id: str, password: str) -> Optional[tuple]:
+    async def open_decrypted_stream(self, file_id: str, user_id: str, password: str) -> Optional[Tuple[AsyncIterator[bytes], str]]:
         """
-        Decrypt a file from the user's vault.
+        Open a file from the user's vault for incremental decryption.
+
+        The first plaintext chunk is decrypted before returning, so a wrong password,
+        missing object or corrupted header is reported here rather than after a
+        response has started. Later segments are fetched from the storage backend
+        and authenticated lazily as the iterator is consumed.
 
         Args:
             file_id: The ID of the file to decrypt
@@ -106,81 +220,374 @@ class VaultService:
             password: Password to use for decryption
 
         Returns:
-            Tuple of (decrypted_data: bytes, original_filename: str), or None if decryption failed
+            Tuple of (plaintext_chunks: AsyncIterator[bytes], original_filename: str), or None if decryption failed
         """
         # Verify the file belongs to the user
-        encrypted_file = (
-            self.db_session.query(EncryptedFile)
-            .filter(EncryptedFile.id == file_id, EncryptedFile.user_id == user_id)
-            .first()
+        encrypted_file = await self.get_user_file(file_id, user_id)
+
+        if not encrypted_file:
+            return None
+
+        try:
+            decryptor = await self._resolve_decryptor(encrypted_file, password)
+        except StreamDecryptionError as e:
+            print(f"Failed to decrypt file {encrypted_file.encrypted_path}: {str(e)}")
+            return None
+
+        # Each decryption step runs on the bounded crypto executor; the derived key is
+        # cached per user so bulk downloads skip the KDF
+        storage = self.get_storage(encrypted_file)
+        plaintext_chunks = await _prime(
+            aiter_decrypt(storage.get(encrypted_file.encrypted_path), decryptor), encrypted_file.encrypted_path
         )
+        if plaintext_chunks is None:
+            return None
+
+        return plaintext_chunks, encrypted_file.original_filename
+
+    async def open_decrypted_download(
+        self,
+        file_id: str,
+        user_id: str,
+        password: str,
+        range_header: Optional[str] = None,
+        if_range: Optional[str] = None,
+    ) -> Optional[DecryptedDownload]:
+        """
+        Open a file for a (possibly partial) decrypted download.
+
+        Segmented containers support random access: for a Range request only the
+        segments covering the range are fetched from storage and decrypted. Legacy
+        Fernet files cannot be decrypted partially and are always sent whole.
+
+        Args:
+            file_id: The ID of the file to decrypt
+            user_id: The ID of the user requesting decryption
+            password: Password to use for decryption
+            range_header: The request's Range header, if any
+            if_range: The request's If-Range header, if any
+
+        Returns:
+            A DecryptedDownload, or None if decryption failed
+
+        Raises:
+            RangeNotSatisfiable: If the range lies beyond the end of the plaintext
+        """
+        encrypted_file = await self.get_user_file(file_id, user_id)
 
         if not encrypted_file:
             return None
 
-        # Check if the encrypted file is stored in Supabase
-        if encrypted_file.storage_location == "supabase":
-            # The encrypted_path is the path in the Supabase bucket
-            actual_path = encrypted_file.encrypted_path
+        # Containers are never rewritten in place, and every envelope container has its own key ID
+        etag = f'"{encrypted_file.key_id or encrypted_file.id}"'
+        seekable = encrypted_file.algorithm_version in (STREAM_ALGORITHM_VERSION, ENVELOPE_ALGORITHM_VERSION)
 
-            # Download the file from Supabase
+        if range_header and seekable:
+            storage = self.get_storage(encrypted_file)
             try:
-                from supabase import create_client
-                from ..config.settings import settings
-                import tempfile
+                info = await storage.stat(encrypted_file.encrypted_path)
+                if info is None:
+                    return None
+                header = parse_stream_header(await storage.read_bytes(encrypted_file.encrypted_path, 0, 512))
+                if header is None:
+                    return None
+                size = stream_plaintext_size(header, info.size)
+            except (StorageError, StreamDecryptionError) as e:
+                print(f"Failed to read container {encrypted_file.encrypted_path}: {str(e)}")
+                return None
 
-                SUPABASE_URL = settings.supabase_url if settings.supabase_url else os.getenv("SUPABASE_URL", "")
-                SUPABASE_KEY = settings.supabase_key if settings.supabase_key else os.getenv("SUPABASE_KEY", "")
+            byte_range = resolve_range(range_header, if_range, etag, size)
+            if byte_range is not None:
+                try:
+                    key = await self._resolve_segment_key(encrypted_file, header, password)
+                except StreamDecryptionError as e:
+                    print(f"Failed to decrypt file {encrypted_file.encrypted_path}: {str(e)}")
+                    return None
 
-                if not SUPABASE_URL or not SUPABASE_KEY:
-                    print("Supabase configuration not found")
+                decryptor = StreamRangeDecryptor(header, key, info.size, *byte_range)
+                ciphertext = storage.get(encrypted_file.encrypted_path, decryptor.offset, decryptor.length)
+                plaintext_chunks = await _prime(aiter_decrypt(ciphertext, decryptor), encrypted_file.encrypted_path)
+                if plaintext_chunks is None:
                     return None
+                return DecryptedDownload(plaintext_chunks, encrypted_file.original_filename, size, byte_range, etag, True)
 
-                supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+        result = await self.open_decrypted_stream(file_id, user_id, password)
+        if result is None:
+            return None
+        plaintext_chunks, original_filename = result
+        return DecryptedDownload(plaintext_chunks, original_filename, None, None, etag, seekable)
 
-                # Download the file from Supabase
-                response = supabase.storage.from_(settings.bucket_name).download(actual_path)
+    async def _resolve_decryptor(self, encrypted_file: EncryptedFile, password: str):
+        """
+        Return a decryptor for a stored file.
 
-                # Process the downloaded content
-                from ..utils.encryption_utils import decrypt_file_to_bytes
-                import os
-                import tempfile
+        Envelope files unwrap their data key with the user's KEK (derived off the
+        event loop); other files derive a key from the password and their own salt.
+        """
+        if encrypted_file.wrapped_key:
+            return StreamDecryptor(key=await self._unwrap_file_key(encrypted_file, password))
+        return AutoDecryptor(password, cache_scope=encrypted_file.user_id)
+
+    async def _unwrap_file_key(self, encrypted_file: EncryptedFile, password: str) -> bytes:
+        """Unwrap an envelope file's data key with the user's KEK (derived off the event loop)."""
+        vault = await self._get_vault(encrypted_file.user_id)
+        if not vault or not vault.kek_salt:
+            raise StreamDecryptionError("Vault key parameters are missing")
+        kek = await self.derive_kek_async(vault, password)
+        return unwrap_data_key(kek, encrypted_file.wrapped_key, encrypted_file.user_id)
+
+    async def _resolve_segment_key(self, encrypted_file: EncryptedFile, header: StreamHeader, password: str) -> bytes:
+        """Return the AES key sealing a container's segments (the data key, or the password-derived key)."""
+        if header.kdf_id == KDF_NONE:
+            if not encrypted_file.wrapped_key:
+                raise StreamDecryptionError("Container requires a wrapped data key")
+            return await self._unwrap_file_key(encrypted_file, password)
+        return await derive_raw_key_async(password, header.salt, header.iterations, scope=encrypted_file.user_id)
+
+    @staticmethod
+    def get_storage(encrypted_file: EncryptedFile) -> StorageBackend:
+        """Return the storage backend holding a file's ciphertext."""
+        return get_storage_backend(encrypted_file.storage_location or "local")
+
+    def _iter_plaintext(self, encrypted_file: EncryptedFile, ciphertext_chunks: Iterator[bytes], password: str) -> Iterator[bytes]:
+        """
+        Return a (not yet started) plaintext iterator for a stored file.
 
-                # Create a temporary file to hold the downloaded content
-                with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-                    temp_file.write(response)
-                    temp_file_path = temp_file.name
+        Envelope files unwrap their data key with the user's KEK; legacy files
+        derive a key from the password and their own salt.
+        """
+        if encrypted_file.wrapped_key:
+            vault = self.db_session.query(Vault).filter(Vault.user_id == encrypted_file.user_id).first()
+            if not vault or not vault.kek_salt:
+                raise StreamDecryptionError("Vault key parameters are missing")
+            return iter_decrypt_envelope(
+                ciphertext_chunks,
+                password,
+                bytes.fromhex(vault.kek_salt),
+                vault.kek_iterations,
+                encrypted_file.wrapped_key,
+                encrypted_file.user_id,
+            )
+        return iter_decrypt_chunks(ciphertext_chunks, password, cache_scope=encrypted_file.user_id)
+
+    def iter_decrypt_uploaded_file(self, user_id: str, file_path: str, password: str) -> Optional[Iterator[bytes]]:
+        """
+        Prepare decryption of an encrypted file uploaded by the user (e.g. a downloaded .enc copy).
 
-                try:
-                    # Decrypt the temporary file
-                    decrypted_data = decrypt_file_to_bytes(temp_file_path, password)
+        Envelope containers carry a key identifier in their header, which is used to
+        find the wrapped data key among the user's files.
 
-                    if decrypted_data is None:
-                        print(f"Failed to decrypt file: {encrypted_file.encrypted_path}")
-                        return None
+        Args:
+            user_id: The ID of the user uploading the file
+            file_path: Path to the uploaded encrypted file
+            password: Password to use for decryption
 
-                    return decrypted_data, encrypted_file.original_filename
-                finally:
-                    # Clean up the temporary file
-                    os.unlink(temp_file_path)
+        Returns:
+            A plaintext iterator that has not been started, or None if no key is available
+        """
+        with open(file_path, 'rb') as file:
+            prefix = file.read(512)
 
-            except Exception as e:
-                print(f"Error downloading from Supabase: {str(e)}")
+        if is_stream_container(prefix):
+            try:
+                header = parse_stream_header(prefix)
+            except StreamDecryptionError:
                 return None
-        else:
-            # Check if the encrypted file exists on disk (local storage)
-            if not os.path.exists(encrypted_file.encrypted_path):
-                print(f"Encrypted file does not exist at path: {encrypted_file.encrypted_path}")
+            if header is None:
                 return None
 
-            # Decrypt the file and get the data
-            decrypted_data = decrypt_file_to_bytes(encrypted_file.encrypted_path, password)
+            if header.kdf_id == KDF_NONE:
+                encrypted_file = (
+                    self.db_session.query(EncryptedFile)
+                    .filter(EncryptedFile.user_id == user_id, EncryptedFile.key_id == header.salt.hex())
+                    .first()
+                )
+                if not encrypted_file or not encrypted_file.wrapped_key:
+                    return None
+                return self._iter_plaintext(encrypted_file, iter_file_chunks(file_path), password)
 
-            if decrypted_data is None:
-                print(f"Failed to decrypt file: {encrypted_file.encrypted_path}")
-                return None
+        return iter_decrypt_chunks(iter_file_chunks(file_path), password, cache_scope=user_id)
+
+    def rewrap_file_keys(self, user_id: str, old_password: str, new_password: str) -> Tuple[int, int]:
+        """
+        Re-wrap the data keys of the user's envelope files under a new password.
+
+        Only the small wrapped keys change; no file is re-encrypted. Files whose
+        keys were wrapped under a different password are left untouched.
+
+        Args:
+            user_id: The ID of the user changing their password
+            old_password: The password the keys are currently wrapped with
+            new_password: The password to wrap the keys with
+
+        Returns:
+            Tuple of (rewrapped_count, skipped_count)
+
+        Raises:
+            StreamDecryptionError: If the old password unwraps none of the keys
+        """
+        vault = self.db_session.query(Vault).filter(Vault.user_id == user_id).first()
+        if not vault or not vault.kek_salt:
+            return 0, 0
+
+        old_kek = self.derive_kek(vault, old_password)
+        new_kek = self.derive_kek(vault, new_password)
+
+        files = (
+            self.db_session.query(EncryptedFile)
+            .filter(EncryptedFile.user_id == user_id, EncryptedFile.wrapped_key.isnot(None))
+            .all()
+        )
+
+        rewrapped = skipped = 0
+        for encrypted_file in files:
+            try:
+                data_key = unwrap_data_key(old_kek, encrypted_file.wrapped_key, user_id)
+            except StreamDecryptionError:
+                skipped += 1
+                continue
+            encrypted_file.wrapped_key = wrap_data_key(new_kek, data_key, user_id)
+            rewrapped += 1
+
+        if skipped and not rewrapped:
+            raise StreamDecryptionError("The old password does not unwrap any file key")
+        self.db_session.commit()
+
+        # Keys derived from the old password should not outlive the change
+        purge_cached_keys(user_id)
+
+        return rewrapped, skipped
+
+    async def decrypt_file(self, file_id: str, user_id: str, password: str) -> Optional[tuple]:
+        """
+        Decrypt a file from the user's vault into memory.
+
+        Prefer open_decrypted_stream() for responses; this buffers the whole plaintext.
+
+        Args:
+            file_id: The ID of the file to decrypt
+            user_id: The ID of the user requesting decryption
+            password: Password to use for decryption
+
+        Returns:
+            Tuple of (decrypted_data: bytes, original_filename: str), or None if decryption failed
+        """
+        result = await self.open_decrypted_stream(file_id, user_id, password)
+        if result is None:
+            return None
+
+        plaintext_chunks, original_filename = result
+        try:
+            return b"".join([chunk async for chunk in plaintext_chunks]), original_filename
+        except Exception as e:
+            print(f"Failed to decrypt file {file_id}: {str(e)}")
+            return None
+
+    async def open_archive(
+        self, user_id: str, file_ids: Optional[List[str]], password: Optional[str], decrypt: bool = True
+    ) -> Optional[AsyncIterator[ZipEntry]]:
+        """
+        Prepare a bulk download of the user's files as archive entries.
+
+        All records, and for envelope files the user's KEK, are loaded before the
+        first entry, so producing the entries needs no database access. The KEK is
+        derived once for the whole archive and unwraps every envelope file's data
+        key; legacy files derive from their own salt through the key cache.
+
+        Up to archive_read_ahead_files entries are fetched and decrypted
+        concurrently, each buffering at most archive_read_ahead_chunks chunks, so
+        memory stays bounded however large the archive is. A file whose key,
+        header or object cannot be read is left out and listed in ERRORS.txt.
+
+        Args:
+            user_id: The ID of the user downloading the files
+            file_ids: IDs of the files to include (in this order), or None for all files
+            password: Password to decrypt with (unused when decrypt is False)
+            decrypt: Stream plaintext if True, the stored .enc containers if False
+
+        Returns:
+            Async iterator of ZipEntry, or None if none of the files exist
+
+        Raises:
+            StreamDecryptionError: If the password does not unwrap the user's file keys
+        """
+        files = await self.get_user_files(user_id, file_ids)
+        if not files:
+            return None
 
-            return decrypted_data, encrypted_file.original_filename
+        kek = None
+        if decrypt and any(encrypted_file.wrapped_key for encrypted_file in files):
+            vault = await self._get_vault(user_id)
+            if not vault or not vault.kek_salt:
+                raise StreamDecryptionError("Vault key parameters are missing")
+            kek = await self.derive_kek_async(vault, password)
+            # Check the password once up front rather than failing every entry
+            first = next(encrypted_file for encrypted_file in files if encrypted_file.wrapped_key)
+            unwrap_data_key(kek, first.wrapped_key, user_id)
+
+        errors = []
+        if file_ids is not None:
+            found = {encrypted_file.id for encrypted_file in files}
+            errors.extend(f"{file_id}: file not found" for file_id in file_ids if file_id not in found)
+
+        return self._iter_archive_entries(files, password, kek, decrypt, errors)
+
+    async def _iter_archive_entries(
+        self, files: List[EncryptedFile], password: Optional[str], kek: Optional[bytes], decrypt: bool, errors: List[str]
+    ) -> AsyncIterator[ZipEntry]:
+        read_ahead = max(1, settings.archive_read_ahead_files)
+        depth = max(1, settings.archive_read_ahead_chunks)
+        remaining = iter(files)
+        window = deque()
+        names = set()
+
+        def start(encrypted_file):
+            window.append((encrypted_file, _Prefetched(self._archive_chunks(encrypted_file, password, kek, decrypt), depth)))
+
+        try:
+            for encrypted_file in islice(remaining, read_ahead):
+                start(encrypted_file)
+            while window:
+                encrypted_file, chunks = window[0]
+                try:
+                    first_chunk = await chunks.first()
+                except Exception as e:
+                    print(f"Skipping {encrypted_file.encrypted_path} in archive: {str(e)}")
+                    errors.append(f"{encrypted_file.original_filename} ({encrypted_file.id}): {str(e) or type(e).__name__}")
+                    window.popleft()
+                    next_file = next(remaining, None)
+                    if next_file is not None:
+                        start(next_file)
+                    continue
+
+                name = _archive_name(encrypted_file.original_filename + ("" if decrypt else ".enc"), names)
+                size = encrypted_file.file_size if decrypt else None
+                yield ZipEntry(name, encrypted_file.created_at, size, chunks.rest(first_chunk))
+                # The entry has been written; start fetching the next file
+                window.popleft()
+                next_file = next(remaining, None)
+                if next_file is not None:
+                    start(next_file)
+
+            if errors:
+                report = ("\n".join(errors) + "\n").encode("utf-8")
+                yield ZipEntry(_archive_name("ERRORS.txt", names), None, len(report), _single(report))
+        finally:
+            for _, chunks in window:
+                chunks.cancel()
+
+    async def _archive_chunks(
+        self, encrypted_file: EncryptedFile, password: Optional[str], kek: Optional[bytes], decrypt: bool
+    ) -> AsyncIterator[bytes]:
+        ciphertext = self.get_storage(encrypted_file).get(encrypted_file.encrypted_path)
+        if decrypt:
+            if encrypted_file.wrapped_key:
+                decryptor = StreamDecryptor(key=unwrap_data_key(kek, encrypted_file.wrapped_key, encrypted_file.user_id))
+            else:
+                decryptor = AutoDecryptor(password, cache_scope=encrypted_file.user_id)
+            ciphertext = aiter_decrypt(ciphertext, decryptor)
+        async for chunk in ciphertext:
+            yield chunk
 
     def list_user_files(self, user_id: str) -> List[EncryptedFile]:
         """
@@ -200,7 +607,99 @@ class VaultService:
         
         return files
 
-    def delete_file(self, file_id: str, user_id: str) -> bool:
+    def list_user_files_page(
+        self,
+        user_id: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        sort: str = "created_at",
+        order: str = "desc",
+        name_prefix: Optional[str] = None,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        include_total: bool = False,
+    ) -> FileListPage:
+        """
+        List one page of the user's files using keyset pagination on (sort key, id).
+
+        Only the columns needed for the listing are loaded, and each page seeks
+        past the previous page's last row instead of using OFFSET, so every page
+        costs the same however deep the client has paged.
+
+        Args:
+            user_id: The ID of the user whose files to list
+            limit: Maximum number of files to return
+            cursor: next_cursor from the previous page, or None for the first page
+            sort: "created_at", "size" or "name"
+            order: "asc" or "desc"
+            name_prefix: Only files whose original filename starts with this
+            min_size: Only files of at least this many bytes
+            max_size: Only files of at most this many bytes
+            created_after: Only files uploaded at or after this time
+            created_before: Only files uploaded before this time
+            include_total: Also count all files matching the filters
+
+        Returns:
+            A FileListPage
+
+        Raises:
+            ValueError: If the sort options or cursor are invalid
+        """
+        if sort not in FILE_LIST_SORT_COLUMNS or order not in ("asc", "desc"):
+            raise ValueError("Invalid sort options")
+        sort_column = FILE_LIST_SORT_COLUMNS[sort]
+        if sort == "created_at":
+            # Compare timestamps exactly as stored (SQLite keeps them as text of varying precision)
+            sort_column = type_coerce(sort_column, String)
+
+        filters = [EncryptedFile.user_id == user_id]
+        if name_prefix:
+            filters.append(EncryptedFile.original_filename.startswith(name_prefix, autoescape=True))
+        if min_size is not None:
+            filters.append(EncryptedFile.file_size >= min_size)
+        if max_size is not None:
+            filters.append(EncryptedFile.file_size <= max_size)
+        if created_after is not None:
+            filters.append(EncryptedFile.created_at >= created_after)
+        if created_before is not None:
+            filters.append(EncryptedFile.created_at < created_before)
+
+        total = None
+        if include_total:
+            total = self.db_session.query(func.count(EncryptedFile.id)).filter(*filters).scalar()
+
+        query = self.db_session.query(
+            EncryptedFile.id,
+            EncryptedFile.original_filename,
+            EncryptedFile.file_size,
+            EncryptedFile.created_at,
+            sort_column.label("sort_key"),
+        ).filter(*filters)
+
+        if cursor:
+            key, last_id = _decode_cursor(cursor, sort, order)
+            if order == "desc":
+                query = query.filter(or_(sort_column < key, and_(sort_column == key, EncryptedFile.id < last_id)))
+            else:
+                query = query.filter(or_(sort_column > key, and_(sort_column == key, EncryptedFile.id > last_id)))
+
+        if order == "desc":
+            query = query.order_by(sort_column.desc(), EncryptedFile.id.desc())
+        else:
+            query = query.order_by(sort_column.asc(), EncryptedFile.id.asc())
+
+        # Fetch one extra row to learn whether another page follows
+        rows = query.limit(limit + 1).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor(sort, order, rows[-1].sort_key, rows[-1].id)
+
+        return FileListPage(rows, next_cursor, total)
+
+    async def delete_file(self, file_id: str, user_id: str) -> bool:
         """
         Delete a file from the user's vault.
 
@@ -212,56 +711,279 @@ class VaultService:
             True if the file was deleted, False otherwise
         """
         # Verify the file belongs to the user
-        encrypted_file = (
+        encrypted_file = await self.get_user_file(file_id, user_id)
+
+        if not encrypted_file:
+            return False
+
+        # Delete the blob from its storage backend
+        try:
+            await self.get_storage(encrypted_file).delete(encrypted_file.encrypted_path)
+        except StorageError as e:
+            print(f"Error deleting {encrypted_file.encrypted_path}: {str(e)}")
+            # Continue to delete the database record anyway
+
+        # Delete the file metadata and the encrypted file record
+        await self._delete_file_records(encrypted_file)
+
+        return True
+
+    # Database access used by the async methods above. This class runs it on its
+    # (sync) Session; AsyncVaultService awaits the same operations on an AsyncSession.
+
+    async def _get(self, model, ident):
+        return self.db_session.get(model, ident)
+
+    async def get_user_file(self, file_id: str, user_id: str) -> Optional[EncryptedFile]:
+        """Return the user's file with the given ID, or None if it does not exist or belongs to someone else."""
+        return (
             self.db_session.query(EncryptedFile)
             .filter(EncryptedFile.id == file_id, EncryptedFile.user_id == user_id)
             .first()
         )
 
-        if not encrypted_file:
-            return False
+    async def _get_vault(self, user_id: str) -> Optional[Vault]:
+        return self.db_session.query(Vault).filter(Vault.user_id == user_id).first()
 
-        # Check if the encrypted file is stored in Supabase
-        if encrypted_file.storage_location == "supabase":
-            # The encrypted_path is the path in the Supabase bucket
-            actual_path = encrypted_file.encrypted_path
+    async def get_user_files(self, user_id: str, file_ids: Optional[List[str]] = None) -> List[EncryptedFile]:
+        """Return the given files of the user in the order requested (unknown IDs are skipped), or all in upload order."""
+        query = self.db_session.query(EncryptedFile).filter(EncryptedFile.user_id == user_id)
+        if file_ids is None:
+            return query.order_by(EncryptedFile.created_at, EncryptedFile.id).all()
+        return _in_requested_order(query.filter(EncryptedFile.id.in_(file_ids)).all(), file_ids)
 
-            # Delete the file from Supabase
-            try:
-                from supabase import create_client
-                from ..config.settings import settings
+    async def prepare_vault(self, user_id: str) -> Vault:
+        """
+        Return the user's vault with KEK parameters, creating it as create_vault() does.
 
-                SUPABASE_URL = settings.supabase_url if settings.supabase_url else os.getenv("SUPABASE_URL", "")
-                SUPABASE_KEY = settings.supabase_key if settings.supabase_key else os.getenv("SUPABASE_KEY", "")
+        Only the first upload of a user (or a legacy vault without KEK parameters)
+        commits here; otherwise the vault is just loaded.
+        """
+        return self.create_vault(user_id)
 
-                if not SUPABASE_URL or not SUPABASE_KEY:
-                    print("Supabase configuration not found")
-                    # Continue to delete the database record anyway
-                else:
-                    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    async def save_file_records(self, encrypted_files: List[EncryptedFile]) -> None:
+        """
+        Record stored files and their metadata in a single transaction.
 
-                    # Delete the file from Supabase storage
-                    supabase.storage.from_(settings.bucket_name).remove([actual_path])
+        Also the bulk insert for batch uploads: all files go out in one flush
+        (a multi-row INSERT ... RETURNING where the backend supports it), which
+        assigns their IDs and loads the server-side timestamps, and everything
+        pending in the session is committed once.
 
-            except Exception as e:
-                print(f"Error deleting from Supabase: {str(e)}")
-                # Continue to delete the database record anyway
-        else:
-            # Delete the file from the local filesystem
-            if os.path.exists(encrypted_file.encrypted_path):
-                os.remove(encrypted_file.encrypted_path)
+        Args:
+            encrypted_files: New EncryptedFile records for files already in storage
+        """
+        self.add_file_records(encrypted_files)
+        self.db_session.commit()
 
-        # Delete the file metadata
+    def add_file_records(self, encrypted_files: List[EncryptedFile]) -> None:
+        """Add files and their metadata rows to the session, flushing once for the file IDs; does not commit."""
+        self.db_session.add_all(encrypted_files)
+        self.db_session.flush()
+        self.db_session.add_all([_file_metadata(encrypted_file) for encrypted_file in encrypted_files])
+
+    async def _delete_file_records(self, encrypted_file: EncryptedFile) -> None:
         file_metadata = (
             self.db_session.query(FileMetadata)
-            .filter(FileMetadata.file_id == file_id)
+            .filter(FileMetadata.file_id == encrypted_file.id)
             .first()
         )
         if file_metadata:
             self.db_session.delete(file_metadata)
-
-        # Delete the encrypted file record
         self.db_session.delete(encrypted_file)
         self.db_session.commit()
 
-        return True
\ No newline at end of file
+    async def list_user_files_page_async(self, user_id: str, limit: int, **options) -> FileListPage:
+        """Async counterpart of list_user_files_page() for async routes."""
+        return self.list_user_files_page(user_id, limit, **options)
+
+
+class AsyncVaultService(VaultService):
+    """
+    VaultService for an AsyncSession, used by the async API routes.
+
+    The storage and crypto flows are inherited; only the database access hooks
+    are overridden, so queries are awaited instead of blocking the event loop.
+    The sync-only methods (create_vault, add_file_records, rewrap_file_keys,
+    list_user_files, iter_decrypt_uploaded_file) are not available on this class.
+    """
+
+    def __init__(self, db_session: AsyncSession):
+        self.db_session = db_session
+
+    async def _get(self, model, ident):
+        return await self.db_session.get(model, ident)
+
+    async def get_user_file(self, file_id: str, user_id: str) -> Optional[EncryptedFile]:
+        result = await self.db_session.execute(
+            select(EncryptedFile).where(EncryptedFile.id == file_id, EncryptedFile.user_id == user_id)
+        )
+        return result.scalars().first()
+
+    async def _get_vault(self, user_id: str) -> Optional[Vault]:
+        result = await self.db_session.execute(select(Vault).where(Vault.user_id == user_id))
+        return result.scalars().first()
+
+    async def get_user_files(self, user_id: str, file_ids: Optional[List[str]] = None) -> List[EncryptedFile]:
+        query = select(EncryptedFile).where(EncryptedFile.user_id == user_id)
+        if file_ids is None:
+            result = await self.db_session.execute(query.order_by(EncryptedFile.created_at, EncryptedFile.id))
+            return list(result.scalars())
+        result = await self.db_session.execute(query.where(EncryptedFile.id.in_(file_ids)))
+        return _in_requested_order(result.scalars().all(), file_ids)
+
+    async def prepare_vault(self, user_id: str) -> Vault:
+        vault = await self._get_vault(user_id)
+        if vault and vault.kek_salt:
+            return vault
+
+        if vault is None:
+            self.db_session.add(_new_vault(user_id))
+        else:
+            await self.db_session.execute(_assign_kek_params(vault))
+        try:
+            await self.db_session.commit()
+        except IntegrityError:
+            await self.db_session.rollback()
+
+        result = await self.db_session.execute(
+            select(Vault).where(Vault.user_id == user_id).execution_options(populate_existing=True)
+        )
+        return result.scalars().one()
+
+    async def save_file_records(self, encrypted_files: List[EncryptedFile]) -> None:
+        self.db_session.add_all(encrypted_files)
+        await self.db_session.flush()
+        self.db_session.add_all([_file_metadata(encrypted_file) for encrypted_file in encrypted_files])
+        await self.db_session.commit()
+
+    async def _delete_file_records(self, encrypted_file: EncryptedFile) -> None:
+        # Plain DELETE statements: session.delete() would lazy-load the metadata relationship
+        await self.db_session.execute(delete(FileMetadata).where(FileMetadata.file_id == encrypted_file.id))
+        await self.db_session.execute(delete(EncryptedFile).where(EncryptedFile.id == encrypted_file.id))
+        await self.db_session.commit()
+
+    async def list_user_files_page_async(self, user_id: str, limit: int, **options) -> FileListPage:
+        # The keyset query is built with the ORM Query API; run it on the session's sync facade
+        return await self.db_session.run_sync(
+            lambda session: VaultService(session).list_user_files_page(user_id, limit, **options)
+        )
+
+
+def _new_vault(user_id: str) -> Vault:
+    return Vault(user_id=user_id, kek_salt=generate_salt().hex(), kek_iterations=settings.pbkdf2_iterations)
+
+
+def _assign_kek_params(vault: Vault):
+    # Conditional, so a concurrent request that already assigned KEK parameters keeps them
+    return (
+        update(Vault)
+        .where(Vault.id == vault.id, Vault.kek_salt.is_(None))
+        .values(kek_salt=generate_salt().hex(), kek_iterations=settings.pbkdf2_iterations)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _file_metadata(encrypted_file: EncryptedFile) -> FileMetadata:
+    return FileMetadata(
+        file_id=encrypted_file.id,
+        original_filename=encrypted_file.original_filename,
+        file_size=encrypted_file.file_size,
+        algorithm_version=encrypted_file.algorithm_version
+    )
+
+
+def _in_requested_order(files: List[EncryptedFile], file_ids: List[str]) -> List[EncryptedFile]:
+    by_id = {encrypted_file.id: encrypted_file for encrypted_file in files}
+    return [by_id[file_id] for file_id in dict.fromkeys(file_ids) if file_id in by_id]
+
+
+def _archive_name(filename: str, used: set) -> str:
+    """Return a flat, unique entry name for a file ("name (2).ext" for repeats)."""
+    name = filename.replace("/", "_").replace("\\", "_") or "file"
+    stem, ext = os.path.splitext(name)
+    candidate, counter = name, 1
+    while candidate in used:
+        counter += 1
+        candidate = f"{stem} ({counter}){ext}"
+    used.add(candidate)
+    return candidate
+
+
+async def _single(data: bytes) -> AsyncIterator[bytes]:
+    yield data
+
+
+_END = object()
+
+
+class _Prefetched:
+    """
+    Reads an async iterator ahead in a background task, into a bounded queue.
+
+    Errors are re-raised to the reader at the point they occurred.
+    """
+
+    def __init__(self, chunks: AsyncIterator[bytes], depth: int):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=depth)
+        self._task = asyncio.ensure_future(self._pump(chunks))
+
+    async def _pump(self, chunks: AsyncIterator[bytes]) -> None:
+        try:
+            async for chunk in chunks:
+                await self._queue.put(chunk)
+        except Exception as e:
+            await self._queue.put(e)
+        else:
+            await self._queue.put(_END)
+
+    async def _next(self):
+        item = await self._queue.get()
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    async def first(self) -> Optional[bytes]:
+        """Wait for the first chunk (None if there is none), so open errors surface before the entry is started."""
+        item = await self._next()
+        return None if item is _END else item
+
+    async def rest(self, first_chunk: Optional[bytes]) -> AsyncIterator[bytes]:
+        """Yield the first chunk and everything after it."""
+        if first_chunk is None:
+            return
+        yield first_chunk
+        try:
+            while True:
+                item = await self._next()
+                if item is _END:
+                    return
+                yield item
+        finally:
+            self.cancel()
+
+    def cancel(self) -> None:
+        self._task.cancel()
+
+
+async def _prime(plaintext_chunks: AsyncIterator[bytes], path: str) -> Optional[AsyncIterator[bytes]]:
+    """
+    Decrypt the first chunk up front so key and header errors surface before a response starts.
+    """
+    try:
+        first_chunk = await plaintext_chunks.__anext__()
+    except StopAsyncIteration:
+        first_chunk = b""
+    except CryptoExecutorSaturated:
+        raise
+    except Exception as e:
+        print(f"Failed to decrypt file {path}: {str(e)}")
+        return None
+    return _prepend(first_chunk, plaintext_chunks)
+
+
+async def _prepend(first_chunk: bytes, rest: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    if first_chunk:
+        yield first_chunk
+    async for chunk in rest:
+        yield chunk
@@ -0,0 +1,97 @@
+"""
+Storage backends for encrypted blobs.
+
+``EncryptedFile.storage_location`` names the backend holding a file and
+``EncryptedFile.encrypted_path`` is its key within that backend. Backends are
+created on first use and shared for the life of the process.
+"""
+import threading
+from typing import Dict, List
+
+from ..config.settings import settings
+from .base import (
+    DEFAULT_IO_CHUNK_SIZE,
+    StorageBackend,
+    StorageError,
+    StorageObjectInfo,
+    StorageObjectNotFound,
+)
+from .local import LocalStorageBackend
+from .memory import InMemoryStorageBackend
+from .supabase import SupabaseStorageBackend
+from .supabase_client import SupabaseClientManager, close_supabase_client_manager, get_supabase_client_manager
+
+_backends: Dict[str, StorageBackend] = {}
+_lock = threading.Lock()
+
+
+def supabase_enabled() -> bool:
+    """Return True if Supabase storage is switched on and configured."""
+    return settings.use_supabase.lower() == "true" and bool(settings.supabase_url and settings.supabase_key)
+
+
+def _create_backend(location: str) -> StorageBackend:
+    if location == "local":
+        return LocalStorageBackend()
+    if location == "supabase":
+        return SupabaseStorageBackend(get_supabase_client_manager(), settings.bucket_name)
+    if location == "memory":
+        return InMemoryStorageBackend()
+    raise StorageError(f"Unknown storage location: {location}")
+
+
+def get_storage_backend(location: str) -> StorageBackend:
+    """
+    Return the backend for a storage location ("local", "supabase" or "memory").
+
+    Raises:
+        StorageError: If the location is unknown
+    """
+    with _lock:
+        backend = _backends.get(location)
+        if backend is None:
+            backend = _backends[location] = _create_backend(location)
+        return backend
+
+
+def register_storage_backend(location: str, backend: StorageBackend) -> None:
+    """Install a backend for a storage location, replacing any existing one (e.g. in tests)."""
+    with _lock:
+        _backends[location] = backend
+
+
+def reset_storage_backends() -> None:
+    """Forget all backends so they are re-created from settings on next use."""
+    with _lock:
+        _backends.clear()
+
+
+def get_upload_locations() -> List[str]:
+    """
+    Return the storage locations new uploads are tried in, in order.
+
+    STORAGE_BACKEND selects the primary backend; otherwise Supabase is used when
+    configured. Local storage is always the final fallback.
+    """
+    primary = settings.storage_backend or ("supabase" if supabase_enabled() else "local")
+    return [primary] if primary == "local" else [primary, "local"]
+
+
+__all__ = [
+    "DEFAULT_IO_CHUNK_SIZE",
+    "InMemoryStorageBackend",
+    "LocalStorageBackend",
+    "StorageBackend",
+    "StorageError",
+    "StorageObjectInfo",
+    "StorageObjectNotFound",
+    "SupabaseClientManager",
+    "SupabaseStorageBackend",
+    "close_supabase_client_manager",
+    "get_storage_backend",
+    "get_supabase_client_manager",
+    "get_upload_locations",
+    "register_storage_backend",
+    "reset_storage_backends",
+    "supabase_enabled",
+]
@@ -0,0 +1,99 @@
+from abc import ABC, abstractmethod
+from typing import AsyncIterable, AsyncIterator, NamedTuple, Optional
+
+import aiofiles
+
+# Default size of the chunks backends yield from get()
+DEFAULT_IO_CHUNK_SIZE = 64 * 1024
+
+
+class StorageError(Exception):
+    """Raised when a storage backend operation fails."""
+
+
+class StorageObjectNotFound(StorageError):
+    """Raised when the requested object does not exist in the backend."""
+
+
+class StorageObjectInfo(NamedTuple):
+    size: int
+    etag: Optional[str] = None
+
+
+class StorageBackend(ABC):
+    """
+    Interface for the places encrypted blobs are kept.
+
+    All I/O is async and streaming: put() consumes an async iterator of chunks
+    and get() yields chunks, so no backend needs the whole object in memory.
+    Keys are the values stored in EncryptedFile.encrypted_path.
+    """
+
+    name: str = ""
+
+    @abstractmethod
+    async def put(self, key: str, chunks: AsyncIterable[bytes], content_type: str = "application/octet-stream") -> int:
+        """
+        Store an object from a stream of chunks.
+
+        Args:
+            key: Object key
+            chunks: Async iterator of the object's bytes
+            content_type: MIME type recorded by backends that support it
+
+        Returns:
+            Number of bytes stored
+        """
+
+    @abstractmethod
+    def get(self, key: str, offset: int = 0, length: Optional[int] = None) -> AsyncIterator[bytes]:
+        """
+        Stream an object, or a byte range of it.
+
+        Args:
+            key: Object key
+            offset: First byte to return
+            length: Number of bytes to return (None for the rest of the object)
+
+        Yields:
+            Chunks of the object
+
+        Raises:
+            StorageObjectNotFound: If the object does not exist
+        """
+
+    @abstractmethod
+    async def delete(self, key: str) -> bool:
+        """Delete an object. Returns False if it did not exist."""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Return True if the object exists."""
+
+    @abstractmethod
+    async def stat(self, key: str) -> Optional[StorageObjectInfo]:
+        """Return the object's size and ETag, or None if it does not exist."""
+
+    async def put_file(self, key: str, path: str, content_type: str = "application/octet-stream") -> int:
+        """
+        Store the contents of a local file, e.g. a completed upload staging file.
+
+        Backends may move the file instead of copying it, so callers must not use
+        ``path`` afterwards.
+        """
+        async def chunks():
+            async with aiofiles.open(path, "rb") as file:
+                while True:
+                    chunk = await file.read(DEFAULT_IO_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+
+        return await self.put(key, chunks(), content_type)
+
+    async def read_bytes(self, key: str, offset: int = 0, length: Optional[int] = None) -> bytes:
+        """Read an object (or a range of it) fully into memory; meant for small reads such as headers."""
+        parts = []
+        async for chunk in self.get(key, offset, length):
+            parts.append(chunk)
+        return b"".join(parts)
@@ -0,0 +1,119 @@
+import errno
+import os
+import uuid
+from typing import AsyncIterable, AsyncIterator, Optional
+
+import aiofiles
+import aiofiles.os
+
+from .base import DEFAULT_IO_CHUNK_SIZE, StorageBackend, StorageError, StorageObjectInfo, StorageObjectNotFound
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Stores objects on the local filesystem.
+
+    Keys are file paths; relative keys are resolved against ``base_dir`` when one
+    is given (otherwise against the working directory, matching existing records).
+    """
+
+    name = "local"
+
+    def __init__(self, base_dir: Optional[str] = None, chunk_size: int = DEFAULT_IO_CHUNK_SIZE):
+        self.base_dir = base_dir
+        self.chunk_size = chunk_size
+
+    def _path(self, key: str) -> str:
+        if self.base_dir and not os.path.isabs(key):
+            return os.path.join(self.base_dir, key)
+        return key
+
+    async def put(self, key: str, chunks: AsyncIterable[bytes], content_type: str = "application/octet-stream") -> int:
+        path = self._path(key)
+        # Write to a sibling temp file and rename, so readers never see a partial object
+        temp_path = f"{path}.{uuid.uuid4().hex}.part"
+        written = 0
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                await aiofiles.os.makedirs(directory, exist_ok=True)
+            async with aiofiles.open(temp_path, "wb") as file:
+                async for chunk in chunks:
+                    await file.write(chunk)
+                    written += len(chunk)
+            await aiofiles.os.replace(temp_path, path)
+        except BaseException as e:
+            if await aiofiles.os.path.exists(temp_path):
+                await aiofiles.os.remove(temp_path)
+            if isinstance(e, OSError):
+                raise StorageError(f"Local write failed: {e}") from e
+            raise
+        return written
+
+    async def put_file(self, key: str, path: str, content_type: str = "application/octet-stream") -> int:
+        # Same filesystem: adopt the file with a rename instead of copying it
+        target = self._path(key)
+        try:
+            directory = os.path.dirname(target)
+            if directory:
+                await aiofiles.os.makedirs(directory, exist_ok=True)
+            try:
+                await aiofiles.os.replace(path, target)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                # Different filesystem; fall back to a streamed copy
+                written = await super().put_file(key, path, content_type)
+                await aiofiles.os.remove(path)
+                return written
+            return (await aiofiles.os.stat(target)).st_size
+        except OSError as e:
+            raise StorageError(f"Local write failed: {e}") from e
+
+    async def get(self, key: str, offset: int = 0, length: Optional[int] = None) -> AsyncIterator[bytes]:
+        path = self._path(key)
+        try:
+            file = await aiofiles.open(path, "rb")
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError) as e:
+            raise StorageObjectNotFound(key) from e
+        except OSError as e:
+            raise StorageError(f"Local read failed: {e}") from e
+
+        remaining = length
+        try:
+            if offset:
+                await file.seek(offset)
+            while remaining is None or remaining > 0:
+                size = self.chunk_size if remaining is None else min(self.chunk_size, remaining)
+                try:
+                    chunk = await file.read(size)
+                except OSError as e:
+                    raise StorageError(f"Local read failed: {e}") from e
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+        finally:
+            await file.close()
+
+    async def delete(self, key: str) -> bool:
+        try:
+            await aiofiles.os.remove(self._path(key))
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            raise StorageError(f"Local delete failed: {e}") from e
+        return True
+
+    async def exists(self, key: str) -> bool:
+        return await aiofiles.os.path.isfile(self._path(key))
+
+    async def stat(self, key: str) -> Optional[StorageObjectInfo]:
+        try:
+            result = await aiofiles.os.stat(self._path(key))
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            raise StorageError(f"Local stat failed: {e}") from e
+        return StorageObjectInfo(size=result.st_size, etag=f'"{result.st_mtime_ns:x}-{result.st_size:x}"')
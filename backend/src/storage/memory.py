@@ -0,0 +1,43 @@
+import hashlib
+from typing import AsyncIterable, AsyncIterator, Dict, Optional
+
+from .base import DEFAULT_IO_CHUNK_SIZE, StorageBackend, StorageObjectInfo, StorageObjectNotFound
+
+
+class InMemoryStorageBackend(StorageBackend):
+    """
+    Keeps objects in a dict, standing in for an S3-style object store in tests and benchmarks.
+    """
+
+    name = "memory"
+
+    def __init__(self, chunk_size: int = DEFAULT_IO_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.objects: Dict[str, bytes] = {}
+
+    async def put(self, key: str, chunks: AsyncIterable[bytes], content_type: str = "application/octet-stream") -> int:
+        parts = []
+        async for chunk in chunks:
+            parts.append(chunk)
+        self.objects[key] = b"".join(parts)
+        return len(self.objects[key])
+
+    async def get(self, key: str, offset: int = 0, length: Optional[int] = None) -> AsyncIterator[bytes]:
+        if key not in self.objects:
+            raise StorageObjectNotFound(key)
+        data = self.objects[key]
+        end = len(data) if length is None else min(len(data), offset + length)
+        for start in range(offset, end, self.chunk_size):
+            yield data[start:min(start + self.chunk_size, end)]
+
+    async def delete(self, key: str) -> bool:
+        return self.objects.pop(key, None) is not None
+
+    async def exists(self, key: str) -> bool:
+        return key in self.objects
+
+    async def stat(self, key: str) -> Optional[StorageObjectInfo]:
+        data = self.objects.get(key)
+        if data is None:
+            return None
+        return StorageObjectInfo(size=len(data), etag=f'"{hashlib.md5(data).hexdigest()}"')
@@ -0,0 +1,112 @@
+from typing import AsyncIterable, AsyncIterator, Optional
+from urllib.parse import quote
+
+import httpx
+
+from .base import DEFAULT_IO_CHUNK_SIZE, StorageBackend, StorageError, StorageObjectInfo, StorageObjectNotFound
+from .supabase_client import SupabaseClientManager
+
+# Supabase Storage reports missing objects as 400 or 404 depending on the version
+_NOT_FOUND_STATUSES = {400, 404}
+
+
+class SupabaseStorageBackend(StorageBackend):
+    """
+    Stores objects in a Supabase Storage bucket through its REST API.
+
+    Requests go through the shared, connection-pooled SupabaseClientManager.
+    Uploads are streamed as the request body and downloads are streamed from
+    the response, with byte ranges fetched through HTTP Range requests.
+    """
+
+    name = "supabase"
+
+    def __init__(self, manager: SupabaseClientManager, bucket: str, chunk_size: int = DEFAULT_IO_CHUNK_SIZE):
+        self.manager = manager
+        self.bucket = bucket
+        self.chunk_size = chunk_size
+
+    def _object_path(self, key: str, authenticated: bool = True) -> str:
+        prefix = "/object/authenticated" if authenticated else "/object"
+        return f"{prefix}/{self.bucket}/{quote(key)}"
+
+    async def put(self, key: str, chunks: AsyncIterable[bytes], content_type: str = "application/octet-stream") -> int:
+        written = 0
+
+        async def body():
+            nonlocal written
+            async for chunk in chunks:
+                written += len(chunk)
+                yield chunk
+
+        try:
+            response = await self.manager.send(
+                "POST",
+                self._object_path(key, authenticated=False),
+                content=body(),
+                headers={"Content-Type": content_type},
+            )
+        except httpx.HTTPError as e:
+            raise StorageError(f"Supabase upload failed: {e}") from e
+        if response.status_code >= 300:
+            raise StorageError(f"Supabase upload failed: HTTP {response.status_code} {response.text}")
+        return written
+
+    async def get(self, key: str, offset: int = 0, length: Optional[int] = None) -> AsyncIterator[bytes]:
+        headers = {}
+        if offset or length is not None:
+            end = "" if length is None else str(offset + length - 1)
+            headers["Range"] = f"bytes={offset}-{end}"
+
+        try:
+            response = await self.manager.send("GET", self._object_path(key), stream=True, headers=headers)
+        except httpx.HTTPError as e:
+            raise StorageError(f"Supabase download failed: {e}") from e
+
+        try:
+            if response.status_code in _NOT_FOUND_STATUSES:
+                raise StorageObjectNotFound(key)
+            if response.status_code >= 300:
+                raise StorageError(f"Supabase download failed: HTTP {response.status_code}")
+
+            # A server that ignores Range sends the whole object; skip to the requested bytes
+            skip = offset if response.status_code == 200 else 0
+            remaining = length
+            async for chunk in response.aiter_bytes(self.chunk_size):
+                if skip:
+                    if len(chunk) <= skip:
+                        skip -= len(chunk)
+                        continue
+                    chunk, skip = chunk[skip:], 0
+                if remaining is not None:
+                    chunk = chunk[:remaining]
+                    remaining -= len(chunk)
+                if chunk:
+                    yield chunk
+                if remaining == 0:
+                    break
+        finally:
+            await response.aclose()
+
+    async def delete(self, key: str) -> bool:
+        try:
+            response = await self.manager.send("DELETE", f"/object/{self.bucket}", json={"prefixes": [key]})
+        except httpx.HTTPError as e:
+            raise StorageError(f"Supabase delete failed: {e}") from e
+        if response.status_code >= 300:
+            raise StorageError(f"Supabase delete failed: HTTP {response.status_code}")
+        return bool(response.json())
+
+    async def exists(self, key: str) -> bool:
+        return await self.stat(key) is not None
+
+    async def stat(self, key: str) -> Optional[StorageObjectInfo]:
+        try:
+            response = await self.manager.send("HEAD", self._object_path(key))
+        except httpx.HTTPError as e:
+            raise StorageError(f"Supabase stat failed: {e}") from e
+        if response.status_code in _NOT_FOUND_STATUSES:
+            return None
+        if response.status_code >= 300:
+            raise StorageError(f"Supabase stat failed: HTTP {response.status_code}")
+        return StorageObjectInfo(size=int(response.headers.get("content-length", 0)), etag=response.headers.get("etag"))
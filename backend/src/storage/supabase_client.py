@@ -0,0 +1,179 @@
+"""
+Process-wide HTTP client for the Supabase Storage REST API.
+
+One ``httpx.AsyncClient`` is shared by every request so connections are kept
+alive and reused instead of paying for a new client and TLS handshake per call.
+The manager is started and closed by the FastAPI lifespan in ``main.py``.
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from ..config.settings import settings
+
+# Methods that are safe to resend after the connection was dropped
+_IDEMPOTENT_METHODS = {"GET", "HEAD", "DELETE"}
+
+
+class SupabaseClientManager:
+    def __init__(
+        self,
+        url: str,
+        key: str,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        write_timeout: float = 30.0,
+        pool_timeout: float = 5.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.url = url.rstrip("/")
+        self.key = key
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout, read=read_timeout, write=write_timeout, pool=pool_timeout
+        )
+        # A custom transport lets tests point the manager at a local stand-in
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._lock = asyncio.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.last_health: Optional[Dict[str, Any]] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.url}/storage/v1"
+
+    def _new_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"apikey": self.key, "Authorization": f"Bearer {self.key}"},
+            limits=self.limits,
+            timeout=self.timeout,
+            transport=self._transport,
+        )
+
+    async def start(self) -> None:
+        """Create the pooled client (no network traffic until the first request)."""
+        await self.get_client()
+
+    async def get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            async with self._lock:
+                if self._client is None or self._client.is_closed:
+                    self._client = self._new_client()
+        return self._client
+
+    async def send(self, method: str, path: str, stream: bool = False, **kwargs) -> httpx.Response:
+        """
+        Send a request through the shared client.
+
+        Idempotent requests that fail at the transport level (a pooled connection
+        closed by the server, a reset, a failed connect) are retried once. The
+        retry goes through the same client: httpx has already discarded the dead
+        connection, and closing the shared client would abort every other
+        transfer in flight.
+
+        Args:
+            method: HTTP method
+            path: Path relative to /storage/v1
+            stream: Return without reading the body; the caller must close the response
+            **kwargs: Passed to httpx.AsyncClient.build_request (headers, content, json, ...)
+
+        Returns:
+            The httpx response
+        """
+        attempts = 2 if method.upper() in _IDEMPOTENT_METHODS else 1
+        for attempt in range(attempts):
+            client = await self.get_client()
+            self.requests += 1
+            try:
+                return await client.send(client.build_request(method, path, **kwargs), stream=stream)
+            except httpx.TransportError as e:
+                self.failures += 1
+                if attempt + 1 >= attempts or isinstance(e, httpx.TimeoutException):
+                    raise
+                self.retries += 1
+
+    async def health_check(self, bucket: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Check that Supabase Storage is reachable with the configured key.
+
+        The check only observes: it is not retried and never resets the pool,
+        since closing the shared client would abort transfers in flight.
+        Stale idle connections are left to keepalive expiry.
+        """
+        bucket = bucket or settings.bucket_name
+        started = time.perf_counter()
+        client = await self.get_client()
+        self.requests += 1
+        try:
+            response = await client.get(f"/bucket/{bucket}")
+            healthy = response.status_code == 200
+            error = None if healthy else f"HTTP {response.status_code}"
+        except httpx.HTTPError as e:
+            self.failures += 1
+            healthy, error = False, str(e) or type(e).__name__
+
+        self.last_health = {
+            "status": "ok" if healthy else "unavailable",
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            "error": error,
+        }
+        return self.last_health
+
+    async def close(self) -> None:
+        async with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connected": self._client is not None and not self._client.is_closed,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "requests": self.requests,
+            "failures": self.failures,
+            "retries": self.retries,
+            "last_health": self.last_health,
+        }
+
+
+_manager: Optional[SupabaseClientManager] = None
+
+
+def get_supabase_client_manager() -> SupabaseClientManager:
+    """Return the process-wide Supabase client manager, creating it from settings on first use."""
+    global _manager
+    if _manager is None:
+        _manager = SupabaseClientManager(
+            settings.supabase_url,
+            settings.supabase_key,
+            max_connections=settings.supabase_pool_max_connections,
+            max_keepalive_connections=settings.supabase_pool_max_keepalive,
+            keepalive_expiry=settings.supabase_keepalive_expiry_seconds,
+            connect_timeout=settings.supabase_connect_timeout_seconds,
+            read_timeout=settings.supabase_read_timeout_seconds,
+            write_timeout=settings.supabase_write_timeout_seconds,
+            pool_timeout=settings.supabase_pool_timeout_seconds,
+        )
+    return _manager
+
+
+async def close_supabase_client_manager() -> None:
+    """Close the shared client on application shutdown."""
+    global _manager
+    if _manager is not None:
+        manager, _manager = _manager, None
+        await manager.close()
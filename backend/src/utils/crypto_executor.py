@@ -0,0 +1,237 @@
+"""
+Bounded executor for CPU-bound cryptography (PBKDF2, AES-GCM, Fernet).
+
+Async routes must not run key derivation or bulk encryption on the event loop,
+so this module keeps a size-capped worker pool with admission control: once
+``max_workers + max_queue_depth`` tasks are in flight, new work is rejected with
+CryptoExecutorSaturated, which the API maps to 503 Service Unavailable.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+from ..config.settings import settings
+
+
+class CryptoExecutorSaturated(RuntimeError):
+    """Raised when the crypto executor has no capacity for new work."""
+
+
+_SENTINEL = object()
+
+
+class CryptoExecutor:
+    def __init__(
+        self,
+        max_workers: int,
+        max_queue_depth: int,
+        use_process_pool_for_kdf: bool = False,
+        name: str = "crypto",
+    ):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.capacity = max_workers + max_queue_depth
+
+        self._threads = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._processes: Optional[ProcessPoolExecutor] = (
+            ProcessPoolExecutor(max_workers=max_workers) if use_process_pool_for_kdf else None
+        )
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._total_queue_wait = 0.0
+        self._max_queue_wait = 0.0
+        self._total_run_time = 0.0
+
+    def _acquire(self, force: bool = False) -> None:
+        with self._lock:
+            if not force and self._in_flight >= self.capacity:
+                self._rejected += 1
+                raise CryptoExecutorSaturated(
+                    f"{self.name} executor saturated ({self._in_flight}/{self.capacity} tasks in flight)"
+                )
+            self._in_flight += 1
+            self._submitted += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+
+    def _release(self, queue_wait: float, run_time: float, failed: bool) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            if failed:
+                self._failed += 1
+            else:
+                self._completed += 1
+            self._total_queue_wait += queue_wait
+            self._max_queue_wait = max(self._max_queue_wait, queue_wait)
+            self._total_run_time += run_time
+
+    def _timed(self, fn: Callable, args: tuple, enqueued: float, timings: list) -> Callable[[], Any]:
+        def task():
+            started = time.perf_counter()
+            timings.append(started - enqueued)
+            try:
+                return fn(*args)
+            finally:
+                timings.append(time.perf_counter() - started)
+        return task
+
+    def _submit(self, executor: Executor, fn: Callable, args: tuple, force: bool) -> Future:
+        self._acquire(force)
+        enqueued = time.perf_counter()
+        timings: list = []
+        try:
+            if executor is self._threads:
+                future = executor.submit(self._timed(fn, args, enqueued, timings))
+            else:
+                # Process pool tasks cannot report their start time back; count the whole latency as run time
+                future = executor.submit(fn, *args)
+        except BaseException:
+            self._release(0.0, 0.0, True)
+            raise
+
+        def done(future: Future) -> None:
+            # Released when the worker is done, not when the caller stops waiting: a
+            # cancelled await leaves the task running and still occupying its slot
+            if len(timings) == 2:
+                queue_wait, run_time = timings
+            else:
+                queue_wait, run_time = 0.0, time.perf_counter() - enqueued
+            self._release(queue_wait, run_time, future.cancelled() or future.exception() is not None)
+
+        future.add_done_callback(done)
+        return future
+
+    async def _run_on(self, executor: Executor, fn: Callable, args: tuple, force: bool) -> Any:
+        return await asyncio.wrap_future(self._submit(executor, fn, args, force))
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run a CPU-bound function on the pool, rejecting it if the pool is saturated."""
+        return await self._run_on(self._threads, fn, args, force=False)
+
+    async def run_continuation(self, fn: Callable, *args) -> Any:
+        """Run a follow-up step of already admitted work; never rejected, but still counted."""
+        return await self._run_on(self._threads, fn, args, force=True)
+
+    async def run_kdf(self, fn: Callable, *args) -> Any:
+        """Run a key-derivation function, on the process pool when one is configured."""
+        return await self._run_on(self._processes or self._threads, fn, args, force=False)
+
+    def call(self, fn: Callable, *args, force: bool = False) -> Any:
+        """
+        Run a CPU-bound function on the pool from synchronous code and wait for it.
+
+        Used by sync routes, which already run in Starlette's threadpool, so that
+        their crypto is bounded by the same capacity as the async routes.
+        """
+        return self._submit(self._threads, fn, args, force).result()
+
+    async def iterate(self, iterator: Iterator[Any]) -> AsyncIterator[Any]:
+        """
+        Drive a synchronous iterator (e.g. a decrypting generator) on the pool.
+
+        Only the first step is subject to admission control, so a stream that has
+        started is never cut off midway by backpressure.
+        """
+        first = True
+        while True:
+            if first:
+                item = await self.run(next, iterator, _SENTINEL)
+                first = False
+            else:
+                item = await self.run_continuation(next, iterator, _SENTINEL)
+            if item is _SENTINEL:
+                return
+            yield item
+
+    def iterate_sync(self, iterator: Iterator[Any]) -> Iterator[Any]:
+        """Synchronous counterpart of iterate() for sync routes and services."""
+        first = True
+        while True:
+            item = self.call(next, iterator, _SENTINEL, force=not first)
+            first = False
+            if item is _SENTINEL:
+                return
+            yield item
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return a snapshot of pool usage counters."""
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "max_queue_depth": self.max_queue_depth,
+                "capacity": self.capacity,
+                "process_pool_for_kdf": self._processes is not None,
+                "in_flight": self._in_flight,
+                "peak_in_flight": self._peak_in_flight,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "avg_queue_wait_ms": (self._total_queue_wait / finished * 1000) if finished else 0.0,
+                "max_queue_wait_ms": self._max_queue_wait * 1000,
+                "avg_run_ms": (self._total_run_time / finished * 1000) if finished else 0.0,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._threads.shutdown(wait=wait)
+        if self._processes is not None:
+            self._processes.shutdown(wait=wait)
+
+
+_crypto_executor: Optional[CryptoExecutor] = None
+_password_executor: Optional[CryptoExecutor] = None
+_crypto_executor_lock = threading.Lock()
+
+
+def get_crypto_executor() -> CryptoExecutor:
+    """Return the process-wide crypto executor, creating it from settings on first use."""
+    global _crypto_executor
+    if _crypto_executor is None:
+        with _crypto_executor_lock:
+            if _crypto_executor is None:
+                _crypto_executor = CryptoExecutor(
+                    max_workers=settings.crypto_max_workers,
+                    max_queue_depth=settings.crypto_max_queue_depth,
+                    use_process_pool_for_kdf=settings.crypto_kdf_process_pool,
+                )
+    return _crypto_executor
+
+
+def get_password_executor() -> CryptoExecutor:
+    """
+    Return the process-wide password-hashing executor.
+
+    bcrypt runs on its own small pool so that a burst of logins can only occupy
+    these workers, never the file-encryption pool or the request threadpool.
+    """
+    global _password_executor
+    if _password_executor is None:
+        with _crypto_executor_lock:
+            if _password_executor is None:
+                _password_executor = CryptoExecutor(
+                    max_workers=settings.password_hash_max_workers,
+                    max_queue_depth=settings.password_hash_max_queue_depth,
+                    name="password",
+                )
+    return _password_executor
+
+
+def shutdown_crypto_executor() -> None:
+    """Shut down the process-wide crypto and password executors (called on application shutdown)."""
+    global _crypto_executor, _password_executor
+    with _crypto_executor_lock:
+        for executor in (_crypto_executor, _password_executor):
+            if executor is not None:
+                executor.shutdown(wait=True)
+        _crypto_executor = None
+        _password_executor = None
@@ -0,0 +1,149 @@
+"""
+Database connection-pool instrumentation and SQLite connection tuning.
+
+InstrumentedQueuePool is a QueuePool that records how long each checkout
+waited for a connection, how often the pool ran into its overflow or timed
+out, and how many connections were opened or invalidated (for example by
+pool_pre_ping finding a stale connection). The admin API publishes these
+numbers so pool_size / max_overflow can be sized against real traffic.
+"""
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.waited_checkouts = 0  # Checkouts that had to wait for a connection to be returned
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+        self.connects = 0
+        self.invalidations = 0
+
+    def record_checkout(self, wait: float, checked_out: int, overflow: int) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            if wait >= 0.001:
+                self.waited_checkouts += 1
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+            self.peak_overflow = max(self.peak_overflow, overflow)
+
+    def record_timeout(self, wait: float) -> None:
+        with self._lock:
+            self.timeouts += 1
+            self.max_wait = max(self.max_wait, wait)
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "waited_checkouts": self.waited_checkouts,
+                "avg_checkout_wait_ms": (self.total_wait / self.checkouts * 1000) if self.checkouts else 0.0,
+                "max_checkout_wait_ms": self.max_wait * 1000,
+                "peak_checked_out": self.peak_checked_out,
+                "peak_overflow": self.peak_overflow,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+            }
+
+
+class _InstrumentedPoolMixin:
+    def _init_stats(self) -> None:
+        self.stats = PoolStats()
+        event.listen(self, "connect", lambda *args: self.stats.increment("connects"))
+        event.listen(self, "invalidate", lambda *args: self.stats.increment("invalidations"))
+
+    def recreate(self):
+        pool = super().recreate()
+        # Keep counting across engine.dispose()
+        pool.stats = self.stats
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record_timeout(time.perf_counter() - started)
+            raise
+        self.stats.record_checkout(time.perf_counter() - started, self.checkedout(), max(0, self.overflow()))
+        return connection
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._init_stats()
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    """Instrumented pool for async engines (asyncpg, aiosqlite)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._init_stats()
+
+
+def pool_metrics(engine) -> Dict[str, Any]:
+    """Return current pool occupancy plus the recorded checkout statistics (sync or async engine)."""
+    pool = engine.pool
+    metrics: Dict[str, Any] = {"pool_class": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        metrics.update({
+            "pool_size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+        })
+    if isinstance(pool, _InstrumentedPoolMixin):
+        metrics.update(pool.stats.snapshot())
+    return metrics
+
+
+_SQLITE_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+_SQLITE_SYNCHRONOUS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+
+def apply_sqlite_pragmas(engine, journal_mode: str, synchronous: str, busy_timeout_ms: int) -> None:
+    """
+    Set journal mode, sync level and lock wait on every new SQLite connection.
+
+    WAL lets readers proceed while a write is in progress, and synchronous=NORMAL
+    only fsyncs at checkpoints, which is safe in WAL mode (a power loss can drop
+    the last commits but never corrupts the database).
+    """
+    journal_mode = (journal_mode or "").upper()
+    synchronous = (synchronous or "").upper()
+    if journal_mode and journal_mode not in _SQLITE_JOURNAL_MODES:
+        raise ValueError(f"Unsupported SQLite journal mode: {journal_mode}")
+    if synchronous and synchronous not in _SQLITE_SYNCHRONOUS:
+        raise ValueError(f"Unsupported SQLite synchronous level: {synchronous}")
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            if journal_mode:
+                cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+            if synchronous:
+                cursor.execute(f"PRAGMA synchronous={synchronous}")
+            cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        finally:
+            cursor.close()
@@ -1,13 +1,50 @@
 import os
 import hashlib
 import secrets
+import struct
 import uuid
+from cryptography.exceptions import InvalidTag
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from typing import Tuple, Optional
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, NamedTuple, Tuple, Optional
 import base64
 from ..config.settings import settings
+from .crypto_executor import get_crypto_executor
+from .key_cache import DerivedKeyCache
+
+
+# Algorithm identifiers recorded in EncryptedFile.algorithm_version
+LEGACY_ALGORITHM_VERSION = "AES-128-Fernet-PBKDF2"
+STREAM_ALGORITHM_VERSION = "AES-256-GCM-STREAM-PBKDF2-v1"
+ENVELOPE_ALGORITHM_VERSION = "AES-256-GCM-STREAM-ENVELOPE-v1"
+
+# Streaming container layout (all integers big-endian):
+#   magic(4) | version(1) | kdf_id(1) | iterations(4) | chunk_size(4) | salt_len(1) | salt | nonce_prefix(7)
+# followed by segments of AES-256-GCM(chunk) + 16-byte tag. Each segment uses the nonce
+#   nonce_prefix(7) | segment_index(4) | last_segment_flag(1)
+# and the full header as associated data, so reordering, truncation and header tampering are detected.
+# With kdf_id KDF_NONE the segments are sealed with a random per-file data key (envelope encryption);
+# iterations is 0 and the salt field carries the key identifier used to look up the wrapped data key.
+STREAM_MAGIC = b"SVLT"
+STREAM_FORMAT_VERSION = 1
+KDF_NONE = 0
+KDF_PBKDF2_SHA256 = 1
+DEFAULT_STREAM_CHUNK_SIZE = 64 * 1024
+# Headers can come from client uploads (decrypt-local), so their parameters are bounded:
+# a segment is buffered whole, and the iteration count is spent on the crypto executor
+MAX_STREAM_CHUNK_SIZE = 4 * 1024 * 1024
+MAX_ITERATIONS_FACTOR = 10
+STREAM_TAG_SIZE = 16
+STREAM_NONCE_PREFIX_SIZE = 7
+SALT_SIZE = 32
+DATA_KEY_SIZE = 32
+KEY_ID_SIZE = 16
+WRAP_NONCE_SIZE = 12
+
+_HEADER_FIXED = struct.Struct(">4sBBIIB")
+_SEGMENT_NONCE_SUFFIX = struct.Struct(">IB")
 
 
 def generate_salt() -> bytes:
@@ -21,44 +58,713 @@ def hash_password(password: str, salt: bytes) -> str:
     return pwdhash
 
 
-def derive_key_from_password(password: str, salt: bytes, iterations: int = 390000) -> bytes:
-    """Derive a key from a password using PBKDF2 with SHA-256."""
+def derive_raw_key(password: str, salt: bytes, iterations: int = 390000) -> bytes:
+    """Derive a raw 32-byte key from a password using PBKDF2 with SHA-256."""
     kdf = PBKDF2HMAC(
         algorithm=hashes.SHA256(),
         length=32,
         salt=salt,
         iterations=iterations,
     )
-    key = kdf.derive(password.encode('utf-8'))
-    return base64.urlsafe_b64encode(key)
+    return kdf.derive(password.encode('utf-8'))
 
 
-def encrypt_file(file_path: str, password: str, user_id: str = None) -> Tuple[str, str]:
+def derive_key_from_password(password: str, salt: bytes, iterations: int = 390000) -> bytes:
+    """Derive a Fernet key from a password using PBKDF2 with SHA-256."""
+    return base64.urlsafe_b64encode(derive_raw_key(password, salt, iterations))
+
+
+_derived_key_cache = DerivedKeyCache(
+    max_entries=settings.key_cache_max_entries,
+    ttl_seconds=settings.key_cache_ttl_seconds,
+)
+
+
+def get_derived_key_cache() -> DerivedKeyCache:
+    """Return the process-wide derived-key cache."""
+    return _derived_key_cache
+
+
+def purge_cached_keys(user_id: str) -> int:
+    """Zeroize and drop all cached keys derived for a user (on logout, deactivation or deletion)."""
+    return _derived_key_cache.purge_scope(user_id)
+
+
+def derive_raw_key_cached(password: str, salt: bytes, iterations: int = 390000, scope: Optional[str] = None) -> bytes:
     """
-    Encrypt a file using Fernet (AES) with a key derived from the password.
+    Derive a raw key, reusing a cached result for the same scope, salt, iterations and password.
 
     Args:
-        file_path: Path to the file to encrypt
-        password: Password to derive the encryption key from
-        user_id: ID of the user (optional, for organizing files in user-specific directories)
+        password: Password to derive the key from
+        salt: KDF salt
+        iterations: PBKDF2 iterations
+        scope: Cache scope, normally the user ID; without one the cache is bypassed
 
     Returns:
-        Tuple of (encrypted_file_path, algorithm_version)
+        The raw 32-byte key
+    """
+    if scope is None:
+        return derive_raw_key(password, salt, iterations)
+    return _derived_key_cache.get_or_derive(
+        password, salt, iterations, lambda: derive_raw_key(password, salt, iterations), scope=scope
+    )
+
+
+async def derive_raw_key_async(password: str, salt: bytes, iterations: int = 390000, scope: Optional[str] = None) -> bytes:
+    """Derive a raw key on the crypto executor instead of the calling event loop, using the cache when scoped."""
+    if scope is not None:
+        key = _derived_key_cache.get(password, salt, iterations, scope=scope)
+        if key is not None:
+            return key
+
+    key = await get_crypto_executor().run_kdf(derive_raw_key, password, salt, iterations)
+    if scope is not None:
+        _derived_key_cache.put(password, salt, iterations, key, scope=scope)
+    return key
+
+
+class StreamDecryptionError(ValueError):
+    """Raised when a streaming container is malformed, truncated or fails authentication."""
+
+
+def generate_data_key() -> bytes:
+    """Generate a random per-file data encryption key."""
+    return secrets.token_bytes(DATA_KEY_SIZE)
+
+
+def _wrap_associated_data(user_id: str) -> bytes:
+    # Bind each wrapped key to its owner so it cannot be replayed under another account
+    return b"securevault-dek-v1|" + user_id.encode("utf-8")
+
+
+def wrap_data_key(kek: bytes, data_key: bytes, user_id: str) -> str:
+    """
+    Wrap a data key with a user's key-encryption key (AES-256-GCM).
+
+    Args:
+        kek: The user's raw key-encryption key
+        data_key: The per-file data key to wrap
+        user_id: ID of the file owner, authenticated as associated data
+
+    Returns:
+        The wrapped key as URL-safe base64 (nonce followed by ciphertext and tag)
+    """
+    nonce = secrets.token_bytes(WRAP_NONCE_SIZE)
+    wrapped = AESGCM(kek).encrypt(nonce, data_key, _wrap_associated_data(user_id))
+    return base64.urlsafe_b64encode(nonce + wrapped).decode("ascii")
+
+
+def new_wrapped_data_key(kek: bytes, user_id: str) -> Tuple[bytes, bytes, str]:
     """
-    # Generate salt for key derivation
-    salt = generate_salt()
+    Create a per-file data key, its key identifier and its wrapped form.
 
-    # Derive encryption key from password
-    key = derive_key_from_password(password, salt)
-    fernet = Fernet(key)
+    Returns:
+        Tuple of (data_key, key_id, wrapped_key)
+    """
+    data_key = generate_data_key()
+    return data_key, secrets.token_bytes(KEY_ID_SIZE), wrap_data_key(kek, data_key, user_id)
 
-    # Read the original file
+
+def unwrap_data_key(kek: bytes, wrapped_key: str, user_id: str) -> bytes:
+    """
+    Unwrap a data key produced by wrap_data_key().
+
+    Raises:
+        StreamDecryptionError: If the key-encryption key is wrong or the wrapped key was tampered with
+    """
+    try:
+        blob = base64.urlsafe_b64decode(wrapped_key.encode("ascii"))
+        return AESGCM(kek).decrypt(blob[:WRAP_NONCE_SIZE], blob[WRAP_NONCE_SIZE:], _wrap_associated_data(user_id))
+    except (InvalidTag, ValueError):
+        raise StreamDecryptionError("Failed to unwrap data key (wrong password or corrupted key)")
+
+
+class StreamHeader(NamedTuple):
+    """Parsed header of a streaming encryption container."""
+    kdf_id: int
+    iterations: int
+    chunk_size: int
+    salt: bytes
+    nonce_prefix: bytes
+
+    @property
+    def size(self) -> int:
+        return _HEADER_FIXED.size + len(self.salt) + STREAM_NONCE_PREFIX_SIZE
+
+    @property
+    def segment_size(self) -> int:
+        return self.chunk_size + STREAM_TAG_SIZE
+
+    def to_bytes(self) -> bytes:
+        return _HEADER_FIXED.pack(
+            STREAM_MAGIC,
+            STREAM_FORMAT_VERSION,
+            self.kdf_id,
+            self.iterations,
+            self.chunk_size,
+            len(self.salt),
+        ) + self.salt + self.nonce_prefix
+
+    def segment_nonce(self, index: int, last: bool) -> bytes:
+        return self.nonce_prefix + _SEGMENT_NONCE_SUFFIX.pack(index, 1 if last else 0)
+
+
+def is_stream_container(prefix: bytes) -> bool:
+    """Return True if the given leading bytes belong to a streaming container."""
+    return prefix[:len(STREAM_MAGIC)] == STREAM_MAGIC
+
+
+def parse_stream_header(data: bytes) -> Optional[StreamHeader]:
+    """
+    Parse a streaming container header from the start of ``data``.
+
+    Args:
+        data: Leading bytes of the container
+
+    Returns:
+        The parsed StreamHeader, or None if more bytes are needed
+    """
+    if len(data) < _HEADER_FIXED.size:
+        return None
+
+    magic, version, kdf_id, iterations, chunk_size, salt_len = _HEADER_FIXED.unpack_from(data)
+    if magic != STREAM_MAGIC:
+        raise StreamDecryptionError("Not a SecureVault streaming container")
+    if version != STREAM_FORMAT_VERSION:
+        raise StreamDecryptionError(f"Unsupported container version: {version}")
+    if kdf_id not in (KDF_NONE, KDF_PBKDF2_SHA256) or not 0 < chunk_size <= MAX_STREAM_CHUNK_SIZE:
+        raise StreamDecryptionError("Invalid container parameters")
+    if kdf_id == KDF_NONE and iterations != 0:
+        raise StreamDecryptionError("Invalid container parameters")
+    if kdf_id == KDF_PBKDF2_SHA256 and not 0 < iterations <= MAX_ITERATIONS_FACTOR * settings.pbkdf2_iterations:
+        raise StreamDecryptionError("Invalid container parameters")
+
+    end = _HEADER_FIXED.size + salt_len + STREAM_NONCE_PREFIX_SIZE
+    if len(data) < end:
+        return None
+
+    salt = bytes(data[_HEADER_FIXED.size:_HEADER_FIXED.size + salt_len])
+    nonce_prefix = bytes(data[_HEADER_FIXED.size + salt_len:end])
+    return StreamHeader(kdf_id, iterations, chunk_size, salt, nonce_prefix)
+
+
+def _new_pbkdf2_header(iterations: Optional[int], chunk_size: int, salt: Optional[bytes]) -> StreamHeader:
+    return StreamHeader(
+        KDF_PBKDF2_SHA256,
+        iterations or settings.pbkdf2_iterations,
+        chunk_size,
+        salt or generate_salt(),
+        secrets.token_bytes(STREAM_NONCE_PREFIX_SIZE),
+    )
+
+
+class StreamEncryptor:
+    """
+    Incremental encryptor for the segmented AES-256-GCM container.
+
+    Plaintext is fed with update() in pieces of any size; complete segments are
+    returned as soon as they are known not to be the last one, so memory use is
+    bounded by the chunk size rather than the file size.
+    """
+
+    def __init__(self, key: bytes, header: StreamHeader, segment_index: int = 0):
+        self.header = header
+        self._aead = AESGCM(key)
+        self._header_bytes = header.to_bytes()
+        self._buffer = bytearray()
+        self._index = segment_index
+        # Resuming at a later segment means the header has already been written
+        self._header_sent = segment_index > 0
+        self._finalized = False
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    @classmethod
+    def from_password(
+        cls,
+        password: str,
+        iterations: Optional[int] = None,
+        chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE,
+        salt: Optional[bytes] = None,
+    ) -> "StreamEncryptor":
+        """Create an encryptor whose key is derived from the password with a fresh salt."""
+        header = _new_pbkdf2_header(iterations, chunk_size, salt)
+        key = derive_raw_key(password, header.salt, header.iterations)
+        return cls(key, header)
+
+    @classmethod
+    def for_data_key(
+        cls,
+        data_key: bytes,
+        key_id: bytes,
+        chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE,
+    ) -> "StreamEncryptor":
+        """Create an encryptor sealed with a per-file data key; no KDF runs here."""
+        header = StreamHeader(KDF_NONE, 0, chunk_size, key_id, secrets.token_bytes(STREAM_NONCE_PREFIX_SIZE))
+        return cls(data_key, header)
+
+    def _take_header(self) -> bytes:
+        if self._header_sent:
+            return b""
+        self._header_sent = True
+        return self._header_bytes
+
+    def _seal(self, chunk: bytes, last: bool) -> bytes:
+        nonce = self.header.segment_nonce(self._index, last)
+        self._index += 1
+        return self._aead.encrypt(nonce, chunk, self._header_bytes)
+
+    def update(self, data: bytes) -> bytes:
+        """Feed plaintext and return any ciphertext that is ready to be written."""
+        if self._finalized:
+            raise ValueError("Encryptor already finalized")
+
+        self.bytes_in += len(data)
+        self._buffer += data
+        out = bytearray(self._take_header())
+
+        # Hold back the last full chunk until we know more data follows it
+        chunk_size = self.header.chunk_size
+        while len(self._buffer) > chunk_size:
+            out += self._seal(bytes(self._buffer[:chunk_size]), last=False)
+            del self._buffer[:chunk_size]
+
+        self.bytes_out += len(out)
+        return bytes(out)
+
+    def seal_chunks(self, data: bytes, final: bool) -> bytes:
+        """
+        Seal plaintext that is aligned to segment boundaries, without holding anything back.
+
+        Resumable uploads encrypt and persist each piece on its own, so ``data`` must be
+        a whole number of chunks unless it ends the file (``final``). The header is not included.
+        """
+        chunk_size = self.header.chunk_size
+        if not final and (not data or len(data) % chunk_size):
+            raise ValueError(f"Non-final data must be a non-empty multiple of {chunk_size} bytes")
+
+        pieces = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)] or [b""]
+        out = bytearray()
+        for n, piece in enumerate(pieces):
+            out += self._seal(piece, last=final and n == len(pieces) - 1)
+        self.bytes_in += len(data)
+        self.bytes_out += len(out)
+        return bytes(out)
+
+    def finalize(self) -> bytes:
+        """Seal the remaining plaintext as the final segment."""
+        if self._finalized:
+            raise ValueError("Encryptor already finalized")
+        self._finalized = True
+
+        out = self._take_header() + self._seal(bytes(self._buffer), last=True)
+        self._buffer.clear()
+        self.bytes_out += len(out)
+        return out
+
+
+class StreamDecryptor:
+    """
+    Incremental decryptor for the segmented AES-256-GCM container.
+
+    Ciphertext can be fed in pieces of any size. The key is derived from the
+    password once the header has been read, unless a raw key is supplied. With a
+    cache_scope (the user ID) the derived key is shared through the key cache.
+    """
+
+    def __init__(self, password: Optional[str] = None, key: Optional[bytes] = None, cache_scope: Optional[str] = None):
+        if password is None and key is None:
+            raise ValueError("Either a password or a key is required")
+        self._password = password
+        self._key = key
+        self._cache_scope = cache_scope
+        self._aead = None
+        self._header_bytes = b""
+        self._buffer = bytearray()
+        self._index = 0
+        self._finalized = False
+        self.header: Optional[StreamHeader] = None
+        self.bytes_out = 0
+
+    def _read_header(self) -> bool:
+        header = parse_stream_header(self._buffer)
+        if header is None:
+            return False
+
+        if header.kdf_id == KDF_PBKDF2_SHA256 and self._key is None:
+            key = derive_raw_key_cached(self._password, header.salt, header.iterations, self._cache_scope)
+        elif self._key is not None:
+            key = self._key
+        else:
+            raise StreamDecryptionError("Container requires an externally supplied key")
+
+        self.header = header
+        self._aead = AESGCM(key)
+        self._header_bytes = bytes(self._buffer[:header.size])
+        del self._buffer[:header.size]
+        return True
+
+    def _open(self, segment: bytes, last: bool) -> bytes:
+        nonce = self.header.segment_nonce(self._index, last)
+        try:
+            plaintext = self._aead.decrypt(nonce, segment, self._header_bytes)
+        except InvalidTag:
+            raise StreamDecryptionError(
+                f"Authentication failed for segment {self._index} (wrong password or corrupted data)"
+            )
+        self._index += 1
+        self.bytes_out += len(plaintext)
+        return plaintext
+
+    def update(self, data: bytes) -> bytes:
+        """Feed ciphertext and return any plaintext that has been authenticated."""
+        if self._finalized:
+            raise ValueError("Decryptor already finalized")
+
+        self._buffer += data
+        if self.header is None and not self._read_header():
+            return b""
+
+        # A segment is only known to be non-final once bytes beyond it have arrived
+        segment_size = self.header.segment_size
+        out = bytearray()
+        while len(self._buffer) > segment_size:
+            out += self._open(bytes(self._buffer[:segment_size]), last=False)
+            del self._buffer[:segment_size]
+        return bytes(out)
+
+    def finalize(self) -> bytes:
+        """Authenticate and return the final segment."""
+        if self._finalized:
+            raise ValueError("Decryptor already finalized")
+        self._finalized = True
+
+        if self.header is None:
+            raise StreamDecryptionError("Container header is truncated")
+        if len(self._buffer) < STREAM_TAG_SIZE:
+            raise StreamDecryptionError("Container is truncated")
+
+        out = self._open(bytes(self._buffer), last=True)
+        self._buffer.clear()
+        return out
+
+
+def stream_segment_count(header: StreamHeader, container_size: int) -> int:
+    """Number of segments in a container of ``container_size`` bytes (at least one, possibly empty)."""
+    body = container_size - header.size
+    if body < STREAM_TAG_SIZE:
+        raise StreamDecryptionError("Container is truncated")
+    return -(-body // header.segment_size)
+
+
+def stream_plaintext_size(header: StreamHeader, container_size: int) -> int:
+    """Plaintext size of a container, computed from its header and total size without decrypting."""
+    body = container_size - header.size
+    segments = stream_segment_count(header, container_size)
+    # Every segment but the last is full, and the last one holds at least its tag
+    if body - (segments - 1) * header.segment_size < STREAM_TAG_SIZE:
+        raise StreamDecryptionError("Container is truncated")
+    return body - segments * STREAM_TAG_SIZE
+
+
+class StreamRangeDecryptor:
+    """
+    Decryptor for a plaintext byte range of a segmented container.
+
+    Only the segments covering bytes ``start``..``end`` (inclusive) are read and
+    authenticated. Feed it the ciphertext span ``offset``/``length`` of the stored
+    container; the output is trimmed to the requested range.
+    """
+
+    def __init__(self, header: StreamHeader, key: bytes, container_size: int, start: int, end: int):
+        self.header = header
+        self._aead = AESGCM(key)
+        self._header_bytes = header.to_bytes()
+        self._segments = stream_segment_count(header, container_size)
+        self._index = start // header.chunk_size
+        last_index = end // header.chunk_size
+        if start < 0 or end < start or last_index >= self._segments:
+            raise ValueError("Range is outside the container")
+
+        self._skip = start - self._index * header.chunk_size
+        self._remaining = end - start + 1
+        self._buffer = bytearray()
+        self.offset = header.size + self._index * header.segment_size
+        self.length = min(container_size, header.size + (last_index + 1) * header.segment_size) - self.offset
+        self.bytes_out = 0
+
+    def _open(self, segment: bytes) -> bytes:
+        nonce = self.header.segment_nonce(self._index, self._index == self._segments - 1)
+        try:
+            plaintext = self._aead.decrypt(nonce, segment, self._header_bytes)
+        except InvalidTag:
+            raise StreamDecryptionError(
+                f"Authentication failed for segment {self._index} (wrong password or corrupted data)"
+            )
+        self._index += 1
+
+        plaintext = plaintext[self._skip:self._skip + self._remaining]
+        self._skip = 0
+        self._remaining -= len(plaintext)
+        self.bytes_out += len(plaintext)
+        return plaintext
+
+    def update(self, data: bytes) -> bytes:
+        """Feed ciphertext from the span and return plaintext of the range as segments complete."""
+        self._buffer += data
+        segment_size = self.header.segment_size
+        out = bytearray()
+        while len(self._buffer) >= segment_size and self._remaining > 0:
+            out += self._open(bytes(self._buffer[:segment_size]))
+            del self._buffer[:segment_size]
+        return bytes(out)
+
+    def finalize(self) -> bytes:
+        """Authenticate a trailing short (final) segment and check the range was fully covered."""
+        out = b""
+        if self._buffer and self._remaining > 0:
+            out = self._open(bytes(self._buffer))
+            self._buffer.clear()
+        if self._remaining > 0:
+            raise StreamDecryptionError("Container is truncated")
+        return out
+
+
+async def create_stream_encryptor(
+    password: str,
+    iterations: Optional[int] = None,
+    chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE,
+) -> StreamEncryptor:
+    """Create a password-based StreamEncryptor, deriving its key on the crypto executor."""
+    header = _new_pbkdf2_header(iterations, chunk_size, None)
+    key = await derive_raw_key_async(password, header.salt, header.iterations)
+    return StreamEncryptor(key, header)
+
+
+def iter_file_chunks(file_path: str, chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield the contents of a file in chunks of at most ``chunk_size`` bytes."""
     with open(file_path, 'rb') as file:
-        file_data = file.read()
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def encrypt_stream(
+    chunks: Iterable[bytes],
+    password: str,
+    iterations: Optional[int] = None,
+    chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """
+    Encrypt an iterable of plaintext chunks into the streaming container format.
 
-    # Encrypt the data
-    encrypted_data = fernet.encrypt(file_data)
+    Args:
+        chunks: Plaintext pieces of any size
+        password: Password to derive the encryption key from
+        iterations: PBKDF2 iterations (defaults to settings.pbkdf2_iterations)
+        chunk_size: Plaintext bytes per authenticated segment
 
+    Yields:
+        Container bytes: the header followed by encrypted segments
+    """
+    encryptor = StreamEncryptor.from_password(password, iterations=iterations, chunk_size=chunk_size)
+    for chunk in chunks:
+        out = encryptor.update(chunk)
+        if out:
+            yield out
+    yield encryptor.finalize()
+
+
+def decrypt_stream(
+    chunks: Iterable[bytes],
+    password: Optional[str] = None,
+    key: Optional[bytes] = None,
+    cache_scope: Optional[str] = None,
+) -> Iterator[bytes]:
+    """
+    Decrypt an iterable of container chunks, yielding authenticated plaintext.
+
+    Args:
+        chunks: Container pieces of any size
+        password: Password to derive the decryption key from
+        key: Raw key to use instead of a password
+        cache_scope: Key-cache scope (user ID) for the derived key
+
+    Yields:
+        Plaintext chunks as each segment is authenticated
+
+    Raises:
+        StreamDecryptionError: If the container is malformed, truncated or tampered with
+    """
+    decryptor = StreamDecryptor(password=password, key=key, cache_scope=cache_scope)
+    for chunk in chunks:
+        out = decryptor.update(chunk)
+        if out:
+            yield out
+    out = decryptor.finalize()
+    if out:
+        yield out
+
+
+class LegacyFernetDecryptor:
+    """
+    Decryptor for legacy ``salt + Fernet token`` files.
+
+    Fernet tokens can only be authenticated as a whole, so ciphertext is buffered
+    and all plaintext is returned by finalize().
+    """
+
+    def __init__(self, password: str, cache_scope: Optional[str] = None):
+        self._password = password
+        self._cache_scope = cache_scope
+        self._buffer = bytearray()
+
+    def update(self, data: bytes) -> bytes:
+        self._buffer += data
+        return b""
+
+    def finalize(self) -> bytes:
+        salt = bytes(self._buffer[:32])
+        key = base64.urlsafe_b64encode(derive_raw_key_cached(self._password, salt, 390000, self._cache_scope))
+        try:
+            return Fernet(key).decrypt(bytes(self._buffer[32:]))
+        finally:
+            self._buffer.clear()
+
+
+class AutoDecryptor:
+    """
+    Password-based decryptor that detects the streaming or legacy format from the leading bytes.
+    """
+
+    def __init__(self, password: str, cache_scope: Optional[str] = None):
+        self._password = password
+        self._cache_scope = cache_scope
+        self._prefix = b""
+        self._inner = None
+
+    def _select(self) -> None:
+        if is_stream_container(self._prefix):
+            self._inner = StreamDecryptor(password=self._password, cache_scope=self._cache_scope)
+        else:
+            self._inner = LegacyFernetDecryptor(self._password, self._cache_scope)
+
+    def update(self, data: bytes) -> bytes:
+        if self._inner is None:
+            self._prefix += data
+            if len(self._prefix) < len(STREAM_MAGIC):
+                return b""
+            self._select()
+            data, self._prefix = self._prefix, b""
+        return self._inner.update(data)
+
+    def finalize(self) -> bytes:
+        if self._inner is None:
+            self._select()
+            self._inner.update(self._prefix)
+        return self._inner.finalize()
+
+
+def iter_decrypt_chunks(chunks: Iterable[bytes], password: str, cache_scope: Optional[str] = None) -> Iterator[bytes]:
+    """
+    Decrypt ciphertext chunks of either format, yielding plaintext chunks.
+
+    Streaming containers are decrypted segment by segment; legacy Fernet data
+    cannot be authenticated incrementally and is buffered and yielded as a single chunk.
+    Keys derived under a cache_scope (the user ID) are reused through the key cache.
+    """
+    decryptor = AutoDecryptor(password, cache_scope)
+    for chunk in chunks:
+        out = decryptor.update(chunk)
+        if out:
+            yield out
+    out = decryptor.finalize()
+    if out:
+        yield out
+
+
+async def aiter_decrypt(ciphertext: AsyncIterator[bytes], decryptor) -> AsyncIterator[bytes]:
+    """
+    Feed an async ciphertext stream through a decryptor on the crypto executor.
+
+    Args:
+        ciphertext: Async iterator of ciphertext chunks (e.g. from a storage backend)
+        decryptor: A StreamDecryptor, LegacyFernetDecryptor or AutoDecryptor
+
+    Yields:
+        Non-empty plaintext chunks as they are authenticated
+    """
+    executor = get_crypto_executor()
+    first = True
+    async for chunk in ciphertext:
+        # Only the first step is subject to admission control
+        if first:
+            out = await executor.run(decryptor.update, chunk)
+            first = False
+        else:
+            out = await executor.run_continuation(decryptor.update, chunk)
+        if out:
+            yield out
+    out = await (executor.run(decryptor.finalize) if first else executor.run_continuation(decryptor.finalize))
+    if out:
+        yield out
+
+
+async def aiter_encrypt(plaintext: AsyncIterable[bytes], encryptor: StreamEncryptor) -> AsyncIterator[bytes]:
+    """
+    Feed an async plaintext stream through a StreamEncryptor on the crypto executor.
+
+    Args:
+        plaintext: Async iterator of plaintext chunks (e.g. an upload or a storage backend)
+        encryptor: The encryptor producing the container
+
+    Yields:
+        Non-empty container chunks, header first
+    """
+    executor = get_crypto_executor()
+    first = True
+    async for chunk in plaintext:
+        # Only the first step is subject to admission control
+        if first:
+            out = await executor.run(encryptor.update, chunk)
+            first = False
+        else:
+            out = await executor.run_continuation(encryptor.update, chunk)
+        if out:
+            yield out
+    out = await (executor.run(encryptor.finalize) if first else executor.run_continuation(encryptor.finalize))
+    if out:
+        yield out
+
+
+def iter_decrypt_envelope(
+    chunks: Iterable[bytes],
+    password: str,
+    kek_salt: bytes,
+    kek_iterations: int,
+    wrapped_key: str,
+    user_id: str,
+) -> Iterator[bytes]:
+    """
+    Decrypt an envelope-encrypted container, yielding plaintext chunks.
+
+    The user's key-encryption key is derived (through the key cache, scoped by
+    user) and used to unwrap the per-file data key; the segments themselves
+    only need symmetric work.
+    """
+    kek = derive_raw_key_cached(password, kek_salt, kek_iterations, user_id)
+    data_key = unwrap_data_key(kek, wrapped_key, user_id)
+    yield from decrypt_stream(chunks, key=data_key)
+
+
+def iter_decrypt_file(encrypted_file_path: str, password: str) -> Iterator[bytes]:
+    """Decrypt a file of either format, yielding plaintext chunks."""
+    yield from iter_decrypt_chunks(iter_file_chunks(encrypted_file_path), password)
+
+
+def _vault_output_path(file_path: str, user_id: Optional[str]) -> str:
     # Create encrypted file path using vault path from settings
     filename = os.path.basename(file_path)
     user_vault_path = os.path.join(settings.vaults_path, user_id) if user_id else settings.vaults_path
@@ -69,42 +775,68 @@ def encrypt_file(file_path: str, password: str, user_id: str = None) -> Tuple[st
     # Create encrypted file path with UUID to avoid conflicts
     file_uuid = str(uuid.uuid4())
     encrypted_filename = f"{file_uuid}_{filename}.encrypted"
-    encrypted_file_path = os.path.join(user_vault_path, encrypted_filename)
+    return os.path.join(user_vault_path, encrypted_filename)
+
 
-    # Write encrypted data with salt prepended
+def _write_container(encryptor: StreamEncryptor, file_path: str, encrypted_file_path: str) -> None:
     with open(encrypted_file_path, 'wb') as file:
-        file.write(salt + encrypted_data)
+        for chunk in iter_file_chunks(file_path):
+            file.write(encryptor.update(chunk))
+        file.write(encryptor.finalize())
 
-    return encrypted_file_path, "AES-128-Fernet-PBKDF2"
 
+def encrypt_file(file_path: str, password: str, user_id: str = None) -> Tuple[str, str]:
+    """
+    Encrypt a file into the streaming AES-256-GCM container with a key derived from the password.
+
+    The file is read and written chunk by chunk, so memory use does not grow with file size.
 
-def decrypt_file(encrypted_file_path: str, password: str, user_id: str = None) -> str:
+    Args:
+        file_path: Path to the file to encrypt
+        password: Password to derive the encryption key from
+        user_id: ID of the user (optional, for organizing files in user-specific directories)
+
+    Returns:
+        Tuple of (encrypted_file_path, algorithm_version)
+    """
+    encrypted_file_path = _vault_output_path(file_path, user_id)
+
+    # Stream the container (header with salt/KDF params, then segments) to disk
+    _write_container(StreamEncryptor.from_password(password), file_path, encrypted_file_path)
+
+    return encrypted_file_path, STREAM_ALGORITHM_VERSION
+
+
+def encrypt_file_with_data_key(file_path: str, data_key: bytes, key_id: bytes, user_id: str = None) -> Tuple[str, str]:
     """
-    Decrypt a file using Fernet (AES) with a key derived from the password.
+    Encrypt a file into the streaming container with a per-file data key (envelope encryption).
 
     Args:
-        encrypted_file_path: Path to the encrypted file
-        password: Password to derive the decryption key from
+        file_path: Path to the file to encrypt
+        data_key: Random per-file data key; the caller stores it wrapped
+        key_id: Identifier written to the container header to find the wrapped key again
         user_id: ID of the user (optional, for organizing files in user-specific directories)
 
     Returns:
-        Path to the decrypted file
+        Tuple of (encrypted_file_path, algorithm_version)
     """
-    # Read the encrypted file
-    with open(encrypted_file_path, 'rb') as file:
-        file_data = file.read()
+    encrypted_file_path = _vault_output_path(file_path, user_id)
+    _write_container(StreamEncryptor.for_data_key(data_key, key_id), file_path, encrypted_file_path)
+    return encrypted_file_path, ENVELOPE_ALGORITHM_VERSION
 
-    # Extract salt (first 32 bytes) and encrypted data
-    salt = file_data[:32]
-    encrypted_data = file_data[32:]
 
-    # Derive decryption key from password
-    key = derive_key_from_password(password, salt)
-    fernet = Fernet(key)
+def decrypt_file(encrypted_file_path: str, password: str, user_id: str = None) -> str:
+    """
+    Decrypt a file (streaming container or legacy Fernet) with a key derived from the password.
 
-    # Decrypt the data
-    decrypted_data = fernet.decrypt(encrypted_data)
+    Args:
+        encrypted_file_path: Path to the encrypted file
+        password: Password to derive the decryption key from
+        user_id: ID of the user (optional, for organizing files in user-specific directories)
 
+    Returns:
+        Path to the decrypted file
+    """
     # Create decrypted file path using vault path from settings
     user_vault_path = os.path.join(settings.vaults_path, user_id) if user_id else settings.vaults_path
 
@@ -117,9 +849,15 @@ def decrypt_file(encrypted_file_path: str, password: str, user_id: str = None) -
     decrypted_filename = f"{file_uuid}_{original_filename}.decrypted"
     decrypted_file_path = os.path.join(user_vault_path, decrypted_filename)
 
-    # Write decrypted data
-    with open(decrypted_file_path, 'wb') as file:
-        file.write(decrypted_data)
+    # Write decrypted data, removing the partial output if authentication fails midway
+    try:
+        with open(decrypted_file_path, 'wb') as file:
+            for chunk in iter_decrypt_file(encrypted_file_path, password):
+                file.write(chunk)
+    except Exception:
+        if os.path.exists(decrypted_file_path):
+            os.remove(decrypted_file_path)
+        raise
 
     return decrypted_file_path
 
@@ -128,6 +866,8 @@ def decrypt_file_to_bytes(encrypted_file_path: str, password: str) -> Optional[b
     """
     Decrypt a file and return the decrypted data as bytes.
 
+    Prefer iter_decrypt_file() for large files; this helper buffers the whole plaintext.
+
     Args:
         encrypted_file_path: Path to the encrypted file
         password: Password to derive the decryption key from
@@ -136,28 +876,14 @@ def decrypt_file_to_bytes(encrypted_file_path: str, password: str) -> Optional[b
         Decrypted data as bytes, or None if decryption failed
     """
     try:
-        # Read the encrypted file
-        with open(encrypted_file_path, 'rb') as file:
-            file_data = file.read()
-
         # Check if file is large enough to contain salt
-        if len(file_data) < 32:
-            print(f"Encrypted file is too small to contain salt: {len(file_data)} bytes")
+        file_size = os.path.getsize(encrypted_file_path)
+        if file_size < 32:
+            print(f"Encrypted file is too small to contain salt: {file_size} bytes")
             return None
 
-        # Extract salt (first 32 bytes) and encrypted data
-        salt = file_data[:32]
-        encrypted_data = file_data[32:]
-
-        # Derive decryption key from password
-        key = derive_key_from_password(password, salt)
-        fernet = Fernet(key)
-
-        # Decrypt the data
-        decrypted_data = fernet.decrypt(encrypted_data)
-
-        return decrypted_data
+        return b"".join(iter_decrypt_file(encrypted_file_path, password))
     except Exception as e:
         # Print the exception for debugging
         print(f"Decryption failed with error: {str(e)}")
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,72 @@
+"""
+Parsing of HTTP ``Range`` / ``If-Range`` request headers (RFC 9110, section 14).
+
+Only single byte ranges are served; multi-range requests are answered with the
+full representation, which the RFC allows.
+"""
+from typing import Optional, Tuple
+
+
+class RangeNotSatisfiable(ValueError):
+    """Raised when a Range header does not overlap the representation (HTTP 416)."""
+
+    def __init__(self, size: int):
+        super().__init__(f"Range not satisfiable for {size} bytes")
+        self.size = size
+
+
+def parse_range_header(value: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a Range header against a representation of ``size`` bytes.
+
+    Args:
+        value: The Range header value, e.g. "bytes=0-1023", "bytes=100-" or "bytes=-500"
+        size: Total size of the representation
+
+    Returns:
+        Inclusive (start, end) byte positions, or None to serve the whole representation
+
+    Raises:
+        RangeNotSatisfiable: If the range starts beyond the end of the representation
+    """
+    if not value:
+        return None
+    unit, _, spec = value.strip().partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first == "":
+            # Suffix range: the last N bytes
+            suffix = int(last)
+            if suffix <= 0 or size == 0:
+                raise RangeNotSatisfiable(size)
+            return max(0, size - suffix), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+
+    if start < 0 or (last and end < start):
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(size)
+    return start, min(end, size - 1)
+
+
+def resolve_range(
+    range_header: Optional[str], if_range: Optional[str], etag: Optional[str], size: int
+) -> Optional[Tuple[int, int]]:
+    """
+    Apply If-Range before parsing Range: a stale validator means the whole representation is sent.
+    """
+    if if_range and if_range.strip() != etag:
+        return None
+    return parse_range_header(range_header, size)
+
+
+def content_range(start: int, end: int, size: int) -> str:
+    return f"bytes {start}-{end}/{size}"
@@ -0,0 +1,146 @@
+"""
+In-process LRU cache for password-derived keys.
+
+Deriving a key with 390k PBKDF2 iterations costs hundreds of milliseconds, so
+repeated decrypts of files that share a salt (or a user's key-encryption key)
+reuse the derived key for a short time instead of re-running the KDF.
+
+Entries are addressed by an HMAC of (scope, KDF, iterations, salt, password)
+under a per-process random secret, so neither passwords nor password hashes
+are kept as dictionary keys. Key material is held in bytearrays and overwritten
+with zeros when an entry expires, is evicted, or is purged.
+"""
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Set
+
+
+def _zeroize(buffer: bytearray) -> None:
+    for i in range(len(buffer)):
+        buffer[i] = 0
+
+
+class _CacheEntry:
+    __slots__ = ("key", "scope", "expires_at")
+
+    def __init__(self, key: bytes, scope: Optional[str], expires_at: float):
+        self.key = bytearray(key)
+        self.scope = scope
+        self.expires_at = expires_at
+
+
+class DerivedKeyCache:
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._secret = secrets.token_bytes(32)
+        self._entries: "OrderedDict[bytes, _CacheEntry]" = OrderedDict()
+        self._scopes: Dict[str, Set[bytes]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _cache_key(self, password: str, salt: bytes, iterations: int, kdf: str, scope: Optional[str]) -> bytes:
+        mac = hmac.new(self._secret, digestmod=hashlib.sha256)
+        # Length-prefix every field so distinct tuples can never produce the same input
+        for field in ((scope or "").encode("utf-8"), kdf.encode("utf-8"), str(iterations).encode("ascii"), salt, password.encode("utf-8")):
+            mac.update(len(field).to_bytes(4, "big"))
+            mac.update(field)
+        return mac.digest()
+
+    def _drop(self, cache_key: bytes) -> None:
+        entry = self._entries.pop(cache_key, None)
+        if entry is None:
+            return
+        _zeroize(entry.key)
+        if entry.scope is not None:
+            keys = self._scopes.get(entry.scope)
+            if keys is not None:
+                keys.discard(cache_key)
+                if not keys:
+                    del self._scopes[entry.scope]
+
+    def get(self, password: str, salt: bytes, iterations: int, kdf: str = "pbkdf2-sha256", scope: Optional[str] = None) -> Optional[bytes]:
+        """Return a cached key, or None if it is missing or expired."""
+        cache_key = self._cache_key(password, salt, iterations, kdf, scope)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._drop(cache_key)
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(cache_key)
+            self.hits += 1
+            return bytes(entry.key)
+
+    def put(self, password: str, salt: bytes, iterations: int, key: bytes, kdf: str = "pbkdf2-sha256", scope: Optional[str] = None) -> None:
+        """Store a derived key, evicting the least recently used entries beyond max_entries."""
+        if self.max_entries <= 0:
+            return
+        cache_key = self._cache_key(password, salt, iterations, kdf, scope)
+        with self._lock:
+            self._drop(cache_key)
+            self._entries[cache_key] = _CacheEntry(key, scope, time.monotonic() + self.ttl_seconds)
+            if scope is not None:
+                self._scopes.setdefault(scope, set()).add(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_derive(
+        self,
+        password: str,
+        salt: bytes,
+        iterations: int,
+        derive: Callable[[], bytes],
+        kdf: str = "pbkdf2-sha256",
+        scope: Optional[str] = None,
+    ) -> bytes:
+        """Return the cached key, or run ``derive`` and cache its result."""
+        key = self.get(password, salt, iterations, kdf, scope)
+        if key is None:
+            key = derive()
+            self.put(password, salt, iterations, key, kdf, scope)
+        return key
+
+    def purge_scope(self, scope: str) -> int:
+        """Drop every entry for a scope (e.g. a user on logout or deactivation)."""
+        with self._lock:
+            keys = list(self._scopes.get(scope, ()))
+            for cache_key in keys:
+                self._drop(cache_key)
+            return len(keys)
+
+    def purge_expired(self) -> int:
+        """Drop all expired entries and return how many were removed."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, entry in self._entries.items() if entry.expires_at <= now]
+            for cache_key in expired:
+                self._drop(cache_key)
+            self.evictions += len(expired)
+            return len(expired)
+
+    def clear(self) -> None:
+        with self._lock:
+            for cache_key in list(self._entries):
+                self._drop(cache_key)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,187 @@
+"""
+Merkle tree hashing and proofs in the style of Certificate Transparency (RFC 6962).
+
+Leaves are hashed as SHA-256(0x00 || data) and interior nodes as
+SHA-256(0x01 || left || right), so a leaf can never be passed off as a node.
+The tree of n leaves splits at the largest power of two below n: the left
+subtree is always perfect, the right one holds the remaining leaves.
+
+Only perfect subtrees are ever stored. A perfect subtree is identified by
+(level, position): it covers leaves [position * 2**level, (position + 1) * 2**level).
+Appending a leaf creates at most log2(n) + 1 of them, and the hash of any range
+used by a proof folds at most log2(n) of them, so callers fetch the keys a proof
+needs in one query and pass them back as a dict.
+"""
+import hashlib
+from typing import Dict, List, Sequence, Tuple
+
+NodeKey = Tuple[int, int]  # (level, position)
+Node = Tuple[int, int, bytes]  # (level, position, hash)
+
+EMPTY_ROOT = hashlib.sha256(b"").digest()
+
+
+def leaf_hash(data: bytes) -> bytes:
+    return hashlib.sha256(b"\x00" + data).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def _split(size: int) -> int:
+    # Largest power of two strictly below size (size > 1)
+    return 1 << ((size - 1).bit_length() - 1)
+
+
+def append_leaf(frontier: Sequence[Node], leaf: bytes) -> Tuple[List[Node], List[Node]]:
+    """
+    Append a leaf to a tree given by its frontier.
+
+    Args:
+        frontier: The tree's perfect subtrees from left to right (see frontier_keys)
+        leaf: Hash of the new leaf
+
+    Returns:
+        (the new frontier, the nodes created, to be stored)
+    """
+    frontier = list(frontier)
+    size = sum(1 << level for level, _, _ in frontier)
+    node = (0, size, leaf)
+    created = [node]
+    while frontier and frontier[-1][0] == node[0]:
+        level, position, left = frontier.pop()
+        node = (level + 1, position // 2, node_hash(left, node[2]))
+        created.append(node)
+    frontier.append(node)
+    return frontier, created
+
+
+def subtree_keys(start: int, end: int) -> List[NodeKey]:
+    """Keys of the perfect subtrees that make up leaves [start, end), from left to right."""
+    keys = []
+    while start < end:
+        level = (end - start).bit_length() - 1
+        while start % (1 << level):
+            level -= 1
+        keys.append((level, start >> level))
+        start += 1 << level
+    return keys
+
+
+def frontier_keys(size: int) -> List[NodeKey]:
+    """Keys of the perfect subtrees that make up a tree of `size` leaves."""
+    return subtree_keys(0, size)
+
+
+def range_hash(start: int, end: int, nodes: Dict[NodeKey, bytes]) -> bytes:
+    """
+    Merkle tree hash of leaves [start, end), for the ranges used by the proofs below.
+
+    Args:
+        nodes: Stored node hashes, containing at least subtree_keys(start, end)
+    """
+    if start == end:
+        return EMPTY_ROOT
+    hashes = [nodes[key] for key in subtree_keys(start, end)]
+    result = hashes.pop()
+    while hashes:
+        result = node_hash(hashes.pop(), result)
+    return result
+
+
+def inclusion_ranges(index: int, size: int) -> List[Tuple[int, int]]:
+    """Leaf ranges whose hashes form the audit path of leaf `index` in a tree of `size` leaves (RFC 6962 2.1.1)."""
+    if not 0 <= index < size:
+        raise ValueError(f"Leaf {index} is not in a tree of size {size}")
+    ranges = []
+    start, end = 0, size
+    while end - start > 1:
+        k = _split(end - start)
+        if index < start + k:
+            ranges.append((start + k, end))
+            end = start + k
+        else:
+            ranges.append((start, start + k))
+            start += k
+    return ranges[::-1]
+
+
+def consistency_ranges(first: int, second: int) -> List[Tuple[int, int]]:
+    """Leaf ranges whose hashes prove a tree of `first` leaves is a prefix of one of `second` (RFC 6962 2.1.2)."""
+    if not 0 < first <= second:
+        raise ValueError(f"Cannot prove consistency between tree sizes {first} and {second}")
+    ranges = []
+    start, end, m, complete = 0, second, first, True
+    while m != end - start:
+        k = _split(end - start)
+        if m <= k:
+            ranges.append((start + k, end))
+            end = start + k
+        else:
+            ranges.append((start, start + k))
+            start += k
+            m -= k
+            complete = False
+    if not complete:
+        ranges.append((start, end))
+    return ranges[::-1]
+
+
+def proof_keys(ranges: Sequence[Tuple[int, int]]) -> List[NodeKey]:
+    """Node keys needed to hash all the given ranges."""
+    return sorted({key for start, end in ranges for key in subtree_keys(start, end)})
+
+
+def verify_inclusion(leaf: bytes, index: int, size: int, path: Sequence[bytes], root: bytes) -> bool:
+    """Check an audit path (RFC 9162 2.1.3.2)."""
+    if not 0 <= index < size:
+        return False
+    fn, sn, result = index, size - 1, leaf
+    for sibling in path:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            result = node_hash(sibling, result)
+            while not fn & 1 and fn != 0:
+                fn >>= 1
+                sn >>= 1
+        else:
+            result = node_hash(result, sibling)
+        fn >>= 1
+        sn >>= 1
+    return sn == 0 and result == root
+
+
+def verify_consistency(first: int, second: int, first_root: bytes, second_root: bytes, proof: Sequence[bytes]) -> bool:
+    """Check a consistency proof (RFC 9162 2.1.4.2)."""
+    if not 0 < first <= second:
+        return False
+    if first == second:
+        return not proof and first_root == second_root
+    proof = list(proof)
+    if first & (first - 1) == 0:
+        # The old tree is a perfect subtree of the new one, so the proof leaves out its root
+        proof.insert(0, first_root)
+    if not proof:
+        return False
+
+    fn, sn = first - 1, second - 1
+    while fn & 1:
+        fn >>= 1
+        sn >>= 1
+    first_result = second_result = proof[0]
+    for node in proof[1:]:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            first_result = node_hash(node, first_result)
+            second_result = node_hash(node, second_result)
+            while not fn & 1 and fn != 0:
+                fn >>= 1
+                sn >>= 1
+        else:
+            second_result = node_hash(second_result, node)
+        fn >>= 1
+        sn >>= 1
+    return sn == 0 and first_result == first_root and second_result == second_root
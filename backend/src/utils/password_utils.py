@@ -1,7 +1,13 @@
 """
 Password utilities for SecureVault backend
-Handles password normalization to comply with bcrypt 72-byte limit
+Handles password normalization to comply with bcrypt 72-byte limit and
+measures bcrypt cost so operators can pick rounds that meet a latency target
 """
+import time
+from typing import Optional
+
+from passlib.hash import bcrypt
+
 
 def normalize_password(password: str) -> str:
     """
@@ -13,4 +19,62 @@ def normalize_password(password: str) -> str:
     Returns:
         A normalized password string that is at most 72 bytes when encoded as UTF-8
     """
-    return password.encode("utf-8")[:72].decode("utf-8", errors="ignore")
\ No newline at end of file
+    return password.encode("utf-8")[:72].decode("utf-8", errors="ignore")
+
+def measure_bcrypt_ms(rounds: int, samples: int = 1) -> float:
+    """
+    Measure how long one bcrypt hash takes at the given cost on this machine.
+
+    Args:
+        rounds: bcrypt cost factor (log2 of the work)
+        samples: Number of hashes to average over
+
+    Returns:
+        Average hash time in milliseconds
+    """
+    hasher = bcrypt.using(rounds=rounds)
+    started = time.perf_counter()
+    for _ in range(samples):
+        hasher.hash("calibration-password")
+    return (time.perf_counter() - started) / samples * 1000
+
+
+_last_calibration: Optional[dict] = None
+
+
+def calibrate_bcrypt_rounds(target_ms: float, current_rounds: int, min_rounds: int = 10, max_rounds: int = 16) -> dict:
+    """
+    Recommend the bcrypt cost whose hash time is closest to, without exceeding, a latency target.
+
+    Only the configured cost is measured; each extra round doubles the work, so
+    the time at other costs is extrapolated from that measurement.
+
+    Args:
+        target_ms: Desired time for one hash/verify in milliseconds
+        current_rounds: The cost currently configured
+        min_rounds: Lowest cost that will be recommended
+        max_rounds: Highest cost that will be recommended
+
+    Returns:
+        A report with the measured time, the recommended rounds and their estimated time
+    """
+    global _last_calibration
+    measured_ms = measure_bcrypt_ms(current_rounds)
+    recommended = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        if measured_ms * 2 ** (rounds - current_rounds) <= target_ms:
+            recommended = rounds
+
+    _last_calibration = {
+        "current_rounds": current_rounds,
+        "measured_ms": round(measured_ms, 1),
+        "target_ms": target_ms,
+        "recommended_rounds": recommended,
+        "estimated_ms_at_recommended": round(measured_ms * 2 ** (recommended - current_rounds), 1),
+    }
+    return _last_calibration
+
+
+def last_bcrypt_calibration() -> Optional[dict]:
+    """Return the report from the most recent calibrate_bcrypt_rounds() call, if any."""
+    return _last_calibration
@@ -0,0 +1,130 @@
+"""
+In-process token-bucket rate limiting.
+
+Each key (a client IP, a username, ...) has a bucket holding up to ``burst``
+tokens that refills at ``rate_per_minute``. Every attempt takes one token and is
+refused while the bucket is empty. State is per process, so with several workers
+the effective limit is multiplied by the worker count.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+class TokenBucketLimiter:
+    def __init__(self, rate_per_minute: float, burst: int, max_keys: int = 10000):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.throttled = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate_per_second > 0 and self.burst > 0
+
+    def _refill(self, key: str, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (float(self.burst), now))
+        return min(float(self.burst), tokens + (now - updated) * self.rate_per_second)
+
+    def acquire(self, key: str) -> Optional[float]:
+        """
+        Take one token from the key's bucket.
+
+        Returns:
+            None if the attempt is allowed, otherwise the number of seconds until a token is available
+        """
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            tokens = self._refill(key, now)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                self.throttled += 1
+                return (1 - tokens) / self.rate_per_second
+
+            self._buckets[key] = (tokens - 1, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                # The least recently used bucket is the one most likely to be full again
+                self._buckets.popitem(last=False)
+            self.allowed += 1
+            return None
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "rate_per_minute": self.rate_per_second * 60,
+                "burst": self.burst,
+                "tracked_keys": len(self._buckets),
+                "allowed": self.allowed,
+                "throttled": self.throttled,
+            }
+
+
+_login_limiters: Optional[Dict[str, TokenBucketLimiter]] = None
+_login_limiters_lock = threading.Lock()
+
+
+def get_login_limiters() -> Dict[str, TokenBucketLimiter]:
+    """Return the process-wide login limiters, keyed by "ip" and "username"."""
+    global _login_limiters
+    if _login_limiters is None:
+        with _login_limiters_lock:
+            if _login_limiters is None:
+                from ..config.settings import settings
+                _login_limiters = {
+                    "ip": TokenBucketLimiter(settings.login_ip_rate_per_minute, settings.login_ip_burst),
+                    "username": TokenBucketLimiter(settings.login_username_rate_per_minute, settings.login_username_burst),
+                }
+    return _login_limiters
+
+
+def resolve_client_ip(peer: Optional[str], forwarded_for: Optional[str], trusted_hops: int) -> Optional[str]:
+    """
+    Work out the client address of a request that may have come through reverse proxies.
+
+    Each trusted proxy appends the address it received the request from to
+    X-Forwarded-For, so the client is the entry `trusted_hops` from the right.
+    Anything further left was supplied by the client and is ignored.
+
+    Args:
+        peer: Address of the connecting socket
+        forwarded_for: The X-Forwarded-For header, if any
+        trusted_hops: Number of proxies in front of the app; 0 uses the peer address
+    """
+    if trusted_hops <= 0 or not forwarded_for:
+        return peer
+    hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+    if not hops:
+        return peer
+    # A shorter header than expected means the request skipped a proxy; the leftmost entry is the best guess
+    return hops[-min(trusted_hops, len(hops))]
+
+
+def check_login_rate(client_ip: Optional[str], username: str) -> Optional[float]:
+    """
+    Charge a login attempt against the client's IP and the target username.
+
+    Returns:
+        None if the attempt may proceed, otherwise the seconds to wait before retrying
+    """
+    limiters = get_login_limiters()
+    retry_after = None
+    if client_ip:
+        retry_after = limiters["ip"].acquire(client_ip)
+    if retry_after is None:
+        retry_after = limiters["username"].acquire(username.lower())
+    return retry_after
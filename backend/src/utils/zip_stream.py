@@ -0,0 +1,76 @@
+"""
+Streaming ZIP archives built on the fly.
+
+The archive is written to a sink that cannot seek, so zipfile puts each entry's
+CRC and sizes in a data descriptor after its data instead of going back to patch
+the local header. Nothing is buffered beyond the bytes of the current write, and
+no temporary file is needed however large the archive grows.
+"""
+import zipfile
+from datetime import datetime
+from typing import AsyncIterator, List, NamedTuple, Optional
+
+
+class ZipEntry(NamedTuple):
+    """One file to add to a streamed archive."""
+    name: str
+    modified: Optional[datetime]
+    size: Optional[int]  # Uncompressed size when known up front; unknown sizes get ZIP64 headers
+    chunks: AsyncIterator[bytes]
+
+
+class _ChunkSink:
+    """Write-only file object that collects zipfile's output until it is drained."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _zip_date_time(modified: Optional[datetime]):
+    # ZIP timestamps cannot predate 1980
+    modified = modified or datetime.utcnow()
+    return max(modified.timetuple()[:6], (1980, 1, 1, 0, 0, 0))
+
+
+async def aiter_zip(entries: AsyncIterator[ZipEntry]) -> AsyncIterator[bytes]:
+    """
+    Stream a ZIP archive (stored, not compressed) of the given entries.
+
+    Entries are stored because their data is either ciphertext or, for most vault
+    files (images, PDFs, archives), already compressed.
+
+    Args:
+        entries: Async iterator of ZipEntry, consumed one entry at a time
+
+    Returns:
+        Async iterator of archive bytes
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        async for entry in entries:
+            info = zipfile.ZipInfo(entry.name, date_time=_zip_date_time(entry.modified))
+            info.compress_type = zipfile.ZIP_STORED
+            if entry.size is not None:
+                info.file_size = entry.size
+            with archive.open(info, mode="w", force_zip64=entry.size is None) as member:
+                async for chunk in entry.chunks:
+                    member.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            # Data descriptor
+            yield sink.drain()
+    # Central directory
+    yield sink.drain()
@@ -0,0 +1,188 @@
+"""
+Tests for the audit log hash chain and its single-writer appends
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.config.settings import settings
+from src.models import AuditCheckpoint, AuditLogEntry
+from src.models.base import Base
+from src.services.audit_log_service import AuditChainWriter, AuditLogService, get_audit_chain_writer
+
+
+@pytest.fixture
+def factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}", connect_args={"timeout": 30})
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def test_concurrent_logging_keeps_one_linear_chain(factory):
+    def log(i):
+        db = factory()
+        try:
+            return AuditLogService(db).log_action(None, "TEST", "success", {"i": i}, durability="sync").sequence
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        sequences = list(pool.map(log, range(40)))
+
+    assert sorted(sequences) == list(range(1, 41))
+    db = factory()
+    assert AuditLogService(db).verify_integrity()
+    writer = get_audit_chain_writer(db.get_bind())
+    last = db.query(AuditLogEntry).filter_by(sequence=40).one()
+    assert writer.head() == (40, last.entry_hash)
+    db.close()
+
+
+def test_second_writer_reloads_the_head_instead_of_forking(factory):
+    db = factory()
+    engine = db.get_bind()
+    first, second = AuditChainWriter(engine), AuditChainWriter(engine)
+    try:
+        first.append(user_id=None, action_type="A", result="success")
+        second.append(user_id=None, action_type="B", result="success")
+        # first still believes the head is entry 1
+        third = first.append(user_id=None, action_type="C", result="success")
+    finally:
+        first.close()
+        second.close()
+
+    assert third.sequence == 3
+    assert AuditLogService(db).verify_integrity()
+    db.close()
+
+
+def test_tampering_is_detected(factory):
+    db = factory()
+    service = AuditLogService(db)
+    for action in ("LOGIN", "FILE_ENCRYPT", "LOGOUT"):
+        service.log_action(None, action, "success", durability="sync")
+    assert service.verify_integrity()
+
+    entry = db.query(AuditLogEntry).filter_by(sequence=2).one()
+    entry.result = "failure"
+    db.commit()
+    assert not service.verify_integrity()
+
+    entry.result = "success"
+    db.commit()
+    assert service.verify_integrity()
+
+    db.query(AuditLogEntry).filter_by(sequence=1).delete()
+    db.commit()
+    assert not service.verify_integrity()
+    db.close()
+
+
+def test_async_entries_are_batched_and_drained_on_close(factory):
+    db = factory()
+    writer = AuditChainWriter(db.get_bind(), batch_size=50, flush_interval=0.2)
+    for i in range(120):
+        assert writer.append(durability="async", user_id=None, action_type="BULK", result="success", details={"i": i}) is None
+    critical = writer.append(durability="sync", user_id=None, action_type="ROLE_CHANGE", result="success")
+    writer.append(durability="async", user_id=None, action_type="LAST", result="success")
+    writer.close()
+
+    stats = writer.stats()
+    assert stats["written"] == 122 and stats["queued"] == 0
+    assert stats["batches"] < 10 and stats["largest_batch"] == 50
+    assert critical.sequence == 121
+    assert db.query(AuditLogEntry).filter_by(sequence=122).one().action_type == "LAST"
+    assert AuditLogService(db).verify_integrity()
+    db.close()
+
+
+def test_invalid_entry_fails_alone(factory):
+    db = factory()
+    writer = AuditChainWriter(db.get_bind(), flush_interval=0.2)
+    try:
+        writer.append(durability="async", user_id=None, action_type="OK", result="success")
+        writer.append(durability="async", user_id=None, action_type=None, result="success")  # NOT NULL violation
+        writer.append(durability="async", user_id=None, action_type="OK", result="success")
+        writer.flush()
+        assert writer.stats()["failed"] == 1
+        with pytest.raises(ValueError):
+            writer.append(durability="eventually", user_id=None, action_type="OK", result="success")
+    finally:
+        writer.close()
+    assert db.query(AuditLogEntry).count() == 2
+    assert AuditLogService(db).verify_integrity()
+    db.close()
+
+
+def _log(db, count):
+    writer = get_audit_chain_writer(db.get_bind())
+    for i in range(count):
+        writer.append(durability="async", user_id=None, action_type="TEST", result="success", details={"i": i})
+    writer.flush()
+
+
+def test_verification_resumes_from_the_last_checkpoint(factory, monkeypatch):
+    monkeypatch.setattr(settings, "audit_checkpoint_interval", 20)
+    monkeypatch.setattr(settings, "audit_verify_batch_size", 7)
+    db = factory()
+    service = AuditLogService(db)
+    _log(db, 30)
+
+    first = service.verify_chain()
+    assert first == (True, None, 30, 0, 30)
+    assert db.query(AuditCheckpoint).one().sequence == 30
+
+    _log(db, 5)
+    assert service.verify_chain() == (True, None, 5, 30, 35)
+
+    # Before the checkpoint only a full run re-hashes
+    db.query(AuditLogEntry).filter_by(sequence=12).update({"result": "failure"})
+    db.commit()
+    assert service.verify_chain().valid
+    assert service.verify_chain(full=True)[:3] == (False, 12, 11)
+
+    # After it, the first broken position is reported
+    db.query(AuditLogEntry).filter_by(sequence=33).delete()
+    db.commit()
+    assert service.verify_chain()[:3] == (False, 33, 2)
+    db.close()
+
+
+def test_forged_or_stale_checkpoints_are_ignored(factory, monkeypatch):
+    monkeypatch.setattr(settings, "audit_checkpoint_interval", 10)
+    db = factory()
+    service = AuditLogService(db)
+    _log(db, 10)
+    assert service.verify_chain().valid
+    _log(db, 10)
+    assert service.verify_chain().checkpoint_sequence == 10
+
+    forged = db.query(AuditCheckpoint).filter_by(sequence=20).one()
+    forged.signature = "0" * 64
+    db.commit()
+    assert service.verify_chain().checkpoint_sequence == 10
+
+    # Rewriting the checkpointed entry invalidates its checkpoint
+    db.query(AuditLogEntry).filter_by(sequence=10).update({"entry_hash": "f" * 64})
+    db.commit()
+    assert service.verify_chain()[:4] == (False, 10, 9, 0)
+    db.close()
+
+
+def test_parallel_range_verification_matches_serial(factory, monkeypatch):
+    monkeypatch.setattr(settings, "audit_verify_batch_size", 10)
+    db = factory()
+    service = AuditLogService(db)
+    _log(db, 95)
+    assert service.verify_chain(workers=3).valid
+
+    # Break the link at the boundary between the first two ranges (1-32, 33-64)
+    db.query(AuditLogEntry).filter_by(sequence=33).update({"previous_hash": "0" * 64})
+    db.query(AuditLogEntry).filter_by(sequence=70).update({"result": "failure"})
+    db.commit()
+    assert service.verify_chain(workers=3) == service.verify_chain(workers=1)
+    assert service.verify_chain(workers=3)[:2] == (False, 33)
+    db.close()
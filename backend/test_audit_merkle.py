@@ -0,0 +1,92 @@
+"""
+Tests for the Merkle tree over the audit chain and its proofs
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.models import AuditLogEntry
+from src.models.base import Base
+from src.services.audit_log_service import AuditChainWriter, AuditLogService
+from src.utils import merkle
+
+
+def _reference_root(leaves):
+    # RFC 6962 Merkle tree hash, computed recursively from all leaves
+    if not leaves:
+        return merkle.EMPTY_ROOT
+    if len(leaves) == 1:
+        return leaves[0]
+    k = 1 << ((len(leaves) - 1).bit_length() - 1)
+    return merkle.node_hash(_reference_root(leaves[:k]), _reference_root(leaves[k:]))
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_incremental_tree_matches_rfc_6962():
+    leaves = [merkle.leaf_hash(bytes([i])) for i in range(40)]
+    frontier, nodes = [], {}
+    for size, leaf in enumerate(leaves, start=1):
+        frontier, created = merkle.append_leaf(frontier, leaf)
+        assert len(created) <= size.bit_length()
+        nodes.update(((level, position), node) for level, position, node in created)
+        assert merkle.range_hash(0, size, nodes) == _reference_root(leaves[:size])
+
+    for size in range(1, 41):
+        root = _reference_root(leaves[:size])
+        for index in range(size):
+            path = [merkle.range_hash(a, b, nodes) for a, b in merkle.inclusion_ranges(index, size)]
+            assert merkle.verify_inclusion(leaves[index], index, size, path, root)
+            assert not merkle.verify_inclusion(leaves[index - 1], index, size, path, root) or size == 1
+        for first in range(1, size + 1):
+            proof = [merkle.range_hash(a, b, nodes) for a, b in merkle.consistency_ranges(first, size)]
+            assert merkle.verify_consistency(first, size, _reference_root(leaves[:first]), root, proof)
+            assert not merkle.verify_consistency(first, size, _reference_root(leaves[1:first + 1]), root, proof)
+
+
+def test_proofs_for_logged_entries(db):
+    writer = AuditChainWriter(db.get_bind(), batch_size=8)
+    try:
+        for i in range(13):
+            writer.append(durability="async", user_id=None, action_type="TEST", result="success", details={"i": i})
+        writer.flush()
+        old_head = AuditLogService(db).signed_tree_head()
+        for i in range(10):
+            writer.append(durability="async", user_id=None, action_type="TEST", result="success", details={"i": i})
+        writer.flush()
+    finally:
+        writer.close()
+
+    service = AuditLogService(db)
+    head = service.signed_tree_head()
+    assert head["tree_size"] == 23 and len(head["signature"]) == 64
+    entry_hashes = [row.entry_hash for row in db.query(AuditLogEntry).order_by(AuditLogEntry.sequence)]
+    leaves = [merkle.leaf_hash(bytes.fromhex(entry_hash)) for entry_hash in entry_hashes]
+    assert head["root_hash"] == _reference_root(leaves).hex()
+
+    proof = service.inclusion_proof(7)
+    path = [bytes.fromhex(node) for node in proof["audit_path"]]
+    assert len(path) <= 5
+    assert merkle.verify_inclusion(bytes.fromhex(proof["leaf_hash"]), 6, 23, path, bytes.fromhex(head["root_hash"]))
+
+    consistency = service.consistency_proof(old_head["tree_size"])
+    assert consistency["first_root_hash"] == old_head["root_hash"]
+    assert merkle.verify_consistency(
+        13, 23,
+        bytes.fromhex(old_head["root_hash"]),
+        bytes.fromhex(head["root_hash"]),
+        [bytes.fromhex(node) for node in consistency["proof"]]
+    )
+
+    with pytest.raises(ValueError):
+        service.inclusion_proof(24)
+    with pytest.raises(ValueError):
+        service.consistency_proof(5, 30)
@@ -0,0 +1,102 @@
+"""
+Tests for the bounded crypto executor
+"""
+import asyncio
+import threading
+
+import pytest
+
+from src.utils import encryption_utils
+from src.utils.crypto_executor import CryptoExecutor, CryptoExecutorSaturated
+from src.utils.encryption_utils import KEY_ID_SIZE, StreamEncryptor, aiter_encrypt, generate_data_key
+
+
+def test_rejects_work_beyond_capacity():
+    executor = CryptoExecutor(max_workers=1, max_queue_depth=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(CryptoExecutorSaturated):
+            await executor.run(sum, [1, 2])
+        release.set()
+        await asyncio.gather(*running)
+
+    asyncio.run(scenario())
+    metrics = executor.metrics()
+    assert metrics["rejected"] == 1
+    assert metrics["completed"] == 2
+    assert metrics["peak_in_flight"] == 2
+    assert metrics["in_flight"] == 0
+    executor.shutdown()
+
+
+def test_started_streams_are_not_cut_off():
+    executor = CryptoExecutor(max_workers=1, max_queue_depth=0)
+
+    async def scenario():
+        return [item async for item in executor.iterate(iter(range(5)))]
+
+    assert asyncio.run(scenario()) == [0, 1, 2, 3, 4]
+    assert list(executor.iterate_sync(iter("abc"))) == ["a", "b", "c"]
+    assert executor.metrics()["rejected"] == 0
+    executor.shutdown()
+
+
+def test_failures_are_counted_and_propagated():
+    executor = CryptoExecutor(max_workers=2, max_queue_depth=0)
+    with pytest.raises(ZeroDivisionError):
+        executor.call(lambda: 1 / 0)
+    assert executor.metrics()["failed"] == 1
+    executor.shutdown()
+
+
+def test_cancelled_callers_keep_their_slot_until_the_task_finishes():
+    executor = CryptoExecutor(max_workers=1, max_queue_depth=0)
+    release = threading.Event()
+
+    async def scenario():
+        task = asyncio.ensure_future(executor.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # The worker is still busy, so new work is still turned away
+        assert executor.metrics()["in_flight"] == 1
+        with pytest.raises(CryptoExecutorSaturated):
+            await executor.run(sum, [1, 2])
+        release.set()
+
+    asyncio.run(scenario())
+    executor.shutdown()
+    assert executor.metrics()["in_flight"] == 0
+
+
+def test_stream_encryption_is_admission_controlled(monkeypatch):
+    executor = CryptoExecutor(max_workers=1, max_queue_depth=0)
+    monkeypatch.setattr(encryption_utils, "get_crypto_executor", lambda: executor)
+    release = threading.Event()
+
+    async def chunks():
+        for _ in range(3):
+            yield b"x" * 1024
+
+    async def encrypt():
+        encryptor = StreamEncryptor.for_data_key(generate_data_key(), bytes(KEY_ID_SIZE))
+        return b"".join([out async for out in aiter_encrypt(chunks(), encryptor)])
+
+    async def scenario():
+        busy = asyncio.ensure_future(executor.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        with pytest.raises(CryptoExecutorSaturated):
+            await encrypt()
+        release.set()
+        await busy
+        # Once admitted, the rest of the stream is not rejected
+        return await encrypt()
+
+    assert asyncio.run(scenario())
+    assert executor.metrics()["rejected"] == 1
+    executor.shutdown()
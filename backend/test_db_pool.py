@@ -0,0 +1,64 @@
+"""
+Tests for database engine pool settings, metrics and SQLite pragmas
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from src.database import async_database_url, create_async_database_engine, create_database_engine
+from src.utils.db_pool import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool, pool_metrics
+
+
+def test_sqlite_file_gets_wal_and_instrumented_pool(tmp_path):
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+    assert isinstance(engine.pool, InstrumentedQueuePool)
+    engine.dispose()
+
+
+def test_pool_metrics_track_overflow_and_timeouts(tmp_path):
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'pool.db'}", pool_size=1, max_overflow=1, pool_timeout=0.05)
+    first, second = engine.connect(), engine.connect()
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+
+    metrics = pool_metrics(engine)
+    assert metrics["checked_out"] == 2
+    assert metrics["peak_overflow"] == 1
+    assert metrics["timeouts"] == 1
+    assert metrics["max_checkout_wait_ms"] >= 40
+
+    first.close()
+    second.close()
+    assert pool_metrics(engine)["checkouts"] == 2
+    engine.dispose()
+
+
+def test_in_memory_sqlite_keeps_default_pool():
+    engine = create_database_engine("sqlite://")
+    assert not isinstance(engine.pool, InstrumentedQueuePool)
+    assert pool_metrics(engine)["pool_class"] == type(engine.pool).__name__
+
+
+def test_async_database_url_selects_async_drivers():
+    assert async_database_url("sqlite:///./data.db").drivername == "sqlite+aiosqlite"
+    url = async_database_url("postgresql://u:p@db/vault?sslmode=require")
+    assert url.drivername == "postgresql+asyncpg"
+    assert dict(url.query) == {"ssl": "require"}
+
+
+def test_async_engine_shares_pool_settings_and_pragmas(tmp_path):
+    engine = create_async_database_engine(f"sqlite:///{tmp_path / 'pool.db'}", pool_size=2)
+
+    async def check():
+        async with engine.connect() as conn:
+            assert (await conn.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+        await engine.dispose()
+
+    asyncio.run(check())
+    assert isinstance(engine.pool, InstrumentedAsyncAdaptedQueuePool)
+    assert pool_metrics(engine)["checkouts"] == 1
@@ -0,0 +1,109 @@
+"""
+Tests for the keyset-paginated /vault/files listing
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from src.database import async_database_url, get_async_db, get_db
+from src.main import app
+from src.models import EncryptedFile, User
+from src.models.base import Base
+from src.services.user_service import UserService
+
+BASE_TIME = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def client(tmp_path):
+    url = f"sqlite:///{tmp_path / 'vault.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+
+    def override_get_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    # NullPool: TestClient runs every request on its own event loop
+    async_factory = async_sessionmaker(create_async_engine(async_database_url(url), poolclass=NullPool), expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with async_factory() as db:
+            yield db
+
+    db = factory()
+    user = User(username="lister", password_hash="x", salt="")
+    other = User(username="other", password_hash="x", salt="")
+    db.add_all([user, other])
+    db.flush()
+    for i in range(25):
+        db.add(EncryptedFile(
+            user_id=user.id,
+            original_filename=f"{'report' if i % 2 else 'photo'}_{i:02d}.bin",
+            file_size=i * 100,
+            encrypted_path=f"enc_{i}",
+            algorithm_version="AES-256-GCM-ENVELOPE-v1",
+            # Pairs of files share a timestamp so pages must break ties on id
+            created_at=BASE_TIME + timedelta(minutes=i // 2),
+        ))
+    db.add(EncryptedFile(
+        user_id=other.id, original_filename="photo_x.bin", file_size=1,
+        encrypted_path="enc_x", algorithm_version="AES-256-GCM-ENVELOPE-v1",
+    ))
+    db.commit()
+    token = UserService(db).generate_access_token(user)
+    db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    client = TestClient(app)
+    client.headers["Authorization"] = f"Bearer {token}"
+    yield client
+    app.dependency_overrides.clear()
+
+
+def _collect(client, **params):
+    names, cursor = [], None
+    while True:
+        response = client.get("/vault/files", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        names.extend(item["original_name"] for item in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return names
+
+
+def test_pages_cover_every_file_once(client):
+    first = client.get("/vault/files", params={"limit": 10, "include_total": "true"})
+    assert len(first.json()) == 10
+    assert first.headers["X-Total-Count"] == "25"
+
+    names = _collect(client, limit=7)
+    assert len(names) == 25 and len(set(names)) == 25
+    assert names[0] == "photo_24.bin"  # Newest first by default
+
+
+def test_sort_and_filters(client):
+    by_size = _collect(client, limit=4, sort="size", order="asc", min_size=500, max_size=1200)
+    assert by_size == [f"{'report' if i % 2 else 'photo'}_{i:02d}.bin" for i in range(5, 13)]
+
+    reports = _collect(client, limit=5, sort="name", order="asc", name_prefix="report")
+    assert reports == sorted(reports) and len(reports) == 12
+
+    recent = _collect(client, limit=3, created_after=(BASE_TIME + timedelta(minutes=10)).isoformat())
+    assert sorted(recent) == ["photo_20.bin", "photo_22.bin", "photo_24.bin", "report_21.bin", "report_23.bin"]
+
+
+def test_cursor_must_match_sort(client):
+    cursor = client.get("/vault/files", params={"limit": 2}).headers["X-Next-Cursor"]
+    assert client.get("/vault/files", params={"cursor": cursor, "sort": "size"}).status_code == 400
+    assert client.get("/vault/files", params={"cursor": "not-a-cursor"}).status_code == 400
@@ -0,0 +1,17 @@
+"""
+Tests that the hot queries use the indexes declared on the models
+"""
+from benchmark_indexes import QUERIES, run_benchmark
+
+
+def test_hot_queries_use_indexes():
+    results = run_benchmark("sqlite://", rows=2000, users=20, repeat=1)
+
+    assert "SCAN file_metadata" in results["before"]["metadata by file"]["plan"]
+    after = {name: result["plan"] for name, result in results["after"].items()}
+    assert "ix_encrypted_files_user_id_created_at" in after["list user files"]
+    assert "ix_file_metadata_file_id" in after["metadata by file"]
+    assert "uq_vaults_user_id" in after["vault by user"]
+    assert "ix_audit_logs_timestamp" in after["audit chain head"]
+    assert "ix_audit_logs_user_id_timestamp" in after["audit history for user"]
+    assert set(after) == set(QUERIES)
@@ -0,0 +1,58 @@
+"""
+Tests for the derived-key cache
+"""
+import time
+
+from src.utils.key_cache import DerivedKeyCache
+
+SALT = b"s" * 32
+
+
+def test_get_or_derive_runs_kdf_once_per_scope():
+    cache = DerivedKeyCache(max_entries=8, ttl_seconds=60)
+    calls = []
+
+    def derive():
+        calls.append(1)
+        return b"k" * 32
+
+    assert cache.get_or_derive("pw", SALT, 1000, derive, scope="alice") == b"k" * 32
+    assert cache.get_or_derive("pw", SALT, 1000, derive, scope="alice") == b"k" * 32
+    assert len(calls) == 1
+
+    # A different user, password or iteration count is a different entry
+    cache.get_or_derive("pw", SALT, 1000, derive, scope="bob")
+    cache.get_or_derive("other", SALT, 1000, derive, scope="alice")
+    cache.get_or_derive("pw", SALT, 2000, derive, scope="alice")
+    assert len(calls) == 4
+    assert cache.stats()["hits"] == 1
+
+
+def test_lru_eviction_zeroizes_key_material():
+    cache = DerivedKeyCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", SALT, 1, b"\x01" * 32, scope="u")
+    held = next(iter(cache._entries.values())).key
+    cache.put("b", SALT, 1, b"\x02" * 32, scope="u")
+    cache.put("c", SALT, 1, b"\x03" * 32, scope="u")
+
+    assert cache.get("a", SALT, 1, scope="u") is None
+    assert held == bytearray(32)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = DerivedKeyCache(max_entries=2, ttl_seconds=0.01)
+    cache.put("a", SALT, 1, b"\x01" * 32, scope="u")
+    time.sleep(0.02)
+    assert cache.get("a", SALT, 1, scope="u") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_purge_scope_only_drops_that_user():
+    cache = DerivedKeyCache()
+    cache.put("a", SALT, 1, b"\x01" * 32, scope="alice")
+    cache.put("a", SALT, 1, b"\x02" * 32, scope="bob")
+
+    assert cache.purge_scope("alice") == 1
+    assert cache.get("a", SALT, 1, scope="alice") is None
+    assert cache.get("a", SALT, 1, scope="bob") == b"\x02" * 32
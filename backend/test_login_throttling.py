@@ -0,0 +1,118 @@
+"""
+Tests for login throttling, the password executor and bcrypt calibration
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from src.config.settings import settings
+from src.database import async_database_url, get_async_db, get_db
+from src.main import app
+from src.models.base import Base
+from src.services.user_service import UserService
+from src.utils import rate_limiter
+from src.utils.crypto_executor import get_password_executor
+from src.utils.password_utils import calibrate_bcrypt_rounds, last_bcrypt_calibration
+from src.utils.rate_limiter import TokenBucketLimiter
+
+PASSWORD = "SecurePass123!"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'vault.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+
+    def override_get_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    # NullPool: TestClient runs every request on its own event loop
+    async_factory = async_sessionmaker(create_async_engine(async_database_url(url), poolclass=NullPool), expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with async_factory() as db:
+            yield db
+
+    db = factory()
+    UserService(db).create_user("alice", PASSWORD)
+    db.close()
+
+    monkeypatch.setattr(rate_limiter, "_login_limiters", {
+        "ip": TokenBucketLimiter(rate_per_minute=60, burst=100),
+        "username": TokenBucketLimiter(rate_per_minute=1, burst=2),
+    })
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_token_bucket_refuses_when_empty_and_refills():
+    limiter = TokenBucketLimiter(rate_per_minute=6000, burst=2)
+    assert limiter.acquire("k") is None
+    assert limiter.acquire("k") is None
+    retry_after = limiter.acquire("k")
+    assert retry_after is not None and retry_after <= 0.01
+    assert limiter.acquire("other") is None
+
+    limiter.rate_per_second = 1e9
+    assert limiter.acquire("k") is None
+    assert limiter.stats()["throttled"] == 1
+
+
+def test_login_is_throttled_per_username(client):
+    submitted = get_password_executor().metrics()["submitted"]
+
+    assert client.post("/auth/login", json={"username": "alice", "password": "wrong"}).status_code == 401
+    assert client.post("/auth/login", json={"username": "alice", "password": PASSWORD}).status_code == 200
+
+    response = client.post("/auth/login", json={"username": "Alice", "password": PASSWORD})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+
+    # Throttled attempts never reach bcrypt
+    assert get_password_executor().metrics()["submitted"] == submitted + 2
+
+
+def test_forwarded_clients_get_separate_ip_buckets(client, monkeypatch):
+    monkeypatch.setattr(settings, "trusted_proxy_hops", 1)
+    rate_limiter._login_limiters["ip"] = TokenBucketLimiter(rate_per_minute=1, burst=1)
+
+    def login(forwarded_for, username):
+        return client.post(
+            "/auth/login",
+            json={"username": username, "password": "wrong"},
+            headers={"X-Forwarded-For": forwarded_for},
+        )
+
+    # Every request arrives from the same proxy peer; only the forwarded address differs
+    assert login("203.0.113.1", "bob").status_code == 401
+    assert login("203.0.113.2", "carol").status_code == 401
+    assert login("203.0.113.1", "dave").status_code == 429
+
+    # A client-supplied entry left of the proxy's own does not open a new bucket
+    assert login("198.51.100.7, 203.0.113.2", "erin").status_code == 429
+
+
+def test_resolve_client_ip_uses_trusted_hops_only():
+    assert rate_limiter.resolve_client_ip("10.0.0.1", "1.2.3.4", 0) == "10.0.0.1"
+    assert rate_limiter.resolve_client_ip("10.0.0.1", None, 1) == "10.0.0.1"
+    assert rate_limiter.resolve_client_ip("10.0.0.1", "6.6.6.6, 1.2.3.4", 1) == "1.2.3.4"
+    assert rate_limiter.resolve_client_ip("10.0.0.1", "1.2.3.4, 10.0.0.2", 2) == "1.2.3.4"
+
+
+def test_calibration_recommends_rounds_within_target():
+    report = calibrate_bcrypt_rounds(target_ms=10_000, current_rounds=4, min_rounds=4, max_rounds=8)
+    assert report["current_rounds"] == 4
+    assert 4 <= report["recommended_rounds"] <= 8
+    assert report["estimated_ms_at_recommended"] <= 10_000
+    assert last_bcrypt_calibration() == report
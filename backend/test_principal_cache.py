@@ -0,0 +1,116 @@
+"""
+Tests for the authenticated-principal cache, token issuing and token-version revocation
+"""
+import time
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.models import User
+from src.models.base import Base
+from src.models.user import UserRole, UserStatus
+from src.services.admin_service import AdminService
+from src.services.user_service import UserService
+from src.utils.principal_cache import Principal, PrincipalCache, get_principal_cache
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.queries = []
+    event.listen(engine, "before_cursor_execute", lambda *args: session.queries.append(args[2]))
+    get_principal_cache().clear()
+    yield session
+    session.close()
+    get_principal_cache().clear()
+
+
+def _user(db, username, role=UserRole.USER):
+    user = User(username=username, password_hash="x", salt="", role=role, status=UserStatus.ACTIVE)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_cache_expires_and_evicts():
+    cache = PrincipalCache(max_entries=1, ttl_seconds=0.01)
+    cache.put(Principal("a", "alice", UserRole.USER, UserStatus.ACTIVE, 0))
+    cache.put(Principal("b", "bob", UserRole.USER, UserStatus.ACTIVE, 0))
+    assert cache.get("a") is None
+    time.sleep(0.02)
+    assert cache.get("b") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_principal_served_from_cache_without_query(db):
+    service = UserService(db)
+    user = _user(db, "alice")
+    token = service.generate_access_token(user)
+
+    assert service.get_current_principal(token).id == user.id
+    db.queries.clear()
+    principal = service.get_current_principal(token)
+    assert principal.role == UserRole.USER
+    assert db.queries == []
+
+
+def test_deactivation_revokes_tokens_immediately(db):
+    service = UserService(db)
+    user = _user(db, "alice")
+    token = service.generate_access_token(user)
+    assert service.get_current_principal(token) is not None
+
+    service.deactivate_user(user.id)
+    assert service.get_current_principal(token) is None
+
+    # Reactivation does not revive tokens issued before the change
+    service.activate_user(user.id)
+    assert service.get_current_principal(token) is None
+    assert service.get_current_user(token) is None
+    assert service.get_current_principal(service.generate_access_token(user)) is not None
+
+
+def test_promotion_bumps_token_version(db):
+    service = UserService(db)
+    admin = _user(db, "root", role=UserRole.ADMIN)
+    user = _user(db, "alice")
+    token = service.generate_access_token(user)
+    service.get_current_principal(token)
+
+    assert AdminService(db, service).promote_to_admin(user.id, admin.id)
+    assert service.get_current_principal(token) is None
+    principal = service.get_current_principal(service.generate_access_token(user))
+    assert principal.role == UserRole.ADMIN
+    assert principal.token_version == 1
+
+
+def test_issuing_tokens_does_not_query(db):
+    service = UserService(db)
+    user = _user(db, "alice")
+    db.refresh(user)
+    db.queries.clear()
+    service.generate_access_token(user)
+    service.generate_refresh_token(user)
+    assert db.queries == []
+
+
+def test_refresh_token_exchange(db):
+    service = UserService(db)
+    user = _user(db, "alice")
+    access_token = service.generate_access_token(user)
+    refresh_token = service.generate_refresh_token(user)
+
+    renewed = service.refresh_access_token(refresh_token)
+    assert service.get_current_principal(renewed).id == user.id
+
+    # Token types are not interchangeable
+    assert service.refresh_access_token(access_token) is None
+    assert service.get_current_principal(refresh_token) is None
+
+    service.deactivate_user(user.id)
+    service.activate_user(user.id)
+    assert service.refresh_access_token(refresh_token) is None
@@ -0,0 +1,70 @@
+"""
+Tests for the storage backend drivers
+"""
+import asyncio
+
+import pytest
+
+from src.storage import InMemoryStorageBackend, LocalStorageBackend, StorageError, StorageObjectNotFound
+
+
+async def _chunks(*parts):
+    for part in parts:
+        yield part
+
+
+async def _exercise(backend, key):
+    assert await backend.put(key, _chunks(b"abc", b"defgh", b"ij")) == 10
+    assert await backend.exists(key)
+    info = await backend.stat(key)
+    assert info.size == 10 and info.etag
+
+    assert await backend.read_bytes(key) == b"abcdefghij"
+    assert await backend.read_bytes(key, offset=2, length=5) == b"cdefg"
+    assert await backend.read_bytes(key, offset=8) == b"ij"
+    assert len([c async for c in backend.get(key)]) == 3  # chunk_size of 4
+
+    assert await backend.delete(key)
+    assert not await backend.delete(key)
+    assert await backend.stat(key) is None
+    with pytest.raises(StorageObjectNotFound):
+        await backend.read_bytes(key)
+
+
+def test_memory_backend():
+    asyncio.run(_exercise(InMemoryStorageBackend(chunk_size=4), "encrypted/u/file.bin"))
+
+
+def test_local_backend(tmp_path):
+    asyncio.run(_exercise(LocalStorageBackend(str(tmp_path), chunk_size=4), "u/file.bin"))
+    assert list((tmp_path / "u").iterdir()) == []
+
+
+def test_local_put_leaves_no_partial_file_on_error(tmp_path):
+    backend = LocalStorageBackend(str(tmp_path))
+
+    async def failing():
+        yield b"partial"
+        raise RuntimeError("upload aborted")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(backend.put("broken.bin", failing()))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_local_filesystem_errors_are_storage_errors(tmp_path):
+    backend = LocalStorageBackend(str(tmp_path))
+    (tmp_path / "folder").mkdir()
+    (tmp_path / "folder" / "inside").write_bytes(b"x")
+
+    async def scenario():
+        with pytest.raises(StorageObjectNotFound):
+            await backend.read_bytes("folder")
+        with pytest.raises(StorageError):
+            await backend.delete("folder")
+        with pytest.raises(StorageError):
+            await backend.put_file("moved.bin", str(tmp_path / "missing.part"))
+        with pytest.raises(StorageError):
+            await backend.put("folder/inside/nested.bin", _chunks(b"x"))
+
+    asyncio.run(scenario())
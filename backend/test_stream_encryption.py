@@ -0,0 +1,158 @@
+"""
+Tests for the segmented AES-256-GCM streaming container in encryption_utils
+"""
+import os
+
+import pytest
+from cryptography.fernet import Fernet
+
+from src.config.settings import settings
+from src.utils.encryption_utils import (
+    MAX_STREAM_CHUNK_SIZE,
+    STREAM_TAG_SIZE,
+    StreamDecryptionError,
+    StreamEncryptor,
+    StreamRangeDecryptor,
+    decrypt_stream,
+    derive_key_from_password,
+    derive_raw_key,
+    encrypt_stream,
+    iter_decrypt_file,
+    parse_stream_header,
+    stream_plaintext_size,
+)
+from src.utils.http_range import RangeNotSatisfiable, parse_range_header
+
+PASSWORD = "SecurePass123!"
+ITERATIONS = 1000
+CHUNK_SIZE = 1024
+
+
+def _encrypt(data: bytes, pieces: int = 7) -> bytes:
+    step = max(1, len(data) // pieces)
+    chunks = [data[i:i + step] for i in range(0, len(data), step)]
+    return b"".join(encrypt_stream(chunks, PASSWORD, iterations=ITERATIONS, chunk_size=CHUNK_SIZE))
+
+
+@pytest.mark.parametrize("size", [0, 1, CHUNK_SIZE - 1, CHUNK_SIZE, CHUNK_SIZE + 1, 5 * CHUNK_SIZE, 5 * CHUNK_SIZE + 17])
+def test_roundtrip_sizes(size):
+    data = os.urandom(size)
+    container = _encrypt(data)
+
+    header = parse_stream_header(container)
+    assert header.iterations == ITERATIONS
+    assert header.chunk_size == CHUNK_SIZE
+
+    segments = max(1, -(-size // CHUNK_SIZE))
+    assert len(container) == header.size + size + segments * STREAM_TAG_SIZE
+
+    # Feed the ciphertext back in odd-sized pieces
+    pieces = [container[i:i + 333] for i in range(0, len(container), 333)]
+    assert b"".join(decrypt_stream(pieces, PASSWORD)) == data
+
+
+def test_wrong_password_is_rejected():
+    container = _encrypt(b"secret data" * 100)
+    with pytest.raises(StreamDecryptionError):
+        b"".join(decrypt_stream([container], "WrongPass123!"))
+
+
+def test_truncation_at_segment_boundary_is_detected():
+    data = os.urandom(3 * CHUNK_SIZE + 10)
+    container = _encrypt(data)
+    header = parse_stream_header(container)
+    truncated = container[:header.size + 2 * header.segment_size]
+    with pytest.raises(StreamDecryptionError):
+        b"".join(decrypt_stream([truncated], PASSWORD))
+
+
+def test_tampered_segment_is_detected():
+    container = bytearray(_encrypt(os.urandom(2 * CHUNK_SIZE)))
+    container[-5] ^= 0x01
+    with pytest.raises(StreamDecryptionError):
+        b"".join(decrypt_stream([bytes(container)], PASSWORD))
+
+
+def _header_with(**fields) -> bytes:
+    header = StreamEncryptor.from_password(PASSWORD, iterations=ITERATIONS, chunk_size=CHUNK_SIZE).header
+    return header._replace(**fields).to_bytes()
+
+
+def test_header_rejects_excessive_iterations():
+    limit = 10 * settings.pbkdf2_iterations
+    assert parse_stream_header(_header_with(iterations=limit)).iterations == limit
+    with pytest.raises(StreamDecryptionError):
+        parse_stream_header(_header_with(iterations=limit + 1))
+    with pytest.raises(StreamDecryptionError):
+        parse_stream_header(_header_with(iterations=0xFFFFFFFF))
+
+
+def test_header_rejects_oversized_chunks():
+    assert parse_stream_header(_header_with(chunk_size=MAX_STREAM_CHUNK_SIZE)).chunk_size == MAX_STREAM_CHUNK_SIZE
+    with pytest.raises(StreamDecryptionError):
+        parse_stream_header(_header_with(chunk_size=MAX_STREAM_CHUNK_SIZE + 1))
+    with pytest.raises(StreamDecryptionError):
+        parse_stream_header(_header_with(chunk_size=0xFFFFFFFF))
+
+
+def test_encryptor_emits_bounded_output():
+    encryptor = StreamEncryptor.from_password(PASSWORD, iterations=ITERATIONS, chunk_size=CHUNK_SIZE)
+    first = encryptor.update(b"x" * CHUNK_SIZE)
+    # A full chunk is held back until more data shows it is not the final segment
+    assert len(first) == encryptor.header.size
+    second = encryptor.update(b"y")
+    assert len(second) == CHUNK_SIZE + STREAM_TAG_SIZE
+    assert len(encryptor.finalize()) == 1 + STREAM_TAG_SIZE
+
+
+def test_legacy_fernet_files_still_decrypt(tmp_path):
+    salt = os.urandom(32)
+    token = Fernet(derive_key_from_password(PASSWORD, salt)).encrypt(b"legacy payload")
+    legacy_path = tmp_path / "legacy.encrypted"
+    legacy_path.write_bytes(salt + token)
+
+    assert b"".join(iter_decrypt_file(str(legacy_path), PASSWORD)) == b"legacy payload"
+
+
+@pytest.mark.parametrize("size", [0, 1, CHUNK_SIZE, 3 * CHUNK_SIZE, 3 * CHUNK_SIZE + 5])
+def test_plaintext_size_from_container_size(size):
+    container = _encrypt(os.urandom(size))
+    assert stream_plaintext_size(parse_stream_header(container), len(container)) == size
+
+
+@pytest.mark.parametrize("start,end", [(0, 0), (10, 20), (CHUNK_SIZE - 1, CHUNK_SIZE), (1500, 3 * CHUNK_SIZE + 4), (3 * CHUNK_SIZE, 3 * CHUNK_SIZE + 4)])
+def test_range_decrypts_only_covering_segments(start, end):
+    data = os.urandom(3 * CHUNK_SIZE + 5)
+    container = _encrypt(data)
+    header = parse_stream_header(container)
+    key = derive_raw_key(PASSWORD, header.salt, header.iterations)
+
+    decryptor = StreamRangeDecryptor(header, key, len(container), start, end)
+    segments = end // CHUNK_SIZE - start // CHUNK_SIZE + 1
+    assert decryptor.length <= segments * header.segment_size
+
+    span = container[decryptor.offset:decryptor.offset + decryptor.length]
+    out = b"".join(decryptor.update(span[i:i + 100]) for i in range(0, len(span), 100)) + decryptor.finalize()
+    assert out == data[start:end + 1]
+
+
+def test_range_detects_tampering_in_its_segments():
+    container = bytearray(_encrypt(os.urandom(3 * CHUNK_SIZE)))
+    header = parse_stream_header(bytes(container))
+    key = derive_raw_key(PASSWORD, header.salt, header.iterations)
+    decryptor = StreamRangeDecryptor(header, key, len(container), CHUNK_SIZE, CHUNK_SIZE + 10)
+    container[decryptor.offset + 3] ^= 1
+
+    with pytest.raises(StreamDecryptionError):
+        decryptor.update(bytes(container[decryptor.offset:decryptor.offset + decryptor.length]))
+
+
+def test_parse_range_header():
+    assert parse_range_header("bytes=0-9", 100) == (0, 9)
+    assert parse_range_header("bytes=90-", 100) == (90, 99)
+    assert parse_range_header("bytes=-10", 100) == (90, 99)
+    assert parse_range_header("bytes=50-500", 100) == (50, 99)
+    assert parse_range_header("bytes=0-1,5-9", 100) is None
+    assert parse_range_header("items=0-9", 100) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range_header("bytes=100-", 100)
@@ -0,0 +1,174 @@
+"""
+Tests for the pooled Supabase Storage backend, run against a local HTTP stand-in
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from src.storage import StorageObjectNotFound, SupabaseClientManager, SupabaseStorageBackend
+
+
+class FakeStorageServer:
+    """Just enough of the Supabase Storage REST API for the backend."""
+
+    def __init__(self):
+        self.objects = {}
+        self.requests = []
+        self.drop_next = False
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        if self.drop_next:
+            self.drop_next = False
+            raise httpx.RemoteProtocolError("Server disconnected", request=request)
+
+        self.requests.append(request)
+        assert request.headers["apikey"] == "service-key"
+        path = request.url.path.removeprefix("/storage/v1")
+
+        if path == "/bucket/vaults":
+            return httpx.Response(200, json={"id": "vaults"})
+        if request.method == "POST" and path.startswith("/object/vaults/"):
+            self.objects[path.removeprefix("/object/vaults/")] = request.read()
+            return httpx.Response(200, json={"Key": path})
+        if request.method == "DELETE" and path == "/object/vaults":
+            prefixes = json.loads(request.read())["prefixes"]
+            return httpx.Response(200, json=[{"name": p} for p in prefixes if self.objects.pop(p, None) is not None])
+
+        key = path.removeprefix("/object/authenticated/vaults/")
+        data = self.objects.get(key)
+        if data is None:
+            return httpx.Response(400, json={"error": "not_found"})
+        if request.method == "HEAD":
+            return httpx.Response(200, headers={"content-length": str(len(data)), "etag": '"abc"'})
+        if "range" in request.headers:
+            start, _, end = request.headers["range"].removeprefix("bytes=").partition("-")
+            end = int(end) if end else len(data) - 1
+            return httpx.Response(206, content=data[int(start):end + 1])
+        return httpx.Response(200, content=data)
+
+
+@pytest.fixture
+def server():
+    return FakeStorageServer()
+
+
+def _backend(server, **kwargs):
+    manager = SupabaseClientManager("https://project.supabase.co", "service-key", transport=httpx.MockTransport(server), **kwargs)
+    return manager, SupabaseStorageBackend(manager, "vaults", chunk_size=4)
+
+
+async def _chunks(*parts):
+    for part in parts:
+        yield part
+
+
+def test_round_trip_reuses_one_client(server):
+    async def scenario():
+        manager, backend = _backend(server)
+        client = await manager.get_client()
+
+        assert await backend.put("encrypted/u1/a.txt", _chunks(b"hello ", b"world")) == 11
+        assert server.objects["encrypted/u1/a.txt"] == b"hello world"
+        assert (await backend.stat("encrypted/u1/a.txt")).size == 11
+        assert await backend.read_bytes("encrypted/u1/a.txt") == b"hello world"
+        assert await backend.read_bytes("encrypted/u1/a.txt", offset=6, length=3) == b"wor"
+        assert await backend.delete("encrypted/u1/a.txt")
+        assert await backend.stat("encrypted/u1/a.txt") is None
+        with pytest.raises(StorageObjectNotFound):
+            await backend.read_bytes("encrypted/u1/a.txt")
+
+        assert await manager.get_client() is client
+        await manager.close()
+        return manager.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["requests"] == 7
+    assert stats["retries"] == 0
+    assert not stats["connected"]
+    assert server.requests[3].headers["range"] == "bytes=6-8"
+
+
+def test_dropped_connection_is_retried_for_idempotent_requests(server):
+    async def scenario():
+        manager, backend = _backend(server)
+        server.objects["k"] = b"data"
+        server.drop_next = True
+        info = await backend.stat("k")
+        await manager.close()
+        return info, manager.stats()
+
+    info, stats = asyncio.run(scenario())
+    assert info.size == 4
+    assert stats["retries"] == 1
+    assert stats["failures"] == 1
+
+
+def test_dropped_connection_does_not_abort_concurrent_transfers(server):
+    started = None
+
+    async def handler(request):
+        # The download stays in flight while the stat on another connection is dropped
+        if request.method == "GET":
+            started.set()
+            await asyncio.sleep(0.05)
+        return server(request)
+
+    async def scenario():
+        nonlocal started
+        started = asyncio.Event()
+        manager = SupabaseClientManager("https://project.supabase.co", "service-key", transport=httpx.MockTransport(handler))
+        backend = SupabaseStorageBackend(manager, "vaults", chunk_size=4)
+        server.objects["k"] = b"data"
+        client = await manager.get_client()
+
+        download = asyncio.create_task(backend.read_bytes("k"))
+        await started.wait()
+        server.drop_next = True
+        info = await backend.stat("k")
+        data = await download
+
+        assert await manager.get_client() is client
+        await manager.close()
+        return info, data, manager.stats()
+
+    info, data, stats = asyncio.run(scenario())
+    assert info.size == 4 and data == b"data"
+    assert stats["retries"] == 1 and stats["failures"] == 1
+
+
+def test_health_check_reports_status(server):
+    async def scenario():
+        manager, _ = _backend(server)
+        healthy = await manager.health_check("vaults")
+        missing = await manager.health_check("other-bucket")
+        await manager.close()
+        return healthy, missing
+
+    healthy, missing = asyncio.run(scenario())
+    assert healthy["status"] == "ok"
+    assert missing["status"] == "unavailable" and missing["error"] == "HTTP 400"
+
+
+def test_failed_health_check_leaves_the_pool_alone(server):
+    async def scenario():
+        manager, _ = _backend(server)
+        await manager.health_check("other-bucket")
+        await manager.close()
+        unreachable = SupabaseClientManager("http://127.0.0.1:9", "test-key")
+        result = await unreachable.health_check("vaults")
+        await unreachable.close()
+        return manager.stats(), result, unreachable.stats()
+
+    stats, unreachable, unreachable_stats = asyncio.run(scenario())
+    assert stats["retries"] == 0
+    assert unreachable["status"] == "unavailable"
+    assert unreachable_stats["retries"] == 0 and unreachable_stats["failures"] == 1
+
+
+def test_pool_settings_are_applied(server):
+    manager, _ = _backend(server, max_connections=3, max_keepalive_connections=2, read_timeout=7)
+    assert manager.limits.max_connections == 3
+    assert manager.limits.max_keepalive_connections == 2
+    assert manager.timeout.read == 7
@@ -0,0 +1,147 @@
+"""
+Tests for incremental decryption in VaultService
+"""
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.config.settings import settings
+from src.models import User
+from src.models.base import Base
+from src.services.vault_service import VaultService
+from src.utils.encryption_utils import StreamDecryptionError
+
+PASSWORD = "SecurePass123!"
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "pbkdf2_iterations", 1000)
+    monkeypatch.setattr(settings, "vaults_path", str(tmp_path / "vaults"))
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def user(db):
+    user = User(username="streamer", password_hash="x", salt="")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _store(db, user, tmp_path, data: bytes):
+    source = tmp_path / "report.pdf"
+    source.write_bytes(data)
+    return asyncio.run(VaultService(db).encrypt_and_store_file(user.id, str(source), PASSWORD))
+
+
+def test_open_decrypted_stream_yields_segments(db, user, tmp_path):
+    data = os.urandom(300 * 1024)
+    stored = _store(db, user, tmp_path, data)
+
+    async def read_all():
+        result = await VaultService(db).open_decrypted_stream(stored.id, user.id, PASSWORD)
+        assert result is not None
+        chunks, original_filename = result
+        return [chunk async for chunk in chunks], original_filename
+
+    chunks, original_filename = asyncio.run(read_all())
+    assert original_filename == "report.pdf"
+    assert len(chunks) > 1
+    assert b"".join(chunks) == data
+
+
+def test_open_decrypted_stream_rejects_wrong_password_before_streaming(db, user, tmp_path):
+    stored = _store(db, user, tmp_path, b"top secret")
+    assert asyncio.run(VaultService(db).open_decrypted_stream(stored.id, user.id, "WrongPass123!")) is None
+
+
+def test_open_decrypted_stream_checks_ownership(db, user, tmp_path):
+    stored = _store(db, user, tmp_path, b"top secret")
+    assert asyncio.run(VaultService(db).open_decrypted_stream(stored.id, "someone-else", PASSWORD)) is None
+
+
+def test_repeated_decrypts_reuse_the_derived_key(db, user, tmp_path):
+    from src.utils.encryption_utils import get_derived_key_cache, purge_cached_keys
+
+    stored = _store(db, user, tmp_path, b"cached")
+    cache = get_derived_key_cache()
+    misses_before = cache.stats()["misses"]
+
+    # The key-encryption key derived during upload is reused for every download
+    service = VaultService(db)
+    assert asyncio.run(service.decrypt_file(stored.id, user.id, PASSWORD))[0] == b"cached"
+    assert asyncio.run(service.decrypt_file(stored.id, user.id, PASSWORD))[0] == b"cached"
+    assert cache.stats()["misses"] == misses_before
+
+    assert purge_cached_keys(user.id) == 1
+
+
+def test_files_use_wrapped_data_keys(db, user, tmp_path):
+    from src.utils.encryption_utils import ENVELOPE_ALGORITHM_VERSION, KDF_NONE, parse_stream_header
+
+    first = _store(db, user, tmp_path, b"first")
+    second = _store(db, user, tmp_path, b"second")
+
+    assert first.algorithm_version == ENVELOPE_ALGORITHM_VERSION
+    assert first.wrapped_key and second.wrapped_key and first.wrapped_key != second.wrapped_key
+
+    with open(first.encrypted_path, "rb") as f:
+        header = parse_stream_header(f.read(512))
+    assert header.kdf_id == KDF_NONE
+    assert header.salt.hex() == first.key_id
+
+
+def test_rewrap_changes_password_without_touching_blobs(db, user, tmp_path):
+    stored = _store(db, user, tmp_path, b"rewrap me")
+    with open(stored.encrypted_path, "rb") as f:
+        blob_before = f.read()
+
+    service = VaultService(db)
+    assert service.rewrap_file_keys(user.id, PASSWORD, "NewPass456!") == (1, 0)
+
+    with open(stored.encrypted_path, "rb") as f:
+        assert f.read() == blob_before
+    assert asyncio.run(service.decrypt_file(stored.id, user.id, PASSWORD)) is None
+    assert asyncio.run(service.decrypt_file(stored.id, user.id, "NewPass456!"))[0] == b"rewrap me"
+
+
+def test_rewrap_with_wrong_old_password_is_refused(db, user, tmp_path):
+    stored = _store(db, user, tmp_path, b"keep me")
+    service = VaultService(db)
+
+    with pytest.raises(StreamDecryptionError):
+        service.rewrap_file_keys(user.id, "WrongPass000!", "NewPass456!")
+    assert asyncio.run(service.decrypt_file(stored.id, user.id, PASSWORD))[0] == b"keep me"
+
+
+def test_legacy_password_containers_still_decrypt(db, user, tmp_path):
+    from src.models import EncryptedFile
+    from src.utils.encryption_utils import STREAM_ALGORITHM_VERSION, encrypt_file
+
+    source = tmp_path / "old.txt"
+    source.write_bytes(b"pre-envelope")
+    path, version = encrypt_file(str(source), PASSWORD, user.id)
+    legacy = EncryptedFile(user_id=user.id, original_filename="old.txt", file_size=12,
+                           encrypted_path=path, algorithm_version=version)
+    db.add(legacy)
+    db.commit()
+
+    assert version == STREAM_ALGORITHM_VERSION
+    assert asyncio.run(VaultService(db).decrypt_file(legacy.id, user.id, PASSWORD))[0] == b"pre-envelope"
+
+
+def test_uploaded_envelope_copy_finds_its_wrapped_key(db, user, tmp_path):
+    stored = _store(db, user, tmp_path, b"downloaded copy")
+
+    chunks = VaultService(db).iter_decrypt_uploaded_file(user.id, stored.encrypted_path, PASSWORD)
+    assert b"".join(chunks) == b"downloaded copy"
+    assert VaultService(db).iter_decrypt_uploaded_file("someone-else", stored.encrypted_path, PASSWORD) is None
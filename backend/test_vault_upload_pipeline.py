@@ -0,0 +1,583 @@
+"""
+Tests for the single-pass /vault/encrypt upload pipeline
+"""
+import asyncio
+import hashlib
+import io
+import os
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from src.api import vault_routes
+from src.config.settings import settings
+from src.database import async_database_url, get_async_db, get_db
+from src.main import app
+from src.models import EncryptedFile, FileMetadata, User, Vault
+from src.models.base import Base
+from src.services.user_service import UserService
+from src.services.vault_service import VaultService
+from src.storage import InMemoryStorageBackend, StorageError, register_storage_backend, reset_storage_backends
+from src.utils.encryption_utils import ENVELOPE_ALGORITHM_VERSION, is_stream_container
+
+PASSWORD = "SecurePass123!"
+
+
+@pytest.fixture
+def session_factory(tmp_path, tmp_path_factory, monkeypatch):
+    monkeypatch.setattr(settings, "pbkdf2_iterations", 1000)
+    monkeypatch.setattr(vault_routes, "TEMP_DIR", tmp_path)
+    monkeypatch.setattr(settings, "storage_backend", "local")
+    monkeypatch.setattr(settings, "upload_staging_path", str(tmp_path / "staging"))
+
+    url = f"sqlite:///{tmp_path_factory.mktemp('db') / 'vault.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+
+    def override_get_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    # NullPool: TestClient runs every request on its own event loop
+    async_factory = async_sessionmaker(create_async_engine(async_database_url(url), poolclass=NullPool), expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with async_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    yield factory
+    app.dependency_overrides.clear()
+    reset_storage_backends()
+
+
+@pytest.fixture
+def auth_headers(session_factory):
+    db = session_factory()
+    user = User(username="uploader", password_hash="x", salt="")
+    db.add(user)
+    db.commit()
+    token = UserService(db).generate_access_token(user)
+    db.close()
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_encrypt_streams_upload_into_container(session_factory, auth_headers, tmp_path):
+    data = os.urandom(200 * 1024 + 3)
+    client = TestClient(app)
+
+    response = client.post(
+        "/vault/encrypt",
+        files={"file": ("notes.txt", data, "text/plain")},
+        data={"password": PASSWORD},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["bytes_processed"] == len(data)
+    assert body["size"] == len(data)
+    assert body["encrypted_size"] > len(data)
+
+    # Only the encrypted container is left behind; no raw_* or enc_* temp copies
+    stored = list(tmp_path.iterdir())
+    assert len(stored) == 1
+    assert stored[0].name.startswith("final_") and stored[0].name.endswith("_notes.txt")
+    assert is_stream_container(stored[0].read_bytes())
+    assert stored[0].stat().st_size == body["encrypted_size"]
+
+    db = session_factory()
+    record = db.query(vault_routes.EncryptedFile).filter_by(id=body["file_id"]).one()
+    assert record.algorithm_version == ENVELOPE_ALGORITHM_VERSION
+    assert record.wrapped_key
+    assert record.file_metadata.file_size == len(data)
+    db.close()
+
+    decrypted = client.post(f"/vault/decrypt/{body['file_id']}", json={"password": PASSWORD}, headers=auth_headers)
+    assert decrypted.status_code == 200
+    assert decrypted.content == data
+
+
+class _FailingBackend(InMemoryStorageBackend):
+    async def put(self, key, chunks, content_type="application/octet-stream"):
+        async for _ in chunks:
+            raise StorageError("bucket unavailable")
+
+
+def test_encrypt_falls_back_to_local_storage(session_factory, auth_headers, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "storage_backend", "memory")
+    register_storage_backend("memory", _FailingBackend())
+    client = TestClient(app)
+
+    response = client.post(
+        "/vault/encrypt",
+        files={"file": ("retry.bin", b"x" * 70000, "application/octet-stream")},
+        data={"password": PASSWORD},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    assert response.json()["storage"] == "ephemeral_tmp"
+
+    # The retry re-read the upload from the start
+    decrypted = client.post(f"/vault/decrypt/{response.json()['file_id']}", json={"password": PASSWORD}, headers=auth_headers)
+    assert decrypted.content == b"x" * 70000
+
+
+def test_object_store_round_trip(session_factory, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "storage_backend", "memory")
+    backend = InMemoryStorageBackend()
+    register_storage_backend("memory", backend)
+    client = TestClient(app)
+
+    response = client.post(
+        "/vault/encrypt",
+        files={"file": ("photo.png", b"pixels", "image/png")},
+        data={"password": PASSWORD},
+        headers=auth_headers,
+    )
+    body = response.json()
+    assert body["storage"] == "memory"
+    key = next(iter(backend.objects))
+    assert key.endswith("/photo.png")
+
+    download = client.get(f"/vault/download-encrypted/{body['file_id']}", headers=auth_headers)
+    assert download.content == backend.objects[key]
+
+    assert client.delete(f"/vault/file/{body['file_id']}", headers=auth_headers).status_code == 200
+    assert backend.objects == {}
+
+
+def test_same_filename_uploaded_twice_keeps_both_files(session_factory, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "storage_backend", "memory")
+    backend = InMemoryStorageBackend()
+    register_storage_backend("memory", backend)
+    client = TestClient(app)
+
+    ids = {}
+    for data in (b"first version", b"second version"):
+        ids[data] = client.post(
+            "/vault/encrypt",
+            files={"file": ("notes.txt", data, "text/plain")},
+            data={"password": PASSWORD},
+            headers=auth_headers,
+        ).json()["file_id"]
+    assert len(backend.objects) == 2
+
+    for data, file_id in ids.items():
+        decrypted = client.post(f"/vault/decrypt/{file_id}", json={"password": PASSWORD}, headers=auth_headers)
+        assert decrypted.content == data
+
+
+def test_range_requests_on_encrypted_and_decrypted_downloads(session_factory, auth_headers):
+    data = os.urandom(200 * 1024)
+    client = TestClient(app)
+    file_id = client.post(
+        "/vault/encrypt",
+        files={"file": ("clip.bin", data, "application/octet-stream")},
+        data={"password": PASSWORD},
+        headers=auth_headers,
+    ).json()["file_id"]
+
+    # Decrypted range spanning a segment boundary
+    start, end = 64 * 1024 - 10, 64 * 1024 + 9
+    response = client.post(
+        f"/vault/decrypt/{file_id}",
+        json={"password": PASSWORD},
+        headers={**auth_headers, "Range": f"bytes={start}-{end}"},
+    )
+    assert response.status_code == 206
+    assert response.content == data[start:end + 1]
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(data)}"
+    assert response.headers["accept-ranges"] == "bytes"
+    etag = response.headers["etag"]
+
+    # A stale If-Range validator gets the whole file
+    full = client.post(
+        f"/vault/decrypt/{file_id}",
+        json={"password": PASSWORD},
+        headers={**auth_headers, "Range": "bytes=0-9", "If-Range": '"stale"'},
+    )
+    assert full.status_code == 200 and full.content == data and full.headers["etag"] == etag
+
+    wrong = client.post(
+        f"/vault/decrypt/{file_id}",
+        json={"password": "WrongPass123!"},
+        headers={**auth_headers, "Range": "bytes=0-9"},
+    )
+    assert wrong.status_code == 404
+
+    unsatisfiable = client.post(
+        f"/vault/decrypt/{file_id}",
+        json={"password": PASSWORD},
+        headers={**auth_headers, "Range": f"bytes={len(data)}-"},
+    )
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == f"bytes */{len(data)}"
+
+    # Raw container: resume from an offset
+    container = client.get(f"/vault/download-encrypted/{file_id}", headers=auth_headers).content
+    resumed = client.get(f"/vault/download-encrypted/{file_id}", headers={**auth_headers, "Range": "bytes=1000-"})
+    assert resumed.status_code == 206
+    assert resumed.content == container[1000:]
+    assert resumed.headers["content-range"] == f"bytes 1000-{len(container) - 1}/{len(container)}"
+
+
+def _put_chunk(client, auth_headers, upload_id, offset, chunk, password=PASSWORD):
+    return client.put(
+        f"/vault/uploads/{upload_id}",
+        params={"offset": offset},
+        content=chunk,
+        headers={**auth_headers, "X-Chunk-SHA256": hashlib.sha256(chunk).hexdigest(), "X-Vault-Password": password},
+    )
+
+
+def test_resumable_upload_round_trip(session_factory, auth_headers, tmp_path):
+    data = os.urandom(3 * 64 * 1024 + 123)
+    client = TestClient(app)
+
+    created = client.post("/vault/uploads", json={"filename": "big.bin", "size": len(data), "password": PASSWORD}, headers=auth_headers)
+    assert created.status_code == 201
+    upload_id, chunk_size = created.json()["upload_id"], created.json()["chunk_size"]
+
+    first = data[:2 * chunk_size]
+    assert _put_chunk(client, auth_headers, upload_id, 0, first).json()["offset"] == len(first)
+
+    # A retried chunk at a stale offset is rejected with the offset to resume from
+    stale = _put_chunk(client, auth_headers, upload_id, 0, first)
+    assert stale.status_code == 409
+    assert stale.headers["upload-offset"] == str(len(first))
+
+    # Corrupted chunks and misaligned chunks are refused without advancing the offset
+    bad = client.put(
+        f"/vault/uploads/{upload_id}",
+        params={"offset": len(first)},
+        content=data[len(first):],
+        headers={**auth_headers, "X-Chunk-SHA256": "0" * 64, "X-Vault-Password": PASSWORD},
+    )
+    assert bad.status_code == 400
+    assert _put_chunk(client, auth_headers, upload_id, len(first), data[len(first):len(first) + 100]).status_code == 400
+    assert _put_chunk(client, auth_headers, upload_id, len(first), data[len(first):], "WrongPass123!").status_code == 403
+
+    # Resume after a "restart": progress comes from the database
+    assert client.get(f"/vault/uploads/{upload_id}", headers=auth_headers).json()["offset"] == len(first)
+    assert _put_chunk(client, auth_headers, upload_id, len(first), data[len(first):]).json()["offset"] == len(data)
+
+    completed = client.post(f"/vault/uploads/{upload_id}/complete", headers=auth_headers)
+    assert completed.status_code == 200
+    file_id = completed.json()["file_id"]
+    assert completed.json()["size"] == len(data)
+    assert list((tmp_path / "staging").iterdir()) == []
+
+    decrypted = client.post(f"/vault/decrypt/{file_id}", json={"password": PASSWORD}, headers=auth_headers)
+    assert decrypted.content == data
+    assert client.post(f"/vault/uploads/{upload_id}/complete", headers=auth_headers).status_code == 400
+
+
+
+def test_chunk_offset_advances_by_compare_and_set(session_factory, auth_headers, monkeypatch):
+    from src.models import UploadSession
+    from src.services import upload_service
+    from src.services.upload_service import UploadOffsetMismatch, UploadService
+
+    client = TestClient(app)
+    created = client.post("/vault/uploads", json={"filename": "race.bin", "size": 100, "password": PASSWORD}, headers=auth_headers)
+    upload_id = created.json()["upload_id"]
+
+    # Another worker (on another host, so the staging lock does not see it) commits the offset mid-write
+    real_fsync = upload_service._fsync
+
+    async def racing_fsync(fileno):
+        other = session_factory()
+        other.query(UploadSession).filter_by(id=upload_id).update({"received_size": 50})
+        other.commit()
+        other.close()
+        await real_fsync(fileno)
+
+    monkeypatch.setattr(upload_service, "_fsync", racing_fsync)
+    db = session_factory()
+    service = UploadService(db)
+    session = asyncio.run(service.get_session(upload_id, db.query(UploadSession).one().user_id))
+    data = os.urandom(100)
+    with pytest.raises(UploadOffsetMismatch) as conflict:
+        asyncio.run(service.write_chunk(session, 0, data, hashlib.sha256(data).hexdigest(), PASSWORD))
+    assert conflict.value.expected_offset == 50
+    assert session.received_size == 50
+    db.close()
+
+
+def _empty_upload(client, auth_headers, session_factory, name="empty.txt"):
+    from src.models import UploadSession
+    from src.services.upload_service import UploadService
+
+    upload_id = client.post("/vault/uploads", json={"filename": name, "size": 0, "password": PASSWORD}, headers=auth_headers).json()["upload_id"]
+    db = session_factory()
+    service = UploadService(db)
+    session = asyncio.run(service.get_session(upload_id, db.query(UploadSession).filter_by(id=upload_id).one().user_id))
+    return db, service, session
+
+
+def test_concurrent_completions_claim_the_session_once(session_factory, auth_headers, monkeypatch):
+    from src.services.upload_service import UploadError
+
+    client = TestClient(app)
+    db, service, session = _empty_upload(client, auth_headers, session_factory)
+    other_db = session_factory()
+    other_service = type(service)(other_db)
+    other_session = asyncio.run(other_service.get_session(session.id, session.user_id))
+    outcome = {}
+
+    class RacingBackend(InMemoryStorageBackend):
+        async def put_file(self, key, path, content_type="application/octet-stream"):
+            # A second /complete arrives while the first is still uploading
+            with pytest.raises(UploadError) as raced:
+                await other_service.complete(other_session, [("memory", "second")])
+            outcome["error"] = str(raced.value)
+            return await super().put_file(key, path, content_type)
+
+    backend = RacingBackend()
+    register_storage_backend("memory", backend)
+    encrypted_file, location = asyncio.run(service.complete(session, [("memory", "first")]))
+
+    assert outcome["error"] == "Upload session is completing"
+    assert (location, list(backend.objects)) == ("memory", ["first"])
+    assert db.query(EncryptedFile).count() == 1
+    assert session.status == "completed" and session.file_id == encrypted_file.id
+    db.close()
+    other_db.close()
+
+
+def test_failed_completion_deletes_the_stored_blob(session_factory, auth_headers, monkeypatch, tmp_path):
+    client = TestClient(app)
+    backend = InMemoryStorageBackend()
+    register_storage_backend("memory", backend)
+
+    async def failing_save(self, encrypted_files):
+        raise RuntimeError("database unavailable")
+
+    real_save = VaultService.save_file_records
+    monkeypatch.setattr(VaultService, "save_file_records", failing_save)
+
+    # The object store copied the staging file: nothing is left behind and the upload can be completed again
+    db, service, session = _empty_upload(client, auth_headers, session_factory)
+    with pytest.raises(RuntimeError):
+        asyncio.run(service.complete(session, [("memory", "copied")]))
+    assert backend.objects == {}
+    assert session.status == "active"
+
+    monkeypatch.setattr(VaultService, "save_file_records", real_save)
+    asyncio.run(service.complete(session, [("memory", "copied")]))
+    assert list(backend.objects) == ["copied"]
+    db.close()
+
+    # Local storage moved the staging file in, so the session cannot be completed again
+    monkeypatch.setattr(VaultService, "save_file_records", failing_save)
+    db, service, session = _empty_upload(client, auth_headers, session_factory, "moved.txt")
+    target = tmp_path / "moved.encrypted"
+    with pytest.raises(RuntimeError):
+        asyncio.run(service.complete(session, [("local", str(target))]))
+    assert not target.exists()
+    assert session.status == "failed"
+    db.close()
+
+
+@pytest.mark.skipif(os.name == "nt", reason="staging files are locked with fcntl")
+def test_expiry_waits_for_a_chunk_write_in_progress(session_factory, auth_headers, monkeypatch):
+    import fcntl
+
+    from src.services.upload_service import UploadError
+
+    client = TestClient(app)
+    monkeypatch.setattr(settings, "upload_session_ttl_seconds", -1)
+    db, service, session = _empty_upload(client, auth_headers, session_factory)
+    staging_path = session.staging_path
+
+    async def scenario():
+        # Stand in for a chunk write holding the staging file lock
+        with open(staging_path, "r+b") as staging:
+            fcntl.flock(staging.fileno(), fcntl.LOCK_EX)
+            collector = asyncio.create_task(type(service)(session_factory()).collect_expired())
+            await asyncio.sleep(0.2)
+            still_there = os.path.exists(staging_path)
+        return still_there, await collector
+
+    still_there, expired = asyncio.run(scenario())
+    assert (still_there, expired) == (True, 1)
+    assert not os.path.exists(staging_path)
+
+    # A write that loses the race reports the session's state instead of failing on the missing file
+    data = b"late"
+    with pytest.raises(UploadError, match="expired"):
+        asyncio.run(service.write_chunk(session, 0, data, hashlib.sha256(data).hexdigest(), PASSWORD))
+    db.close()
+
+
+def test_incomplete_and_expired_uploads(session_factory, auth_headers, monkeypatch, tmp_path):
+    import asyncio
+
+    from src.services.upload_service import UploadService
+
+    client = TestClient(app)
+    upload_id = client.post("/vault/uploads", json={"filename": "a.bin", "size": 10, "password": PASSWORD}, headers=auth_headers).json()["upload_id"]
+    assert client.post(f"/vault/uploads/{upload_id}/complete", headers=auth_headers).status_code == 400
+
+    empty_id = client.post("/vault/uploads", json={"filename": "empty.txt", "size": 0, "password": PASSWORD}, headers=auth_headers).json()["upload_id"]
+    file_id = client.post(f"/vault/uploads/{empty_id}/complete", headers=auth_headers).json()["file_id"]
+    assert client.post(f"/vault/decrypt/{file_id}", json={"password": PASSWORD}, headers=auth_headers).content == b""
+
+    too_big = client.post("/vault/uploads", json={"filename": "huge.bin", "size": settings.max_upload_size + 1, "password": PASSWORD}, headers=auth_headers)
+    assert too_big.status_code == 413
+
+    # Sessions past their TTL are garbage-collected along with their staging files
+    monkeypatch.setattr(settings, "upload_session_ttl_seconds", -1)
+    db = session_factory()
+    abandoned = client.post("/vault/uploads", json={"filename": "b.bin", "size": 10, "password": PASSWORD}, headers=auth_headers).json()["upload_id"]
+    assert asyncio.run(UploadService(db).collect_expired()) == 1
+    db.close()
+    assert client.get(f"/vault/uploads/{abandoned}", headers=auth_headers).json()["status"] == "expired"
+    assert [p.name for p in (tmp_path / "staging").iterdir()] == [f"{upload_id}.part"]
+
+
+def test_file_records_are_saved_in_one_transaction(session_factory):
+    db = session_factory()
+    user = User(username="batch", password_hash="x", salt="")
+    db.add(user)
+    db.commit()
+    vault_service = VaultService(db)
+    files = [
+        EncryptedFile(user_id=user.id, original_filename=f"f{i}", file_size=i, encrypted_path=f"p{i}",
+                      algorithm_version=ENVELOPE_ALGORITHM_VERSION)
+        for i in range(3)
+    ]
+    # The vault is committed up front, before any key is derived from it
+    asyncio.run(vault_service.prepare_vault(user.id))
+    commits = []
+    event.listen(db, "after_commit", lambda session: commits.append(session))
+    asyncio.run(vault_service.save_file_records(files))
+
+    assert len(commits) == 1
+    assert db.query(Vault).filter_by(user_id=user.id).count() == 1
+    assert sorted(m.file_id for m in db.query(FileMetadata)) == sorted(f.id for f in files)
+    db.close()
+
+
+
+def test_concurrent_first_uploads_share_one_kek_salt(session_factory):
+    db = session_factory()
+    user = User(username="legacy", password_hash="x", salt="")
+    db.add(user)
+    db.commit()
+    db.add(Vault(user_id=user.id))  # Vault from before envelope encryption
+    db.commit()
+
+    first, second = session_factory(), session_factory()
+    # Both requests load the vault before either assigns KEK parameters
+    assert first.query(Vault).one().kek_salt is None
+    assert second.query(Vault).one().kek_salt is None
+    first_vault = asyncio.run(VaultService(first).prepare_vault(user.id))
+    second_vault = asyncio.run(VaultService(second).prepare_vault(user.id))
+
+    assert first_vault.kek_salt and second_vault.kek_salt == first_vault.kek_salt
+    db.expire_all()
+    assert db.query(Vault).one().kek_salt == first_vault.kek_salt
+    for session in (db, first, second):
+        session.close()
+
+
+def test_batch_upload_stores_files_concurrently(session_factory, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "max_file_size", 64 * 1024)
+    backend = InMemoryStorageBackend()
+    register_storage_backend("memory", backend)
+    monkeypatch.setattr(settings, "storage_backend", "memory")
+    client = TestClient(app)
+
+    payloads = {f"doc{i}.bin": os.urandom(20 * 1024 + i) for i in range(4)}
+    files = [("files", (name, data, "application/octet-stream")) for name, data in payloads.items()]
+    files += [("files", ("doc0.bin", b"again", "application/octet-stream")),
+              ("files", ("huge.bin", os.urandom(65 * 1024), "application/octet-stream"))]
+    response = client.post("/vault/encrypt-batch", files=files, data={"password": PASSWORD}, headers=auth_headers)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["status"], body["stored"], body["failed"]) == ("partial", 5, 1)
+    assert [result["status"] for result in body["files"]] == ["success"] * 5 + ["error"]
+    assert body["bytes_processed"] == sum(len(data) for data in payloads.values()) + len(b"again")
+    assert body["throughput_bytes_per_second"] > 0
+    assert len(backend.objects) == 5
+
+    db = session_factory()
+    assert db.query(FileMetadata).count() == 5
+    db.close()
+
+    # A repeated name is stored under its own key, so both copies stay decryptable
+    for result, data in ((body["files"][0], payloads["doc0.bin"]), (body["files"][4], b"again")):
+        decrypted = client.post(f"/vault/decrypt/{result['file_id']}", json={"password": PASSWORD}, headers=auth_headers)
+        assert decrypted.content == data
+
+
+def test_archive_streams_decrypted_and_encrypted_zips(session_factory, auth_headers):
+    client = TestClient(app)
+    payloads = {"a.txt": os.urandom(150 * 1024), "b.txt": b"", "c.bin": os.urandom(10)}
+    ids = {}
+    for name, data in payloads.items():
+        ids[name] = client.post("/vault/encrypt", files={"file": (name, data)}, data={"password": PASSWORD},
+                                headers=auth_headers).json()["file_id"]
+
+    response = client.post("/vault/archive", json={"password": PASSWORD}, headers=auth_headers)
+    assert response.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert sorted(archive.namelist()) == ["a.txt", "b.txt", "c.bin"]
+    assert archive.read("a.txt") == payloads["a.txt"]
+    assert archive.read("b.txt") == b""
+    assert archive.testzip() is None
+
+    subset = client.post("/vault/archive", json={"file_ids": [ids["c.bin"], "missing"], "password": PASSWORD},
+                         headers=auth_headers)
+    archive = zipfile.ZipFile(io.BytesIO(subset.content))
+    assert archive.namelist() == ["c.bin", "ERRORS.txt"]
+    assert b"missing: file not found" in archive.read("ERRORS.txt")
+
+    encrypted = client.post("/vault/archive", json={"file_ids": [ids["c.bin"]], "decrypt": False}, headers=auth_headers)
+    archive = zipfile.ZipFile(io.BytesIO(encrypted.content))
+    assert archive.namelist() == ["c.bin.enc"]
+    assert is_stream_container(archive.read("c.bin.enc"))
+
+    assert client.post("/vault/archive", json={"password": "wrong"}, headers=auth_headers).status_code == 400
+    assert client.post("/vault/archive", json={"file_ids": ["missing"], "password": PASSWORD},
+                       headers=auth_headers).status_code == 404
+
+
+def test_decrypt_local_copy_of_a_vault_file(session_factory, auth_headers):
+    data = os.urandom(70 * 1024)
+    client = TestClient(app)
+    file_id = client.post(
+        "/vault/encrypt",
+        files={"file": ("notes.txt", data, "text/plain")},
+        data={"password": PASSWORD},
+        headers=auth_headers,
+    ).json()["file_id"]
+    container = client.get(f"/vault/download-encrypted/{file_id}", headers=auth_headers).content
+
+    decrypted = client.post(
+        "/vault/decrypt-local",
+        files={"file": ("notes.txt.enc", container, "application/octet-stream")},
+        data={"password": PASSWORD},
+        headers=auth_headers,
+    )
+    assert decrypted.status_code == 200
+    assert decrypted.content == data
+    wrong = client.post(
+        "/vault/decrypt-local",
+        files={"file": ("notes.txt.enc", container, "application/octet-stream")},
+        data={"password": "WrongPass123!"},
+        headers=auth_headers,
+    )
+    assert wrong.status_code == 400
@@ -142,8 +142,39 @@ export const vaultAPI = {
     }
   },
 
-  listFiles: () => 
-    apiRequest('/vault/files'),
+  listFiles: async () => {
+    // The listing is paginated; follow X-Next-Cursor until every page is loaded
+    const headers = {};
+    if (typeof window !== 'undefined') {
+      const token = localStorage.getItem('token');
+      if (token) {
+        headers.Authorization = `Bearer ${token}`;
+      }
+    }
+
+    const files = [];
+    let cursor = null;
+    do {
+      const params = new URLSearchParams({ limit: '1000' });
+      if (cursor) {
+        params.set('cursor', cursor);
+      }
+      const response = await fetch(`${API_BASE_URL}/vault/files?${params}`, { headers });
+      if (!response.ok) {
+        let errorMessage = `HTTP error! status: ${response.status}`;
+        try {
+          const errorData = await response.json();
+          errorMessage = errorData.detail || errorData.message || errorMessage;
+        } catch (e) {
+          errorMessage = response.statusText || errorMessage;
+        }
+        throw new Error(errorMessage);
+      }
+      files.push(...(await response.json()));
+      cursor = response.headers.get('X-Next-Cursor');
+    } while (cursor);
+    return files;
+  },
 
   deleteFile: (fileId) =>
     apiRequest(`/vault/file/${fileId}`, {
@@ -213,10 +213,12 @@ def user_vault_session(username: str):
             confirm = input("Are you sure you want to delete your account? (y/n): ").lower()
             if confirm == "y":
                 delete_account(username)
+                fvm.purge_session_keys(username)
                 input("\n[✓] Account deleted successfully.")
                 break
 
         elif choice == "6":
+            fvm.purge_session_keys(username)
             print(f"\nLogging out {username}...")
             time.sleep(1)
             break
@@ -1,24 +1,58 @@
 import hashlib
+import os
 from datetime import datetime
 from pathlib import Path
 
 LOG_FILE = Path("SecureVault_Data/logs/audit_log.txt")
 LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+# Sidecar with "<log size in bytes> <last curr_hash>", so appends don't reread the log
+HEAD_FILE = LOG_FILE.with_name("audit_log.head")
+GENESIS_HASH = "0" * 64
+PROGRESS_EVERY = 1000  # verify_log_integrity reports progress every this many entries
 
 def calculate_hash(data: str) -> str:
     return hashlib.sha256(data.encode("utf-8")).hexdigest()
 
+def _read_last_line(block_size: int = 4096) -> str:
+    # Seek backwards from the end until the start of the last non-empty line
+    with LOG_FILE.open("rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        data = b""
+        while end > 0:
+            start = max(0, end - block_size)
+            f.seek(start)
+            data = f.read(end - start) + data
+            end = start
+            if data.rstrip(b"\r\n").rfind(b"\n") != -1:
+                break
+        return data.rstrip(b"\r\n").rsplit(b"\n", 1)[-1].decode("utf-8")
+
+def _write_head(log_size: int, curr_hash: str):
+    # Write then rename, so the sidecar is either the old head or the new one
+    tmp = HEAD_FILE.with_suffix(".tmp")
+    tmp.write_text(f"{log_size} {curr_hash}", encoding="utf-8")
+    os.replace(tmp, HEAD_FILE)
+
 def get_last_hash() -> str:
     if not LOG_FILE.exists():
-        return "0" * 64
+        return GENESIS_HASH
+    log_size = LOG_FILE.stat().st_size
+    try:
+        size, curr_hash = HEAD_FILE.read_text(encoding="utf-8").split()
+        # Trust the sidecar only if the log hasn't changed since it was written
+        if int(size) == log_size:
+            return curr_hash
+    except Exception:
+        pass
     try:
-        with LOG_FILE.open("r", encoding="utf-8") as f:
-            last = f.readlines()[-1].strip()
-            if "curr_hash=" in last:
-                return last.split("curr_hash=")[-1]
+        last = _read_last_line().strip()
+        if "curr_hash=" in last:
+            curr_hash = last.split("curr_hash=")[-1]
+            _write_head(log_size, curr_hash)
+            return curr_hash
     except Exception:
         pass
-    return "0" * 64
+    return GENESIS_HASH
 
 def write_audit_log(user: str, action: str, target: str, result: bool):
     ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -26,45 +60,57 @@ def write_audit_log(user: str, action: str, target: str, result: bool):
     raw = f"{ts}|user={user}|action={action}|target={target}|result={'success' if result else 'fail'}|prev_hash={prev}"
     curr = calculate_hash(raw)
     entry = f"[{ts}] user={user} action={action} target={target} result={'success' if result else 'fail'} prev_hash={prev} curr_hash={curr}\n"
-    with LOG_FILE.open("a", encoding="utf-8") as f:
-        f.write(entry)
+    with LOG_FILE.open("ab") as f:
+        f.write(entry.encode("utf-8"))
+        log_size = f.tell()
+    _write_head(log_size, curr)
 
-def verify_log_integrity(verbose: bool = True) -> bool:
+def verify_log_integrity(verbose: bool = True, progress=None) -> bool:
+    # Streams the log; progress(entries, bytes_read, total_bytes) is called every PROGRESS_EVERY entries and at the end
     if not LOG_FILE.exists():
         if verbose: print("[!] No audit log found.")
         return True
-    lines = LOG_FILE.read_text(encoding="utf-8").splitlines()
-    prev_hash = "0" * 64
+    total_bytes = LOG_FILE.stat().st_size
+    bytes_read = 0
+    i = 0
+    prev_hash = GENESIS_HASH
     tampered = False
     if verbose: print("\n=== Audit Log Integrity Report ===\n")
-    for i, line in enumerate(lines, start=1):
-        try:
-            prev = line.split("prev_hash=")[-1].split(" ")[0]
-            curr = line.split("curr_hash=")[-1]
-            # rebuild same raw string used earlier
-            mid = line.split("] ")[-1].rsplit(" prev_hash=", 1)[0]
-            raw = f"{line[1:20]}|{mid}|prev_hash={prev}"  # approximate rebuild for hash comparison
-            # safer recompute by reconstructing fields:
-            parts = line.split(" ")
-            ts = line.split("]")[0].strip("[")
-            # build canonical raw string
-            # parse fields user=..., action=..., target=..., result=...
-            fields = {}
-            for p in parts:
-                if "=" in p and p.count("=")==1:
-                    k,v = p.split("=",1)
-                    fields[k]=v
-            canonical = f"{ts}|user={fields.get('user','')}|action={fields.get('action','')}|target={fields.get('target','')}|result={fields.get('result','')}|prev_hash={prev}"
-            recomputed = calculate_hash(canonical)
-            if prev != prev_hash or recomputed != curr:
-                if verbose: print(f" Entry #{i} — Tampered or Broken")
+    with LOG_FILE.open("rb") as f:
+        for i, raw_line in enumerate(f, start=1):
+            bytes_read += len(raw_line)
+            if progress and i % PROGRESS_EVERY == 0:
+                progress(i, bytes_read, total_bytes)
+            try:
+                line = raw_line.decode("utf-8").rstrip("\r\n")
+                prev = line.split("prev_hash=")[-1].split(" ")[0]
+                curr = line.split("curr_hash=")[-1]
+                # rebuild same raw string used earlier
+                mid = line.split("] ")[-1].rsplit(" prev_hash=", 1)[0]
+                raw = f"{line[1:20]}|{mid}|prev_hash={prev}"  # approximate rebuild for hash comparison
+                # safer recompute by reconstructing fields:
+                parts = line.split(" ")
+                ts = line.split("]")[0].strip("[")
+                # build canonical raw string
+                # parse fields user=..., action=..., target=..., result=...
+                fields = {}
+                for p in parts:
+                    if "=" in p and p.count("=")==1:
+                        k,v = p.split("=",1)
+                        fields[k]=v
+                canonical = f"{ts}|user={fields.get('user','')}|action={fields.get('action','')}|target={fields.get('target','')}|result={fields.get('result','')}|prev_hash={prev}"
+                recomputed = calculate_hash(canonical)
+                if prev != prev_hash or recomputed != curr:
+                    if verbose: print(f" Entry #{i} — Tampered or Broken")
+                    tampered = True
+                else:
+                    if verbose: print(f" Entry #{i} — Verified")
+                prev_hash = curr
+            except Exception:
+                if verbose: print(f" Entry #{i} — Corrupted format")
                 tampered = True
-            else:
-                if verbose: print(f" Entry #{i} — Verified")
-            prev_hash = curr
-        except Exception:
-            if verbose: print(f" Entry #{i} — Corrupted format")
-            tampered = True
+    if progress:
+        progress(i, bytes_read, total_bytes)
     if verbose:
         print("\n" + ("All good — no tampering detected." if not tampered else "Tampering detected!"))
     return not tampered
@@ -6,7 +6,9 @@ from cryptography.hazmat.primitives import hashes
 from cryptography.fernet import Fernet
 from cryptography.hazmat.backends import default_backend
 
-def derive_key_from_password(password: str, salt: bytes, iterations: int = 390000) -> bytes:
+PBKDF2_ITERATIONS = 390000
+
+def derive_key_from_password(password: str, salt: bytes, iterations: int = PBKDF2_ITERATIONS) -> bytes:
     password_bytes = password.encode("utf-8")
     kdf = PBKDF2HMAC(
         algorithm=hashes.SHA256(),
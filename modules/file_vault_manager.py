@@ -3,12 +3,21 @@ import json
 import time
 from pathlib import Path
 from modules import encryption_manager as em
+from modules.key_cache import DerivedKeyCache
 
 # Vault and log directories
 VAULT_ROOT = Path("vaults")
 LOG_DIR = Path("SecureVault_Data/logs")
 LOG_FILE = LOG_DIR / "activity_log.txt"
 
+# Keys derived during this session, so decrypting the same file again skips PBKDF2
+KEY_CACHE = DerivedKeyCache(max_entries=64, ttl_seconds=300)
+
+
+#— Forget a user's derived keys (on logout / account deletion)
+def purge_session_keys(username: str) -> int:
+    return KEY_CACHE.purge_scope(username)
+
 
 #— Create vault folder for a specific user
 def get_user_vault_path(username: str) -> Path:
@@ -103,7 +112,11 @@ def decrypt_user_file(username: str, enc_path: Path, password: str) -> bool:
         salt = bytes.fromhex(meta.get("salt", ""))
         orig_name = meta.get("orig_name", enc_path.stem)
 
-        key = em.derive_key_from_password(password, salt)
+        key = KEY_CACHE.get_or_derive(
+            password, salt, em.PBKDF2_ITERATIONS,
+            lambda: em.derive_key_from_password(password, salt, em.PBKDF2_ITERATIONS),
+            scope=username
+        )
         vault_path = get_user_vault_path(username)
 
         if "." in orig_name:
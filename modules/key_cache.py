@@ -0,0 +1,67 @@
+# modules/key_cache.py
+# Short-lived cache of password-derived keys for the CLI, so decrypting the same
+# file again in a session skips PBKDF2. Entries are looked up by an HMAC of
+# (scope, iterations, salt, password) under a per-process secret, and the key
+# bytes are zeroed when an entry expires, is evicted, or is purged.
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+
+def _zeroize(buffer: bytearray) -> None:
+    for i in range(len(buffer)):
+        buffer[i] = 0
+
+
+class DerivedKeyCache:
+    def __init__(self, max_entries: int = 64, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._secret = secrets.token_bytes(32)
+        # cache key -> (key bytes, scope, expiry)
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cache_key(self, password: str, salt: bytes, iterations: int, scope: Optional[str]) -> bytes:
+        mac = hmac.new(self._secret, digestmod=hashlib.sha256)
+        # Length-prefix every field so distinct tuples can never produce the same input
+        for field in ((scope or "").encode("utf-8"), str(iterations).encode("ascii"), salt, password.encode("utf-8")):
+            mac.update(len(field).to_bytes(4, "big"))
+            mac.update(field)
+        return mac.digest()
+
+    def _drop(self, cache_key: bytes) -> None:
+        entry = self._entries.pop(cache_key, None)
+        if entry is not None:
+            _zeroize(entry[0])
+
+    def get_or_derive(self, password: str, salt: bytes, iterations: int, derive: Callable[[], bytes], scope: Optional[str] = None) -> bytes:
+        """Return the cached key, or run ``derive`` and cache its result."""
+        cache_key = self._cache_key(password, salt, iterations, scope)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry[2] > time.monotonic():
+                self._entries.move_to_end(cache_key)
+                return bytes(entry[0])
+            self._drop(cache_key)
+
+        key = derive()
+        if self.max_entries > 0:
+            with self._lock:
+                self._drop(cache_key)
+                self._entries[cache_key] = (bytearray(key), scope, time.monotonic() + self.ttl_seconds)
+                while len(self._entries) > self.max_entries:
+                    self._drop(next(iter(self._entries)))
+        return key
+
+    def purge_scope(self, scope: str) -> int:
+        """Drop every entry for a scope (a user logging out or deleting their account)."""
+        with self._lock:
+            keys = [k for k, entry in self._entries.items() if entry[1] == scope]
+            for cache_key in keys:
+                self._drop(cache_key)
+            return len(keys)